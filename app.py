@@ -1,23 +1,153 @@
-from flask import Flask, render_template, Response
+from flask import Flask, render_template, Response, jsonify
 import cv2
+import itertools
+import os
 import threading
+import time
 
 app = Flask(__name__)
-cap = cv2.VideoCapture(0)  # Open webcam
 
-def gen_frames():
+# ===============================
+# CONFIG
+# ===============================
+# "local": open the webcam here; "zmq": relay main.py's footage feed
+# (already encoded, so nothing is re-encoded here)
+FEED_SOURCE = os.getenv("FEED_SOURCE", "local")
+CAMERA_INDEX = int(os.getenv("CAMERA_INDEX", "0"))
+JPEG_QUALITY = int(os.getenv("FEED_JPEG_QUALITY", "80"))
+ENGINE_HOST = os.getenv("ENGINE_HOST", "localhost")
+FOOTAGE_PORT = os.getenv("FOOTAGE_PORT", "9090")  # as in main/config.py
+FEED_TOPIC = os.getenv("FEED_TOPIC", "cam0/full")
+
+
+# ===============================
+# BROADCAST HUB
+# ===============================
+class ClientStats:
+    def __init__(self, client_id):
+        self.id = client_id
+        self.connected = time.time()
+        self.sent = 0
+        self.dropped = 0
+
+
+class FrameHub:
+    """One producer, any number of MJPEG clients.
+
+    The producer publishes each encoded frame once. Clients wait on a
+    condition for a newer sequence number and always take the latest
+    frame, so a client still busy writing the previous one just skips
+    what it missed (counted as drops) and nothing queues up per client.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.frame = None
+        self.seq = 0
+        self.published = 0
+        self.clients = {}
+        self.ids = itertools.count(1)
+
+    def publish(self, jpeg):
+        with self.cond:
+            self.frame = jpeg
+            self.seq += 1
+            self.published += 1
+            self.cond.notify_all()
+
+    def has_clients(self):
+        return bool(self.clients)
+
+    def wait(self, last_seq, timeout=1.0):
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq != last_seq, timeout)
+            return self.seq, self.frame
+
+    def stream(self):
+        client = ClientStats(next(self.ids))
+        with self.cond:
+            self.clients[client.id] = client
+        try:
+            last = self.seq
+            while True:
+                seq, frame = self.wait(last)
+                if seq == last or frame is None:
+                    continue
+                if client.sent:
+                    client.dropped += seq - last - 1
+                last = seq
+                client.sent += 1
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        finally:
+            with self.cond:
+                self.clients.pop(client.id, None)
+
+    def stats(self):
+        with self.cond:
+            clients = list(self.clients.values())
+        now = time.time()
+        return {
+            "published": self.published,
+            "clients": len(clients),
+            "per_client": [
+                {"id": c.id, "seconds": round(now - c.connected, 1), "sent": c.sent, "dropped": c.dropped}
+                for c in clients
+            ],
+        }
+
+
+hub = FrameHub()
+
+# ===============================
+# PRODUCERS
+# ===============================
+def capture_frames(hub):
+    cap = cv2.VideoCapture(CAMERA_INDEX)  # Open webcam
     while True:
         success, frame = cap.read()
         if not success:
-            break
-        else:
-            # Here you can add your PPE detection logic
-            # draw bounding boxes, overlay text, etc.
+            cap.release()
+            time.sleep(1.0)
+            cap = cv2.VideoCapture(CAMERA_INDEX)
+            continue
+        if not hub.has_clients():
+            continue  # keep the camera buffer fresh, skip the encode
+
+        # Here you can add your PPE detection logic
+        # draw bounding boxes, overlay text, etc.
+
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        hub.publish(buffer.tobytes())
+
+
+def relay_footage(hub):
+    import zmq
+    sock = zmq.Context.instance().socket(zmq.SUB)
+    sock.setsockopt(zmq.SUBSCRIBE, FEED_TOPIC.encode())
+    sock.setsockopt(zmq.RCVHWM, 2)
+    sock.connect(f"tcp://{ENGINE_HOST}:{FOOTAGE_PORT}")
+    while True:
+        _, jpeg = sock.recv_multipart()
+        hub.publish(jpeg)
+
 
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+_producer_lock = threading.Lock()
+_producer = None
+
+
+def ensure_producer():
+    global _producer
+    with _producer_lock:
+        if _producer is None:
+            target = relay_footage if FEED_SOURCE == "zmq" else capture_frames
+            _producer = threading.Thread(target=target, args=(hub,), name="feed-producer", daemon=True)
+            _producer.start()
+
+
+def gen_frames():
+    ensure_producer()
+    return hub.stream()
 
 @app.route('/')
 def index():
@@ -28,5 +158,9 @@ def video_feed():
     return Response(gen_frames(),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/feed_stats')
+def feed_stats():
+    return jsonify(hub.stats())
+
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5000, threaded=True)
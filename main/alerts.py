@@ -0,0 +1,301 @@
+import heapq
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from collections import Counter, namedtuple
+
+from metrics import STAGE_SECONDS, IN_FLIGHT, ERRORS
+
+# ===============================
+# VIOLATION EVENTS & DIGESTS
+# ===============================
+Violation = namedtuple("Violation", ["timestamp", "camera", "track", "missing", "confidences", "evidence"])
+
+
+class Window:
+    """Violations for one camera waiting to go out as one digest."""
+
+    def __init__(self, camera, opened, close_at):
+        self.camera = camera
+        self.opened = opened
+        self.close_at = close_at
+        self.violations = []
+        self.evidence = []
+
+    def digest(self, closed):
+        by_item = Counter(item for v in self.violations for item in v.missing)
+        evidence = list(dict.fromkeys(self.evidence + [v.evidence for v in self.violations if v.evidence]))
+        return {
+            "camera": self.camera,
+            "start": self.opened,
+            "end": closed,
+            "violations": len(self.violations),
+            "people": len({v.track for v in self.violations}),
+            "by_item": dict(by_item.most_common()),
+            "evidence": evidence,
+            "details": [
+                f"{time.strftime('%H:%M:%S', time.localtime(v.timestamp))} person #{v.track} "
+                f"missing {', '.join(v.missing)}" for v in self.violations
+            ],
+        }
+
+
+def format_digest(digest, max_lines=10):
+    """(subject, text body) for e-mail style sinks."""
+    subject = f"PPE Alert - {digest['camera']} - {digest['violations']} violations"
+    window = (f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(digest['start']))} - "
+              f"{time.strftime('%H:%M:%S', time.localtime(digest['end']))}")
+    lines = [
+        f"PPE Violations: {digest['violations']} ({digest['people']} people) on {digest['camera']}",
+        f"Window: {window}",
+        "Missing: " + ", ".join(f"{item} x{n}" for item, n in digest["by_item"].items()),
+        "",
+        "Details:",
+        *digest["details"][-max_lines:],
+    ]
+    if len(digest["details"]) > max_lines:
+        lines.append(f"... and {len(digest['details']) - max_lines} more")
+    if digest["evidence"]:
+        lines += ["", "Evidence:", *digest["evidence"][-max_lines:]]
+    return subject, "\n".join(lines)
+
+# ===============================
+# SINKS
+# ===============================
+# A sink has a `name` and `send(digest)`, which raises on failure.
+class SnsSink:
+    name = "sns"
+
+    def __init__(self, client, topic_arn):
+        self.client = client
+        self.topic_arn = topic_arn
+
+    def send(self, digest):
+        subject, message = format_digest(digest)
+        self.client.publish(TopicArn=self.topic_arn, Subject=subject[:100], Message=message)
+
+
+class FileSink:
+    """Appends every digest as one JSON line; the offline stand-in for SNS."""
+
+    name = "file"
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def send(self, digest):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(digest) + "\n")
+
+
+class WebhookSink:
+    """POSTs the digest as JSON; any non-2xx answer counts as a failure."""
+
+    name = "webhook"
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, digest):
+        subject, text = format_digest(digest)
+        body = json.dumps(dict(digest, subject=subject, text=text)).encode()
+        request = urllib.request.Request(self.url, body, {"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def make_sinks(spec, sns=None, topic_arn=None):
+    """'sns,file:/var/log/ppe_alerts.jsonl,webhook:http://host/hook' -> sinks."""
+    sinks = []
+    for part in spec.split(","):
+        kind, _, target = part.strip().partition(":")
+        if not kind:
+            continue
+        if kind == "sns":
+            if topic_arn:
+                sinks.append(SnsSink(sns, topic_arn))
+        elif kind == "file":
+            sinks.append(FileSink(target))
+        elif kind == "webhook":
+            sinks.append(WebhookSink(target))
+        else:
+            raise ValueError(f"Unknown alert sink: {part}")
+    return sinks
+
+# ===============================
+# DISPATCHER
+# ===============================
+class AlertDispatcher:
+    """Collects violations off the frame loop and delivers windowed digests.
+
+    `submit` and `evidence` only enqueue, so a slow or failing sink never
+    stalls a camera. The dispatcher thread groups events per camera: a
+    window opens with a camera's first violation and closes `gather`
+    seconds later, or `window` seconds after that camera's previous
+    digest, whichever is later - the first alert goes out promptly and a
+    busy camera produces one digest per window. Each sink gets every
+    digest, at most `per_hour` an hour, and failed sends are retried with
+    exponential backoff and jitter up to `max_retries` times.
+    """
+
+    def __init__(self, sinks, window=600.0, gather=5.0, per_hour=60, max_retries=5,
+                 base_delay=1.0, max_delay=300.0, queue_size=1000, log=None):
+        self.sinks = sinks
+        self.window = window
+        self.gather = gather
+        self.spacing = 3600.0 / per_hour if per_hour else 0.0
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.log = log or (lambda level, message, camera=None: None)
+
+        self.windows = {}       # camera -> open Window
+        self.last_digest = {}   # camera -> time of the last closed window
+        self.deliveries = []    # heap of (due, seq, sink index, digest, attempt)
+        self.next_allowed = [0.0] * len(sinks)
+        self.seq = 0
+        self.running = False
+        self.thread = None
+        self.flush_deadline = None
+
+        self.submitted = 0
+        self.dropped = 0
+        self.digests = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+
+    # ---------- producer side ----------
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def submit(self, violation):
+        if self.sinks and self._put(("violation", violation)):
+            self.submitted += 1
+
+    def evidence(self, camera, key):
+        """Attach an evidence key (e.g. a clip finished after the violation) to the open window."""
+        if self.sinks:
+            self._put(("evidence", (camera, key)))
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if not self.sinks:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="alerts", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Close every open window and give deliveries `timeout` seconds."""
+        if not self.thread:
+            return
+        self.flush_deadline = time.time() + timeout
+        self.running = False
+        self.thread.join(timeout=timeout + 1.0)
+
+    # ---------- dispatcher thread ----------
+    def run(self):
+        deadline = None
+        while True:
+            now = time.time()
+            if not self.running and deadline is None:
+                deadline = self.flush_deadline or now
+                for camera in list(self.windows):
+                    self.windows[camera].close_at = now
+            if deadline and (now > deadline or (self.queue.empty() and not self.windows and not self.deliveries)):
+                break
+
+            wake = min([w.close_at for w in self.windows.values()] + [d[0] for d in self.deliveries[:1]]
+                       + [now + 0.5])
+            try:
+                kind, item = self.queue.get(timeout=max(0.0, min(wake - now, 0.5)))
+                self._collect(kind, item, time.time())
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            for camera, window in list(self.windows.items()):
+                if now >= window.close_at:
+                    self._close(camera, window, now)
+            while self.deliveries and self.deliveries[0][0] <= now:
+                self._deliver(*heapq.heappop(self.deliveries)[2:], shutting_down=deadline is not None)
+
+        for _, _, i, digest, _ in self.deliveries:
+            self.failed += 1
+            self.log("ERROR", f"Alert via {self.sinks[i].name} dropped at shutdown", digest["camera"])
+
+    def _collect(self, kind, item, now):
+        camera = item.camera if kind == "violation" else item[0]
+        window = self.windows.get(camera)
+        if window is None:
+            if kind == "evidence":
+                return  # nothing pending to attach it to
+            close_at = max(now + self.gather, self.last_digest.get(camera, 0) + self.window)
+            if not self.running:
+                close_at = now
+            window = self.windows[camera] = Window(camera, now, close_at)
+        if kind == "violation":
+            window.violations.append(item)
+        else:
+            window.evidence.append(item[1])
+
+    def _close(self, camera, window, now):
+        del self.windows[camera]
+        self.last_digest[camera] = now
+        digest = window.digest(now)
+        self.digests += 1
+        for i in range(len(self.sinks)):
+            self._schedule(now, i, digest, 0)
+
+    def _schedule(self, due, sink, digest, attempt):
+        if self.running:  # the hourly cap does not hold back the shutdown flush
+            due = max(due, self.next_allowed[sink])
+        self.seq += 1
+        heapq.heappush(self.deliveries, (due, self.seq, sink, digest, attempt))
+
+    def _deliver(self, i, digest, attempt, shutting_down=False):
+        sink, camera = self.sinks[i], digest["camera"]
+        stage = f"alert_{sink.name}"
+        try:
+            with STAGE_SECONDS.time(stage, camera), IN_FLIGHT.track(stage):
+                sink.send(digest)
+        except Exception as e:
+            ERRORS.inc(stage, camera)
+            if attempt >= self.max_retries or shutting_down:
+                self.failed += 1
+                self.log("ERROR", f"Alert via {sink.name} failed: {str(e)[:60]}", camera)
+                return
+            self.retries += 1
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            self._schedule(time.time() + delay, i, digest, attempt + 1)
+            return
+
+        self.sent += 1
+        self.next_allowed[i] = time.time() + self.spacing
+        self.log("ALERT", f"{sink.name} digest sent: {digest['violations']} violations, "
+                          f"{digest['people']} people", camera)
+
+    def stats(self):
+        return {
+            "sinks": [s.name for s in self.sinks],
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "open": len(self.windows),
+            "digests": self.digests,
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
@@ -0,0 +1,156 @@
+import cv2
+import numpy as np
+
+# ===============================
+# PPE ANALYSIS
+# ===============================
+def analyze_ppe(person):
+    results = {
+        "HEAD_COVER": 0,
+        "FACE_COVER": 0,
+        "HAND_COVER": 0
+    }
+
+    for bp in person.get("BodyParts", []):
+        name = bp.get("Name")
+
+        if name == "HEAD":
+            etype = "HEAD_COVER"
+        elif name == "FACE":
+            etype = "FACE_COVER"
+        elif name in ["LEFT_HAND", "RIGHT_HAND"]:
+            etype = "HAND_COVER"
+        else:
+            continue
+
+        best = 0
+        for eq in bp.get("EquipmentDetections", []):
+            if eq.get("Type") == etype:
+                best = max(best, eq.get("Confidence", 0))
+
+        results[etype] = best
+
+    return results
+
+# ===============================
+# ARRAY-BACKED SCAN RESULT
+# ===============================
+EQUIPMENT = ("HEAD_COVER", "FACE_COVER", "HAND_COVER")
+ITEMS = np.array(["HEAD", "FACE", "HAND"])
+
+
+class ScanResult:
+    """One Rekognition response, converted once into NumPy arrays.
+
+    conf  - (N, 3) float32 best HEAD/FACE/HAND cover confidence per person
+    boxes - (N, 4) float32 normalized left, top, right, bottom
+    `generation` increases with every scan so consumers can tell a fresh
+    result from the one they already handled; `evidence` is the S3 key the
+    scan's image was spooled under, if any.
+    """
+
+    def __init__(self, response, generation, evidence=None):
+        persons = response.get("Persons", [])
+        self.response = response
+        self.generation = generation
+        self.evidence = evidence
+        self.conf = np.zeros((len(persons), 3), np.float32)
+        self.boxes = np.zeros((len(persons), 4), np.float32)
+
+        for i, p in enumerate(persons):
+            c = analyze_ppe(p)
+            self.conf[i] = [c[e] for e in EQUIPMENT]
+            box = p.get("BoundingBox", {})
+            left, top = box.get("Left", 0), box.get("Top", 0)
+            self.boxes[i] = [left, top, left + box.get("Width", 0), top + box.get("Height", 0)]
+
+    def __len__(self):
+        return len(self.conf)
+
+    def compliance(self, threshold):
+        """(N, 3) bool: which items each person is wearing."""
+        return self.conf >= threshold
+
+    def violators(self, threshold):
+        """Indices of persons missing at least one item."""
+        return np.flatnonzero(~self.compliance(threshold).all(axis=1))
+
+    def confidences(self, i):
+        """{"HEAD": .., "FACE": .., "HAND": ..} for person i, as plain floats."""
+        return dict(zip(ITEMS.tolist(), self.conf[i].round(1).tolist()))
+
+    def missing(self, threshold):
+        """Missing item names for every violating person."""
+        ok = self.compliance(threshold)
+        return [ITEMS[~ok[i]].tolist() for i in self.violators(threshold)]
+
+# ===============================
+# PRE-RENDERED OVERLAY
+# ===============================
+class OverlayRenderer:
+    """Draws a ScanResult once and composites it onto every frame.
+
+    The overlay is re-rendered only when the result generation, the
+    threshold or the frame size changes. Only the coordinates and colours
+    of the pixels actually drawn are kept (a separate mask is drawn so
+    black overlay pixels still count), so the per-frame cost is a single
+    fancy-indexed assignment of a few thousand pixels.
+    """
+
+    GREEN = (0, 255, 0)
+    RED = (0, 0, 255)
+    BLUE = (255, 0, 0)
+
+    def __init__(self):
+        self.key = None
+        self.ys = self.xs = self.pixels = None
+        self.renders = 0
+
+    def _draw(self, canvas, mask, fn, *args):
+        fn(canvas, *args)
+        fn(mask, *args[:-2], 255, args[-1])
+
+    def render(self, result, threshold, h, w, boxes=True):
+        canvas = np.zeros((h, w, 3), np.uint8)
+        mask = np.zeros((h, w), np.uint8)
+        font = cv2.FONT_HERSHEY_SIMPLEX
+
+        if len(result):
+            px = (result.boxes * [w, h, w, h]).astype(np.int32) if boxes else []
+            for x1, y1, x2, y2 in px:
+                # PERSON BOX
+                self._draw(canvas, mask, cv2.rectangle, (x1, y1), (x2, y2), self.BLUE, 2)
+                self._draw(canvas, mask, cv2.putText, "PERSON", (x1, y1 - 10),
+                           font, 0.7, self.BLUE, 2)
+
+            # DASHBOARD: worst case across everyone in frame
+            worst = result.conf.min(axis=0)
+            for i, (label, value) in enumerate(zip(ITEMS, worst)):
+                color = self.GREEN if value >= threshold else self.RED
+                self._draw(canvas, mask, cv2.putText, f"{label}: {int(value)}%",
+                           (10, 30 + 30 * i), font, 0.6, color, 2)
+
+        self.ys, self.xs = np.nonzero(mask)
+        self.pixels = canvas[self.ys, self.xs]
+        self.renders += 1
+
+    def apply(self, frame, result, threshold, tracks=None):
+        """`tracks` (tracker.Track list) replaces the scan's own boxes with
+        the tracked ones, which move every frame and are drawn directly."""
+        if result is None:
+            return frame
+        h, w = frame.shape[:2]
+        key = (result.generation, threshold, h, w, tracks is None)
+        if key != self.key:
+            self.render(result, threshold, h, w, boxes=tracks is None)
+            self.key = key
+
+        if len(self.ys):
+            frame[self.ys, self.xs] = self.pixels
+
+        for track in tracks or ():
+            x1, y1, x2, y2 = (track.box * [w, h, w, h]).astype(np.int32)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), self.BLUE, 2)
+            cv2.putText(frame, f"PERSON #{track.id}", (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.BLUE, 2)
+        return frame
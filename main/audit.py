@@ -0,0 +1,268 @@
+import argparse
+import glob
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+import config
+from analysis import ScanResult
+from detectors import make_detector
+from metrics import ENGINE
+from ratelimit import SharedRateLimiter
+from roi import downscale
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # compressed .npz parts instead of Parquet
+    pq = None
+
+# ===============================
+# OFFLINE RE-AUDIT
+# ===============================
+# Re-runs compliance checks over recorded footage and archived evidence:
+#
+#   python audit.py video:/recordings images:/exports/day1 s3://ppe-detection-images/cam0/2026/05/ \
+#       --out audit_run --detector rekognition --concurrency 4 --confidence 85
+#
+# Inputs are split into work units (a slice of one video, a batch of
+# images or S3 keys). Units are decoded, downscaled and JPEG-encoded in a
+# process pool, so decoding scales with cores instead of playback speed;
+# detection runs on threads under one concurrency/TPS limit. Every finished
+# unit is written as its own columnar part and recorded in a checkpoint,
+# so an interrupted run picks up where it stopped.
+VIDEO_EXTS = (".mp4", ".avi", ".mov", ".mkv", ".m4v")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+Unit = namedtuple("Unit", ["id", "kind", "source", "items"])
+# video: items = (start_frame, end_frame, step, fps)
+# images: items = [path, ...]
+# s3: items = [(key, last_modified), ...]
+
+COLUMNS = ("source", "frame", "timestamp", "person", "head", "face", "hand",
+           "compliant", "left", "top", "right", "bottom")
+
+
+# ---------- planning ----------
+def video_units(path, every, frames_per_unit):
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    step = max(1, int(round(every * fps)))
+    span = step * frames_per_unit
+    return [Unit(f"video:{path}#{start}", "video", path, (start, min(start + span, total), step, fps))
+            for start in range(0, total, span)]
+
+
+def plan(inputs, every=1.0, batch=64):
+    """Expand input specs into work units (stable ids for checkpointing)."""
+    units = []
+    for spec in inputs:
+        if spec.startswith("s3://"):
+            import boto3
+            bucket, _, prefix = spec[5:].partition("/")
+            s3 = boto3.client("s3", region_name=config.REGION)
+            keys = []
+            for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+                keys.extend((o["Key"], o["LastModified"].timestamp()) for o in page.get("Contents", [])
+                            if o["Key"].lower().endswith(IMAGE_EXTS))
+            units += [Unit(f"s3://{bucket}/{keys[i][0]}", "s3", bucket, keys[i:i + batch])
+                      for i in range(0, len(keys), batch)]
+            continue
+
+        kind, _, path = spec.partition(":")
+        if kind == "video":
+            paths = [path] if os.path.isfile(path) else sorted(
+                p for p in glob.glob(os.path.join(path, "**", "*"), recursive=True)
+                if p.lower().endswith(VIDEO_EXTS))
+            for p in paths:
+                units += video_units(p, every, batch)
+        elif kind == "images":
+            paths = sorted(p for p in glob.glob(os.path.join(path, "**", "*"), recursive=True)
+                           if p.lower().endswith(IMAGE_EXTS))
+            units += [Unit(f"images:{paths[i]}", "images", path, paths[i:i + batch])
+                      for i in range(0, len(paths), batch)]
+        else:
+            raise ValueError(f"Unknown audit input: {spec}")
+    return units
+
+
+# ---------- decoding (process pool) ----------
+_s3 = None
+
+
+def _encode(image, max_dim, quality):
+    ok, buf = cv2.imencode(".jpg", downscale(image, max_dim), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes() if ok else None
+
+
+def decode_unit(unit, max_dim, quality):
+    """Runs in a worker process; returns (unit, [(source, frame, timestamp, jpeg)])."""
+    global _s3
+    out = []
+    if unit.kind == "video":
+        start, end, step, fps = unit.items
+        cap = cv2.VideoCapture(unit.source)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for index in range(start, end):
+            if (index - start) % step:
+                if not cap.grab():
+                    break
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            out.append((unit.source, index, index / fps, _encode(frame, max_dim, quality)))
+        cap.release()
+    elif unit.kind == "images":
+        for path in unit.items:
+            image = cv2.imread(path)
+            if image is not None:
+                out.append((path, -1, os.path.getmtime(path), _encode(image, max_dim, quality)))
+    elif unit.kind == "s3":
+        if _s3 is None:
+            import boto3
+            _s3 = boto3.client("s3", region_name=config.REGION)
+        for key, modified in unit.items:
+            body = _s3.get_object(Bucket=unit.source, Key=key)["Body"].read()
+            image = cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                out.append((f"s3://{unit.source}/{key}", -1, modified, _encode(image, max_dim, quality)))
+    return unit, [item for item in out if item[3] is not None]
+
+
+# ---------- detectors ----------
+def make_audit_detector(name, concurrency):
+    """A detectors.py backend with its own TPS budget for the batch job."""
+    limiter = SharedRateLimiter(config.REKOGNITION_TPS, config.REKOGNITION_BURST)
+    limiter.register(ENGINE)
+    return make_detector(name, limiter=limiter, concurrency=concurrency)
+
+
+# ---------- output ----------
+class PartWriter:
+    """Columnar parts plus a JSON-lines checkpoint of finished units."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        self.checkpoint = os.path.join(out_dir, "checkpoint.jsonl")
+        self.done = set()
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)["unit"])
+                    except (ValueError, KeyError):
+                        pass  # torn last line from a crash
+        self.parts = len(self.done)
+
+    def write(self, unit, rows):
+        columns = {name: np.array([r[i] for r in rows]) for i, name in enumerate(COLUMNS)}
+        name = f"part-{self.parts:06d}" + (".parquet" if pq else ".npz")
+        path = os.path.join(self.out_dir, name)
+        tmp = path + ".tmp"
+        if pq:
+            pq.write_table(pa.table(columns), tmp, compression="zstd")
+        else:
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, **columns)
+        os.replace(tmp, path)
+        with open(self.checkpoint, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"unit": unit.id, "part": name, "rows": len(rows)}) + "\n")
+        self.done.add(unit.id)
+        self.parts += 1
+
+
+def load_results(out_dir):
+    """All checkpointed parts of a run as one pandas DataFrame."""
+    import pandas as pd
+    frames = []
+    with open(os.path.join(out_dir, "checkpoint.jsonl"), encoding="utf-8") as f:
+        parts = sorted({json.loads(line)["part"] for line in f if line.strip().endswith("}")})
+    for name in parts:
+        path = os.path.join(out_dir, name)
+        if path.endswith(".parquet"):
+            frames.append(pd.read_parquet(path))
+        elif path.endswith(".npz"):
+            with np.load(path, allow_pickle=False) as data:
+                frames.append(pd.DataFrame({k: data[k] for k in data.files}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+
+
+# ---------- run ----------
+def audit_rows(detector, items, confidence):
+    rows = []
+    for source, frame, timestamp, jpeg in items:
+        result = ScanResult(detector.detect(jpeg, confidence), 0)
+        if not len(result):
+            rows.append((source, frame, timestamp, -1, np.nan, np.nan, np.nan, True,
+                         np.nan, np.nan, np.nan, np.nan))
+            continue
+        compliant = result.compliance(confidence).all(axis=1)
+        for i in range(len(result)):
+            rows.append((source, frame, timestamp, i, *result.conf[i].tolist(), bool(compliant[i]),
+                         *result.boxes[i].tolist()))
+    return rows
+
+
+def run(inputs, out_dir, detector, confidence=config.CONFIDENCE_LEVEL, every=1.0,
+        batch=64, workers=None, threads=8, max_dim=1280, quality=85, log=print):
+    writer = PartWriter(out_dir)
+    units = [u for u in plan(inputs, every, batch) if u.id not in writer.done]
+    log(f"{len(units)} units to audit ({len(writer.done)} already done)")
+
+    started, frames, persons, violations = time.time(), 0, 0, 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as decoders, \
+            ThreadPoolExecutor(max_workers=threads) as detectors:
+        pending = set()
+        queue = list(units)
+        while queue or pending:
+            # Keep a couple of units per worker in flight; decoded frames wait in memory
+            while queue and len(pending) < workers * 2:
+                pending.add(decoders.submit(decode_unit, queue.pop(0), max_dim, quality))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                unit, items = future.result()
+                chunks = [items[i::threads] for i in range(threads)]
+                rows = [row for part in detectors.map(lambda c: audit_rows(detector, c, confidence), chunks)
+                        for row in part]
+                rows.sort(key=lambda r: (r[0], r[1], r[3]))
+                writer.write(unit, rows)
+                frames += len(items)
+                persons += sum(1 for r in rows if r[3] >= 0)
+                violations += sum(1 for r in rows if r[3] >= 0 and not r[7])
+                rate = frames / max(time.time() - started, 1e-6)
+                log(f"[{writer.parts} parts] {unit.id}: {len(items)} frames | {rate:.1f} frames/s total")
+
+    log(f"Audited {frames} frames, {persons} persons, {violations} non-compliant in {time.time() - started:.1f}s")
+    return frames, persons, violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline PPE re-audit over recordings and evidence")
+    parser.add_argument("inputs", nargs="+", help="video:PATH|DIR, images:DIR or s3://bucket/prefix")
+    parser.add_argument("--out", required=True, help="output directory (parts + checkpoint)")
+    parser.add_argument("--detector", default="rekognition", choices=["rekognition", "local", "cascade"])
+    parser.add_argument("--confidence", type=int, default=config.CONFIDENCE_LEVEL)
+    parser.add_argument("--every", type=float, default=1.0, help="seconds between sampled video frames")
+    parser.add_argument("--batch", type=int, default=64, help="frames or images per work unit")
+    parser.add_argument("--workers", type=int, help="decode processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=4, help="detector calls in flight")
+    parser.add_argument("--max-dim", type=int, default=1280)
+    args = parser.parse_args()
+
+    run(args.inputs, args.out, make_audit_detector(args.detector, args.concurrency),
+        confidence=args.confidence, every=args.every, batch=args.batch,
+        workers=args.workers, threads=args.concurrency, max_dim=args.max_dim)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import NoCredentialsError
+
+# ===============================
+# SHARED AWS SESSION
+# ===============================
+class AwsSession:
+    """One boto3 session and one client per service for the whole process.
+
+    Clients are thread-safe and keep their connection pool between calls,
+    so every caller reusing them skips the TLS handshake and credential
+    resolution a fresh client pays for. `max_pool` should cover the most
+    threads that use one client at once (the janitor's delete workers).
+    Short connect/read timeouts make an unreachable endpoint fail fast
+    instead of hanging whoever asked.
+    """
+
+    def __init__(self, region=None, max_pool=10, connect_timeout=3, read_timeout=10, retries=3):
+        self.session = boto3.session.Session(region_name=region)
+        self.config = Config(
+            max_pool_connections=max_pool,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={"max_attempts": retries, "mode": "standard"},
+            tcp_keepalive=True,
+        )
+        self.clients = {}
+        self.lock = threading.Lock()  # boto3 sessions are not thread-safe
+
+    def client(self, service):
+        with self.lock:
+            client = self.clients.get(service)
+            if client is None:
+                client = self.clients[service] = self.session.client(service, config=self.config)
+            return client
+
+# ===============================
+# BACKGROUND HEALTH PROBES
+# ===============================
+class Probe:
+    """Last result of one periodic check."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.value = None
+        self.error = None
+        self.checked = None      # time of the last attempt
+        self.succeeded = None    # time of the last success
+
+    def due(self, now):
+        return self.checked is None or now - self.checked >= self.ttl
+
+    def snapshot(self, now):
+        age = None if self.succeeded is None else now - self.succeeded
+        return {
+            "value": self.value,
+            "error": self.error,
+            "age": age,
+            # Served from an older success: the last probe failed or the
+            # prober has fallen behind
+            "stale": self.error is not None or age is None or age > 2 * self.ttl,
+        }
+
+
+class AwsHealth:
+    """Refreshes identity, bucket reachability and inventory off the UI thread.
+
+    Identity (sts:GetCallerIdentity) is checked every `identity_ttl`
+    seconds, the bucket (HeadBucket) every `bucket_ttl`; `inventory` is a
+    started BucketInventory that keeps its own schedule. `snapshot` only
+    reads the cached results, so a Streamlit rerun costs no round-trip,
+    and a dropped network shows up as stale values rather than an
+    exception. `refresh` asks for both probes to run now.
+    """
+
+    def __init__(self, aws, bucket, identity_ttl=300.0, bucket_ttl=30.0):
+        self.aws = aws
+        self.bucket = bucket
+        self.identity = Probe(identity_ttl)
+        self.bucket_probe = Probe(bucket_ttl)
+        self.inventory = None
+        self.no_credentials = False
+
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.ready = threading.Event()
+        self.running = False
+        self.thread = None
+
+    def start(self, wait=3.0):
+        """Start probing; blocks up to `wait` seconds for the first results."""
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="aws-health", daemon=True)
+        self.thread.start()
+        self.ready.wait(wait)
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+
+    def refresh(self):
+        with self.lock:
+            self.identity.checked = self.bucket_probe.checked = None
+        self.wake.set()
+
+    def _run(self, probe, fn):
+        try:
+            value = fn()
+        except Exception as e:
+            with self.lock:
+                probe.error = f"{type(e).__name__}: {e}"
+                probe.checked = time.time()
+                if isinstance(e, NoCredentialsError):
+                    self.no_credentials = True
+            return
+        with self.lock:
+            probe.value = value
+            probe.error = None
+            probe.checked = probe.succeeded = time.time()
+            self.no_credentials = False
+
+    def _whoami(self):
+        identity = self.aws.client("sts").get_caller_identity()
+        return {"account": identity.get("Account"), "user": identity.get("Arn", "").split("/")[-1]}
+
+    def _head_bucket(self):
+        self.aws.client("s3").head_bucket(Bucket=self.bucket)
+        return True
+
+    def _loop(self):
+        while self.running:
+            now = time.time()
+            with self.lock:
+                identity_due, bucket_due = self.identity.due(now), self.bucket_probe.due(now)
+            if identity_due:
+                self._run(self.identity, self._whoami)
+            if bucket_due:
+                self._run(self.bucket_probe, self._head_bucket)
+            self.ready.set()
+
+            with self.lock:
+                next_due = min((p.checked or 0) + p.ttl for p in (self.identity, self.bucket_probe))
+            self.wake.wait(max(0.5, next_due - time.time()))
+            self.wake.clear()
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            identity = self.identity.snapshot(now)
+            bucket = self.bucket_probe.snapshot(now)
+            no_credentials = self.no_credentials
+        bucket["ok"] = bucket["error"] is None and bucket["value"] is True
+        return {
+            "identity": identity,
+            "bucket": bucket,
+            "no_credentials": no_credentials,
+            "checking": not self.ready.is_set(),
+            "inventory": self.inventory.stats() if self.inventory else None,
+        }
@@ -0,0 +1,4 @@
+"""End-to-end pipeline benchmark with a synthetic camera and local AWS stand-ins.
+
+Run from main/:  python -m bench --seconds 30 --out bench.json
+"""
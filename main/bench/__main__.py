@@ -0,0 +1,93 @@
+import argparse
+import json
+import sys
+
+from bench.runner import run
+
+# metric path -> True when higher is better
+KEY_METRICS = {
+    ("capture", "*", "fps"): True,
+    ("encode_ms", "*", "*", "mean"): False,
+    ("scan", "scan_to_overlay_ms", "p90"): False,
+    ("startup_ms", "first_frame"): False,
+    ("startup_ms", "first_scan"): False,
+    ("memory", "rss_peak_mb"): False,
+}
+
+
+def flatten(result, path, prefix=()):
+    """Yield (name, value) for every match of a '*' path."""
+    if not path:
+        if isinstance(result, (int, float)):
+            yield "/".join(prefix), result
+        return
+    head, rest = path[0], path[1:]
+    if not isinstance(result, dict):
+        return
+    keys = result.keys() if head == "*" else [head]
+    for key in keys:
+        if key in result:
+            yield from flatten(result[key], rest, prefix + (key,))
+
+
+def compare(result, baseline, tolerance):
+    """Return regressions beyond `tolerance` (fractional) versus a baseline run."""
+    regressions = []
+    for path, higher_better in KEY_METRICS.items():
+        old = dict(flatten(baseline, path))
+        for name, value in flatten(result, path):
+            if name not in old or not old[name]:
+                continue
+            change = (value - old[name]) / old[name]
+            if (-change if higher_better else change) > tolerance:
+                regressions.append(f"{name}: {old[name]} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="PPE pipeline benchmark")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--source", default="synthetic:1280x720@30",
+                        help="frame source spec, e.g. video:/path/clip.mp4 or images:/path/dir")
+    parser.add_argument("--cameras", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.25, help="fake Rekognition latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--responses", help="JSON list of canned Rekognition responses")
+    parser.add_argument("--scan-interval", type=float)
+    parser.add_argument("--cache", action="store_true", help="enable the scan cache (off by default)")
+    parser.add_argument("--port-base", type=int, default=19090)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    parser.add_argument("--baseline", help="previous JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--verbose", action="store_true", help="show engine log output")
+    args = parser.parse_args()
+
+    result = run(
+        seconds=args.seconds, source=args.source, cameras=args.cameras,
+        latency=args.latency, jitter=args.jitter, responses=args.responses,
+        throttle_rate=args.throttle_rate, scan_interval=args.scan_interval,
+        scan_cache=args.cache,
+        port_base=args.port_base, verbose=args.verbose,
+    )
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
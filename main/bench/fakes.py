@@ -0,0 +1,134 @@
+import copy
+import json
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+# ===============================
+# CANNED PPE RESPONSES
+# ===============================
+COVERS = {"HEAD": "HEAD_COVER", "FACE": "FACE_COVER", "LEFT_HAND": "HAND_COVER", "RIGHT_HAND": "HAND_COVER"}
+
+
+def make_person(person_id, left, top, width=0.2, height=0.6, missing=()):
+    """A Rekognition person wearing every cover except the parts in `missing`."""
+    parts = []
+    for name, cover in COVERS.items():
+        detections = []
+        if name not in missing:
+            detections.append({
+                "BoundingBox": {"Left": left, "Top": top, "Width": width / 4, "Height": height / 8},
+                "Confidence": 97.5,
+                "Type": cover,
+                "CoversBodyPart": {"Confidence": 96.0, "Value": True},
+            })
+        parts.append({"Name": name, "Confidence": 99.0, "EquipmentDetections": detections})
+    return {
+        "Id": person_id,
+        "BoundingBox": {"Left": left, "Top": top, "Width": width, "Height": height},
+        "Confidence": 99.5,
+        "BodyParts": parts,
+    }
+
+
+def make_response(persons):
+    compliant = [p["Id"] for p in persons if all(bp["EquipmentDetections"] for bp in p["BodyParts"])]
+    return {
+        "ProtectiveEquipmentModelVersion": "1.0",
+        "Persons": persons,
+        "Summary": {
+            "PersonsWithRequiredEquipment": compliant,
+            "PersonsWithoutRequiredEquipment": [p["Id"] for p in persons if p["Id"] not in compliant],
+            "PersonsIndeterminate": [],
+        },
+    }
+
+
+DEFAULT_RESPONSES = [
+    make_response([]),
+    make_response([make_person(0, 0.1, 0.2)]),
+    make_response([make_person(0, 0.1, 0.2), make_person(1, 0.6, 0.25, missing=("HEAD",))]),
+    make_response([make_person(0, 0.4, 0.3, missing=("FACE", "LEFT_HAND", "RIGHT_HAND"))]),
+]
+
+# ===============================
+# AWS STAND-INS
+# ===============================
+class FakeRekognition:
+    """detect_protective_equipment with configurable latency and canned answers.
+
+    Each call sleeps latency +/- jitter seconds, then returns the next
+    response from `responses` (cycled). `throttle_rate` of the calls raise
+    the same ThrottlingException boto3 would.
+    """
+
+    def __init__(self, latency=0.25, jitter=0.1, responses=None, throttle_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.responses = responses or DEFAULT_RESPONSES
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.bytes_in = 0
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Load canned responses from a JSON list of Rekognition responses."""
+        with open(path, encoding="utf-8") as f:
+            return cls(responses=json.load(f), **kwargs)
+
+    def detect_protective_equipment(self, Image, SummarizationAttributes=None):
+        with self.lock:
+            n = self.calls
+            self.calls += 1
+            self.bytes_in += len(Image.get("Bytes", b""))
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            throttle = self.random.random() < self.throttle_rate
+        time.sleep(delay)
+        if throttle:
+            with self.lock:
+                self.throttled += 1
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+                "DetectProtectiveEquipment",
+            )
+        # Callers remap boxes in place, so every call gets its own copy
+        return copy.deepcopy(self.responses[n % len(self.responses)])
+
+    def stats(self):
+        return {"calls": self.calls, "throttled": self.throttled, "bytes_in": self.bytes_in}
+
+
+class FakeS3:
+    """Keeps put objects in memory."""
+
+    def __init__(self, latency=0.02):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.objects[(Bucket, Key)] = len(Body)
+        return {"ETag": '"bench"'}
+
+    def stats(self):
+        with self.lock:
+            return {"objects": len(self.objects), "bytes": sum(self.objects.values())}
+
+
+class FakeSNS:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, TopicArn, Message, Subject=None, **kwargs):
+        self.messages.append((TopicArn, Subject, Message))
+        return {"MessageId": str(len(self.messages))}
+
+    def stats(self):
+        return {"published": len(self.messages)}
@@ -0,0 +1,279 @@
+import contextlib
+import io
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+import zmq
+
+import config
+from bench.fakes import FakeRekognition, FakeS3, FakeSNS
+from engine import Engine
+from metrics import summary
+from startup import STARTUP
+
+# ===============================
+# HELPERS
+# ===============================
+def percentiles(values, scale=1.0):
+    if not values:
+        return None
+    arr = np.asarray(values, np.float64) * scale
+    p50, p90, p95, p99 = np.percentile(arr, [50, 90, 95, 99])
+    return {
+        "count": int(arr.size),
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1e6
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=2).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+# ===============================
+# PROBES
+# ===============================
+class TimedExecutor:
+    """Wraps the scan executor to timestamp submissions.
+
+    A scan that produced a new result generation is remembered with the
+    time it was submitted; ScanProbe closes it when that generation is
+    first drawn.
+    """
+
+    def __init__(self, inner, probe):
+        self.inner = inner
+        self.probe = probe
+
+    def submit(self, fn, *args, **kwargs):
+        return self.inner.submit(self.probe.run_scan, time.time(), fn, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        self.inner.shutdown(wait=wait)
+
+
+class ScanProbe:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.latencies = defaultdict(list)
+        self.submitted = 0
+
+    def run_scan(self, submitted, fn, *args, **kwargs):
+        pipeline = getattr(fn, "__self__", None)
+        if not hasattr(pipeline, "state"):
+            return fn(*args, **kwargs)  # clip spooling and other helpers
+        self.submitted += 1
+        before = pipeline.state.generation
+        fn(*args, **kwargs)
+        after = pipeline.state.generation
+        if after != before:
+            with self.lock:
+                self.pending[(pipeline.camera_id, after)] = submitted
+
+    def wrap_render(self, pipeline):
+        render = pipeline.render
+
+        def timed_render(frame):
+            render(frame)
+            key = (pipeline.camera_id, pipeline.handled_generation)
+            with self.lock:
+                submitted = self.pending.pop(key, None)
+            if submitted is not None:
+                self.latencies[pipeline.camera_id].append(time.time() - submitted)
+
+        pipeline.render = timed_render
+
+
+class EncodeProbe:
+    """Samples per-profile encode time after every publish."""
+
+    def __init__(self):
+        self.samples = defaultdict(lambda: defaultdict(list))
+
+    def wrap(self, pipeline):
+        footage = pipeline.footage
+        publish = footage.publish
+        samples = self.samples[pipeline.camera_id]
+
+        def timed_publish(frame, now):
+            sent = {p.name: p.sent for p in footage.profiles}
+            out = publish(frame, now)
+            for p in footage.profiles:
+                if p.sent != sent[p.name]:
+                    samples[p.name].append(p.encode_ms)
+            return out
+
+        footage.publish = timed_publish
+
+
+class FootageCounter(threading.Thread):
+    """Subscribes to every footage topic and counts what arrives."""
+
+    def __init__(self, context, endpoint):
+        super().__init__(name="bench-footage", daemon=True)
+        self.sock = context.socket(zmq.SUB)
+        self.sock.setsockopt(zmq.SUBSCRIBE, b"")
+        self.sock.connect(endpoint)
+        self.messages = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.running = True
+
+    def run(self):
+        while self.running:
+            if not self.sock.poll(100):
+                continue
+            topic, payload = self.sock.recv_multipart()
+            self.messages[topic.decode()] += 1
+            self.bytes[topic.decode()] += len(payload)
+
+    def stop(self):
+        self.running = False
+        self.join(timeout=1)
+        self.sock.close()
+
+# ===============================
+# RUN
+# ===============================
+def run(seconds=30.0, source="synthetic:1280x720@30", cameras=1, latency=0.25, jitter=0.1,
+        responses=None, throttle_rate=0.0, scan_interval=None, scan_cache=False,
+        port_base=19090, warmup=2.0, verbose=False):
+    """Run the engine against stand-ins for `seconds`; returns a result dict."""
+    config.PORT, config.LOG_PORT, config.CONTROL_PORT = port_base, port_base + 1, port_base + 2
+    config.STATS_INTERVAL = 1e9
+    config.METRICS_PORT = 0
+    config.SNS_TOPIC_ARN = config.SNS_TOPIC_ARN or "arn:aws:sns:local:000000000000:bench"
+    config.EVIDENCE_SPOOL_DIR = tempfile.mkdtemp(prefix="bench_spool_")
+    if scan_cache:
+        config.SCAN_CACHE_SIZE = config.SCAN_CACHE_SIZE or 64
+    if scan_interval:
+        config.AI_SCAN_INTERVAL = scan_interval
+        config.SCAN_INTERVAL_MIN = min(config.SCAN_INTERVAL_MIN, scan_interval)
+
+    if responses:
+        rekognition = FakeRekognition.from_file(responses, latency=latency, jitter=jitter,
+                                                throttle_rate=throttle_rate)
+    else:
+        rekognition = FakeRekognition(latency, jitter, throttle_rate=throttle_rate)
+    s3, sns = FakeS3(), FakeSNS()
+
+    rss_start = rss_mb()
+    rss_peak = rss_start
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with output:
+        STARTUP.reset()  # time from Engine() on; the bench's own imports are not the engine's
+        engine = Engine(
+            [(f"cam{i}", source, 1.0) for i in range(cameras)],
+            aws={"s3": s3, "rekognition": rekognition, "sns": sns},
+        )
+        scan_probe, encode_probe = ScanProbe(), EncodeProbe()
+        engine.executor = TimedExecutor(engine.executor, scan_probe)
+        for p in engine.pipelines:
+            scan_probe.wrap_render(p)
+            encode_probe.wrap(p)
+
+        counter = FootageCounter(engine.context, f"tcp://localhost:{config.PORT}")
+        counter.start()
+        if not engine.start():
+            counter.stop()
+            engine.stop(headless=True)
+            raise RuntimeError(f"frame source failed to open: {source}")
+
+        time.sleep(warmup)
+        frames0 = {p.camera_id: p.capture.frames for p in engine.pipelines}
+        messages0 = dict(counter.messages)
+        started = time.time()
+        while time.time() - started < seconds:
+            time.sleep(0.1)
+            rss_peak = max(rss_peak, rss_mb())
+        elapsed = time.time() - started
+
+        result = {
+            "capture": {
+                p.camera_id: {
+                    "fps": round((p.capture.frames - frames0[p.camera_id]) / elapsed, 2),
+                    "frames": p.capture.frames,
+                    "dropped": p.reader.dropped,
+                    "read_failures": p.capture.read_failures,
+                }
+                for p in engine.pipelines
+            },
+            "encode_ms": {
+                cam: {name: percentiles(values) for name, values in profiles.items()}
+                for cam, profiles in encode_probe.samples.items()
+            },
+            "publish": {
+                topic: {
+                    "msgs_per_s": round((count - messages0.get(topic, 0)) / elapsed, 2),
+                    "avg_kb": round(counter.bytes[topic] / max(count, 1) / 1024, 1),
+                }
+                for topic, count in sorted(counter.messages.items())
+            },
+            "scan": {
+                "submitted": scan_probe.submitted,
+                "scan_to_overlay_ms": percentiles(
+                    [v for values in scan_probe.latencies.values() for v in values], 1000
+                ),
+                "per_camera_ms": {
+                    cam: percentiles(values, 1000) for cam, values in scan_probe.latencies.items()
+                },
+                "scheduler": {p.camera_id: p.scheduler.stats() for p in engine.pipelines},
+                "cache": {p.camera_id: p.scan_cache.stats() for p in engine.pipelines if p.scan_cache},
+                "detector": dict(engine.detector.stats(), name=engine.detector.name),
+            },
+            "startup_ms": {step: round(seconds * 1000, 1) for step, seconds in STARTUP.flat().items()},
+            "stages": summary(),
+            "aws": {
+                "rekognition": rekognition.stats(),
+                "s3": s3.stats(),
+                "sns": sns.stats(),
+            },
+        }
+
+        counter.stop()
+        engine.stop(headless=True)
+
+    result["memory"] = {
+        "rss_start_mb": round(rss_start, 1),
+        "rss_peak_mb": round(rss_peak, 1),
+        "maxrss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 1),
+    }
+    result["meta"] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "seconds": round(elapsed, 1),
+        "source": source,
+        "cameras": cameras,
+        "rekognition_latency": latency,
+        "rekognition_jitter": jitter,
+        "python": sys.version.split()[0],
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+    }
+    return result
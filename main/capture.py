@@ -0,0 +1,343 @@
+import glob
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from metrics import STAGE_SECONDS
+
+# ===============================
+# FRAME SOURCES
+# ===============================
+# A source only knows how to open itself and hand back the next frame.
+# Pacing, reconnection and buffering live in CaptureThread so every
+# source behaves the same way inside the pipeline.
+
+class FrameSource:
+    name = "source"
+    live = False        # True when the device paces itself (real cameras)
+    fps = 30.0
+    finished = False    # True once a non-looping source has run out of frames
+
+    def open(self):
+        raise NotImplementedError
+
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    live = True
+
+    def __init__(self, index=0, width=1280, height=720, fps=30):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fps = float(fps)
+        self.name = f"camera:{index}"
+        self.cap = None
+
+    def open(self):
+        self.close()
+        backend = cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+        self.cap = cv2.VideoCapture(self.index, backend)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Keep the driver queue short so we always see the newest frame
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return self.cap.isOpened()
+
+    def read(self):
+        if self.cap is None or not self.cap.isOpened():
+            return False, None
+        return self.cap.read()
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, loop=True, fps=None):
+        self.path = path
+        self.loop = loop
+        self.fps = fps
+        self.name = f"video:{path}"
+        self.cap = None
+
+    def open(self):
+        self.close()
+        self.finished = False
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            return False
+        if not self.fps:
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        return True
+
+    def read(self):
+        if self.cap is None:
+            return False, None
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            self.finished = not self.loop
+        return ret, frame
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirSource(FrameSource):
+    EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, path, loop=True, fps=10):
+        self.path = path
+        self.loop = loop
+        self.fps = float(fps)
+        self.name = f"images:{path}"
+        self.files = []
+        self.pos = 0
+
+    def open(self):
+        self.finished = False
+        self.files = sorted(
+            f for f in glob.glob(os.path.join(self.path, "*"))
+            if f.lower().endswith(self.EXTENSIONS)
+        )
+        self.pos = 0
+        return bool(self.files)
+
+    def read(self):
+        while self.pos < len(self.files):
+            frame = cv2.imread(self.files[self.pos])
+            self.pos += 1
+            if self.pos >= len(self.files) and self.loop:
+                self.pos = 0
+            if frame is not None:
+                return True, frame
+        self.finished = True
+        return False, None
+
+
+class SyntheticSource(FrameSource):
+    """Moving-block test pattern, for headless runs without a camera."""
+
+    def __init__(self, width=1280, height=720, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = float(fps)
+        self.name = f"synthetic:{width}x{height}@{int(fps)}"
+        self.count = 0
+        self.background = None
+
+    def open(self):
+        ramp = np.linspace(40, 160, self.width, dtype=np.uint8)
+        self.background = np.repeat(
+            np.tile(ramp, (self.height, 1))[:, :, None], 3, axis=2
+        )
+        self.count = 0
+        return True
+
+    def read(self):
+        frame = self.background.copy()
+        bw, bh = self.width // 8, self.height // 3
+        span = self.width - bw
+        x = int(abs((self.count * 8) % (2 * span) - span))
+        y = self.height // 3
+        cv2.rectangle(frame, (x, y), (x + bw, y + bh), (200, 220, 255), -1)
+        cv2.putText(frame, f"#{self.count}", (10, self.height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        self.count += 1
+        return True, frame
+
+
+def open_source(spec):
+    """Build a source from a spec string.
+
+    camera:0 | video:/path/clip.mp4 | images:/path/dir | synthetic[:WxH@FPS]
+    """
+    kind, _, arg = spec.partition(":")
+    kind = kind.strip().lower()
+
+    if kind == "camera":
+        return CameraSource(int(arg or 0))
+    if kind == "video":
+        return VideoFileSource(arg)
+    if kind == "images":
+        return ImageDirSource(arg)
+    if kind == "synthetic":
+        width, height, fps = 1280, 720, 30
+        if arg:
+            size, _, rate = arg.partition("@")
+            width, height = (int(v) for v in size.lower().split("x"))
+            fps = int(rate or fps)
+        return SyntheticSource(width, height, fps)
+    raise ValueError(f"Unknown frame source: {spec}")
+
+# ===============================
+# RING BUFFER
+# ===============================
+Frame = namedtuple("Frame", ["seq", "timestamp", "image"])
+
+
+class FrameRing:
+    """Fixed-size ring of the most recent frames.
+
+    The writer never blocks; old slots are simply overwritten. Readers
+    wait on the condition for a sequence number newer than their last.
+    """
+
+    def __init__(self, capacity=4):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def write(self, image, timestamp=None):
+        item = Frame(self.seq + 1, timestamp or time.time(), image)
+        with self.cond:
+            self.slots[item.seq % self.capacity] = item
+            self.seq = item.seq
+            self.cond.notify_all()
+        return item.seq
+
+    def latest(self, after_seq=0, timeout=None):
+        with self.cond:
+            if not self.cond.wait_for(
+                lambda: self.seq > after_seq or self.closed, timeout
+            ):
+                return None
+            if self.seq <= after_seq:
+                return None
+            return self.slots[self.seq % self.capacity]
+
+    def recent(self, count):
+        """Up to `count` buffered frames, oldest first."""
+        with self.cond:
+            count = min(count, self.capacity, self.seq)
+            return [self.slots[s % self.capacity]
+                    for s in range(self.seq - count + 1, self.seq + 1)]
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class RingReader:
+    """One consumer's view of a FrameRing, with its own drop counter."""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.last_seq = 0
+        self.received = 0
+        self.dropped = 0
+
+    def read(self, timeout=None):
+        item = self.ring.latest(self.last_seq, timeout)
+        if item is None:
+            return None
+        if self.last_seq:
+            self.dropped += item.seq - self.last_seq - 1
+        self.last_seq = item.seq
+        self.received += 1
+        return item
+
+# ===============================
+# CAPTURE THREAD
+# ===============================
+class CaptureThread:
+    def __init__(self, source, ring, log=None, realtime=True, reconnect_delay=1.0, camera=None):
+        self.source = source
+        self.camera = camera or source.name
+        self.ring = ring
+        self.log = log or (lambda level, message: None)
+        self.realtime = realtime
+        self.reconnect_delay = reconnect_delay
+        self.running = False
+        self.thread = None
+
+        self.frames = 0
+        self.read_failures = 0
+        self.reconnects = 0
+        self.fps = 0.0
+
+    @property
+    def finished(self):
+        return self.source.finished
+
+    def start(self):
+        if not self.source.open():
+            return False
+        self.running = True
+        self.thread = threading.Thread(
+            target=self._run, name=f"capture-{self.source.name}", daemon=True
+        )
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        self.source.close()
+        self.ring.close()
+
+    def _run(self):
+        # Files, image folders and the synthetic pattern are paced to
+        # their nominal rate; cameras are paced by the sensor itself.
+        period = 0
+        if self.realtime and not self.source.live and self.source.fps:
+            period = 1.0 / self.source.fps
+        next_tick = time.time()
+        last = time.time()
+
+        while self.running:
+            t0 = time.perf_counter()
+            ret, frame = self.source.read()
+            now = time.time()
+
+            if not ret:
+                if self.source.finished:
+                    self.log("INFO", f"Source finished: {self.source.name}")
+                    break
+                self.read_failures += 1
+                self.log("WARN", "Camera reconnecting...")
+                time.sleep(self.reconnect_delay)
+                if self.source.open():
+                    self.reconnects += 1
+                continue
+
+            STAGE_SECONDS.observe(time.perf_counter() - t0, "capture", self.camera)
+            self.ring.write(frame, now)
+            self.frames += 1
+            dt = now - last
+            last = now
+            if dt > 0:
+                self.fps = 0.9 * self.fps + 0.1 / dt if self.fps else 1.0 / dt
+
+            if period:
+                next_tick += period
+                delay = next_tick - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.time()
+
+        self.running = False
+        self.ring.close()
@@ -0,0 +1,147 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# ===============================
+# CONFIG (ENV SUPPORT)
+# ===============================
+load_dotenv()
+
+BASE_PATH = Path(__file__).resolve().parent
+
+PORT = os.getenv('FOOTAGE_PORT', '9090')
+LOG_PORT = os.getenv('LOG_PORT', '9091')
+CONTROL_PORT = os.getenv('CONTROL_PORT', '9092')
+# name:max_height:jpeg_quality:max_fps (0 = no limit)
+STREAM_PROFILES = os.getenv('STREAM_PROFILES', 'full:0:85:30,preview:480:70:15')
+SCAN_JPEG_QUALITY = int(os.getenv('SCAN_JPEG_QUALITY', '85'))
+REGION = os.getenv('AWS_REGION', 'us-east-1')
+IMAGE_BUCKET = os.getenv('S3_BUCKET', 'ppe-detection-images')
+
+CONFIDENCE_LEVEL = int(os.getenv('CONFIDENCE_LEVEL', '80'))
+AI_SCAN_INTERVAL = float(os.getenv('AI_SCAN_INTERVAL', '2'))
+# Adaptive scheduling around AI_SCAN_INTERVAL (see scheduler.py)
+SCAN_INTERVAL_MIN = float(os.getenv('SCAN_INTERVAL_MIN', '0.5'))
+SCAN_INTERVAL_MAX = float(os.getenv('SCAN_INTERVAL_MAX', '15'))
+SCAN_TARGET_LATENCY = float(os.getenv('SCAN_TARGET_LATENCY', '1.5'))
+# Scans per hour for the whole engine (0 = unlimited), split across
+# cameras by priority; each camera's scheduler enforces its share
+SCAN_BUDGET_PER_HOUR = float(os.getenv('SCAN_BUDGET_PER_HOUR', '0'))
+# Scans wait at least this long while every tracked person is still and
+# compliant (0 = never; needs TRACK_FLOW)
+SCAN_STABLE_INTERVAL = float(os.getenv('SCAN_STABLE_INTERVAL', '10'))
+LOG_COOLDOWN = float(os.getenv('LOG_COOLDOWN', '1.0'))
+UPLOAD_COOLDOWN = float(os.getenv('UPLOAD_COOLDOWN', '5'))
+EMAIL_COOLDOWN = float(os.getenv('EMAIL_COOLDOWN', '600'))
+SNS_TOPIC_ARN = os.getenv('SNS_TOPIC_ARN', '')
+
+# Violation digests (see alerts.py): one per camera per EMAIL_COOLDOWN,
+# the first ALERT_GATHER s after a quiet spell. ALERT_SINKS is a list of
+# sns (needs SNS_TOPIC_ARN), file:/path/alerts.jsonl, webhook:http://...
+ALERT_SINKS = os.getenv('ALERT_SINKS', 'sns')
+ALERT_GATHER = float(os.getenv('ALERT_GATHER', '5'))
+ALERT_PER_HOUR = float(os.getenv('ALERT_PER_HOUR', '60'))
+ALERT_MAX_RETRIES = int(os.getenv('ALERT_MAX_RETRIES', '5'))
+ALERT_QUEUE_SIZE = int(os.getenv('ALERT_QUEUE_SIZE', '1000'))
+
+# Account-wide Rekognition budget shared by all cameras
+REKOGNITION_TPS = float(os.getenv('REKOGNITION_TPS', '5'))
+REKOGNITION_BURST = float(os.getenv('REKOGNITION_BURST', '0')) or None
+# Open the detector's connection (and load a local model's first
+# inference) while the cameras open, so the first scan skips the handshake
+DETECTOR_PREWARM = os.getenv('DETECTOR_PREWARM', '1') == '1'
+
+# Detector backend: rekognition | local | cascade (see detectors.py).
+# LOCAL_MODEL is a YOLO-style ONNX export; LOCAL_MODEL_CLASSES maps its
+# classes in output order to PERSON/HEAD_COVER/FACE_COVER/HAND_COVER ('-'
+# ignores one). An item the model has no class for reads as not worn in
+# local mode. In cascade mode frames the local model clears at
+# CASCADE_ACCEPT% never reach Rekognition; only the items it has classes for
+# are checked, so e.g. a helmet-only model clears frames without a mask
+# check. CASCADE_FALLBACK=1 serves the local result when the cloud is
+# throttled or unreachable.
+DETECTOR = os.getenv('DETECTOR', 'rekognition')
+LOCAL_MODEL = os.getenv('LOCAL_MODEL', str(BASE_PATH / 'models' / 'ppe.onnx'))
+LOCAL_MODEL_CLASSES = os.getenv('LOCAL_MODEL_CLASSES', 'PERSON,HEAD_COVER,FACE_COVER,HAND_COVER')
+LOCAL_INPUT_SIZE = int(os.getenv('LOCAL_INPUT_SIZE', '640'))
+LOCAL_WORKERS = int(os.getenv('LOCAL_WORKERS', '2'))
+LOCAL_SCORE = float(os.getenv('LOCAL_SCORE', '0.35'))
+LOCAL_NMS = float(os.getenv('LOCAL_NMS', '0.45'))
+CASCADE_ACCEPT = float(os.getenv('CASCADE_ACCEPT', '90'))
+CASCADE_FALLBACK = os.getenv('CASCADE_FALLBACK', '1') == '1'
+
+# Evidence uploads are spooled here until S3 confirms them
+EVIDENCE_SPOOL_DIR = os.getenv('EVIDENCE_SPOOL_DIR', str(BASE_PATH / 'evidence_spool'))
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '2'))
+UPLOAD_QUEUE_SIZE = int(os.getenv('UPLOAD_QUEUE_SIZE', '64'))
+UPLOAD_MAX_RETRIES = int(os.getenv('UPLOAD_MAX_RETRIES', '5'))
+# S3 key template, see key_layout.py. Use 'violation_{stamp}_{digest}.{ext}'
+# for the old flat layout; migrate_keys.py re-keys existing flat objects.
+EVIDENCE_KEY_LAYOUT = os.getenv('EVIDENCE_KEY_LAYOUT', '{camera}/{year}/{month}/{day}/{hour}/violation_{stamp}_{digest}.{ext}')
+# Pre-roll clips: the last CLIP_PRE_ROLL s of CLIP_PROFILE JPEGs (at most
+# CLIP_FPS, CLIP_MAX_MB per camera) plus CLIP_POST_ROLL s, uploaded as MJPEG AVI.
+# Off by default: when nobody watches CLIP_PROFILE each camera encodes those
+# JPEGs itself, up to CLIP_FPS, even while no violation is happening
+EVIDENCE_CLIPS = os.getenv('EVIDENCE_CLIPS', '0') == '1'
+CLIP_PROFILE = os.getenv('CLIP_PROFILE', 'preview')
+CLIP_PRE_ROLL = float(os.getenv('CLIP_PRE_ROLL', '5'))
+CLIP_POST_ROLL = float(os.getenv('CLIP_POST_ROLL', '3'))
+CLIP_FPS = float(os.getenv('CLIP_FPS', '10'))
+CLIP_MAX_MB = float(os.getenv('CLIP_MAX_MB', '32'))
+
+# Scene-change gate: fraction of changed pixels needed to rescan, the grey
+# level step that counts as a change, and the forced-rescan ceiling (s)
+SCENE_SENSITIVITY = float(os.getenv('SCENE_SENSITIVITY', '0.01'))
+SCENE_PIXEL_DELTA = int(os.getenv('SCENE_PIXEL_DELTA', '25'))
+SCENE_MAX_SKIP = float(os.getenv('SCENE_MAX_SKIP', '60'))
+
+# Payload preprocessing: off | downscale | crop (see roi.py)
+SCAN_PREPROCESS = os.getenv('SCAN_PREPROCESS', 'off')
+SCAN_MAX_DIM = int(os.getenv('SCAN_MAX_DIM', '960'))
+ROI_PADDING = float(os.getenv('ROI_PADDING', '0.25'))
+ROI_LOCATOR = os.getenv('ROI_LOCATOR', 'previous')
+ROI_FULL_EVERY = int(os.getenv('ROI_FULL_EVERY', '5'))
+
+# Perceptual-hash result cache, off by default (SCAN_CACHE_SIZE>0 enables
+# it). A hit serves a previous result without a scan, so a tolerance of a
+# few bits out of the 256 per hash is as far as it is safe to go.
+SCAN_CACHE_SIZE = int(os.getenv('SCAN_CACHE_SIZE', '0'))
+SCAN_CACHE_TTL = float(os.getenv('SCAN_CACHE_TTL', '30'))
+SCAN_CACHE_TOLERANCE = int(os.getenv('SCAN_CACHE_TOLERANCE', '3'))
+
+# Person tracking across scans (see tracker.py): IoU needed to keep an id,
+# scans a track may be missed, seconds before the same person counts as a
+# new violation, and optical flow to move boxes between scans
+TRACK_IOU = float(os.getenv('TRACK_IOU', '0.3'))
+TRACK_MAX_MISSES = int(os.getenv('TRACK_MAX_MISSES', '2'))
+TRACK_COOLDOWN = float(os.getenv('TRACK_COOLDOWN', '60'))
+TRACK_FLOW = os.getenv('TRACK_FLOW', '1') == '1'
+
+# FRAME_SOURCE: camera:0 | video:/path/clip.mp4 | images:/path/dir | synthetic
+FRAME_SOURCE = os.getenv('FRAME_SOURCE', 'camera:0')
+# CAMERAS: id=source[|priority],...  e.g. "dock=camera:0|2,gate=camera:1"
+CAMERAS = os.getenv('CAMERAS', f'cam0={FRAME_SOURCE}')
+FRAME_RING_SIZE = int(os.getenv('FRAME_RING_SIZE', '4'))
+HEADLESS = os.getenv('HEADLESS', '0') == '1'
+STATS_INTERVAL = float(os.getenv('STATS_INTERVAL', '30'))
+# Prometheus /metrics on METRICS_HOST:METRICS_PORT (0 disables) and a
+# "METRICS/engine" event on the log socket every METRICS_INTERVAL seconds
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+METRICS_INTERVAL = float(os.getenv('METRICS_INTERVAL', '5'))
+
+
+def parse_cameras(spec):
+    """Returns [(camera_id, source_spec, priority), ...]."""
+    cameras = []
+    for i, part in enumerate(spec.split(",")):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" not in part:
+            part = f"cam{i}={part}"
+        camera_id, _, rest = part.partition("=")
+        source, _, priority = rest.partition("|")
+        cameras.append((camera_id.strip(), source.strip(), float(priority or 1)))
+    return cameras
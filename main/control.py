@@ -0,0 +1,168 @@
+import json
+import threading
+from collections import namedtuple
+
+import zmq
+
+# ===============================
+# RUNTIME CONFIG
+# ===============================
+# Settings that can change while the engine runs. A snapshot is never
+# mutated; updates build a new one and swap it in, so readers always see
+# a consistent set by grabbing `store.current` once.
+RuntimeConfig = namedtuple("RuntimeConfig", [
+    "confidence",       # % MinConfidence for Rekognition and the overlay
+    "scan_interval",    # base seconds between scans (scheduler adapts around it)
+    "log_cooldown",     # seconds between VIOLATION log lines per camera
+    "upload_cooldown",  # seconds between evidence uploads per camera
+    "email_cooldown",   # seconds between alert digests per camera
+])
+
+# field -> (type, min, max)
+FIELDS = {
+    "confidence": (int, 1, 100),
+    "scan_interval": (float, 0.1, 3600),
+    "log_cooldown": (float, 0, 3600),
+    "upload_cooldown": (float, 0, 86400),
+    "email_cooldown": (float, 0, 86400),
+}
+
+
+def validate(updates):
+    """Coerce and range-check an update dict; raises ValueError."""
+    if not isinstance(updates, dict) or not updates:
+        raise ValueError("updates must be a non-empty object")
+    clean = {}
+    for name, value in updates.items():
+        if name not in FIELDS:
+            raise ValueError(f"unknown setting: {name}")
+        kind, low, high = FIELDS[name]
+        try:
+            value = kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be {kind.__name__}")
+        if not low <= value <= high:
+            raise ValueError(f"{name} must be between {low} and {high}")
+        clean[name] = value
+    return clean
+
+
+class ConfigStore:
+    def __init__(self, initial):
+        self.current = initial
+        self.version = 1
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def subscribe(self, callback):
+        """callback(old, new) runs after every applied update."""
+        self.listeners.append(callback)
+
+    def apply(self, updates):
+        clean = validate(updates)
+        with self.lock:
+            old = self.current
+            self.current = old._replace(**clean)
+            self.version += 1
+            new, version = self.current, self.version
+        for callback in self.listeners:
+            callback(old, new)
+        return version, clean
+
+# ===============================
+# CONTROL SERVER (REP)
+# ===============================
+class ControlServer:
+    """Answers JSON requests on a REP socket.
+
+    {"op": "get"}                         -> {"ok": true, "version": n, "config": {...}}
+    {"op": "set", "updates": {...}}       -> same, plus "applied": {...}
+    errors                                -> {"ok": false, "error": "..."}
+    """
+
+    def __init__(self, context, endpoint, store, log=None):
+        self.socket = context.socket(zmq.REP)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.bind(endpoint)
+        self.store = store
+        self.log = log or (lambda level, message: None)
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="control", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+        self.socket.close()
+
+    def handle(self, request):
+        op = request.get("op", "set")
+        applied = None
+        if op == "set":
+            _, applied = self.store.apply(request.get("updates"))
+            self.log("CONFIG", f"Applied {applied} (v{self.store.version})")
+        elif op != "get":
+            raise ValueError(f"unknown op: {op}")
+
+        reply = {"ok": True, "version": self.store.version,
+                 "config": self.store.current._asdict()}
+        if applied is not None:
+            reply["applied"] = applied
+        return reply
+
+    def _run(self):
+        while self.running:
+            if not self.socket.poll(200):
+                continue
+            raw = self.socket.recv()
+            try:
+                reply = self.handle(json.loads(raw))
+            except (ValueError, AttributeError) as e:
+                reply = {"ok": False, "error": str(e)}
+            self.socket.send_string(json.dumps(reply))
+
+# ===============================
+# CONTROL CLIENT (REQ)
+# ===============================
+class ControlClient:
+    """REQ client with a receive timeout.
+
+    A REQ socket that missed its reply is stuck, so on timeout the socket
+    is thrown away and rebuilt before the next request. Requests are
+    serialized so one client can be shared between threads.
+    """
+
+    def __init__(self, context, endpoint, timeout_ms=1500):
+        self.context = context
+        self.endpoint = endpoint
+        self.timeout_ms = timeout_ms
+        self.socket = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        self.socket = self.context.socket(zmq.REQ)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.connect(self.endpoint)
+
+    def request(self, payload):
+        """Returns the decoded reply, or None when the engine did not answer."""
+        with self.lock:
+            if self.socket is None:
+                self._connect()
+            self.socket.send_string(json.dumps(payload))
+            if self.socket.poll(self.timeout_ms):
+                return json.loads(self.socket.recv())
+            self.socket.close()
+            self.socket = None
+            return None
+
+    def get(self):
+        return self.request({"op": "get"})
+
+    def set(self, **updates):
+        return self.request({"op": "set", "updates": updates})
@@ -1,28 +1,70 @@
 import streamlit as st
-import zmq, base64, time, boto3, json, pandas as pd, os
+import zmq, base64, time, json, pandas as pd, os
 from datetime import datetime, date
-from botocore.exceptions import NoCredentialsError, ClientError
 from pathlib import Path
 
 
+from aws_health import AwsHealth, AwsSession
+from control import ControlClient
+from events import format_event
+from feed import FeedReceiver
+from janitor import BucketInventory, Janitor
+from key_layout import KeyLayout, PARTITIONED_LAYOUT
+from log_sink import BufferedLogSink, CsvLogSink
+
+
+# Footage topics are "<camera>/<profile>" on the engine's XPUB socket
+ENGINE_HOST = os.getenv("ENGINE_HOST", "localhost")
+# Same variables the engine binds from (see config.py)
+FOOTAGE_PORT = os.getenv("FOOTAGE_PORT", "9090")
+LOG_PORT = os.getenv("LOG_PORT", "9091")
+CONTROL_PORT = os.getenv("CONTROL_PORT", "9092")
+CAMERA_ID = os.getenv("CAMERA_ID", "cam0")
+VIDEO_TOPIC = f"{CAMERA_ID}/preview".encode()
+VIDEO_FPS = float(os.getenv("VIDEO_FPS", "15"))
+# Log events are topic "<LEVEL>/<camera>"; comma-separated prefixes,
+# e.g. "VIOLATION/,ERROR/" (empty = everything)
+LOG_TOPICS = [t.strip().encode() for t in os.getenv("LOG_TOPICS", "").split(",")]
+
+
 @st.cache_resource
 def get_sockets():
     ctx = zmq.Context()
     v_sock = ctx.socket(zmq.SUB)
-    v_sock.setsockopt(zmq.SUBSCRIBE, b"")
-    v_sock.setsockopt(zmq.CONFLATE, 1)
-    v_sock.connect("tcp://localhost:9090")
+    # Only the downscaled preview is encoded for us; CONFLATE does not
+    # support multipart messages, so keep the queue short and drain instead
+    v_sock.setsockopt(zmq.SUBSCRIBE, VIDEO_TOPIC)
+    v_sock.setsockopt(zmq.RCVHWM, 2)
+    v_sock.connect(f"tcp://{ENGINE_HOST}:{FOOTAGE_PORT}")
 
     l_sock = ctx.socket(zmq.SUB)
-    l_sock.setsockopt(zmq.SUBSCRIBE, b"")
-    l_sock.connect("tcp://localhost:9091")
+    # Pipeline metrics arrive on the same socket whatever LOG_TOPICS says
+    for topic in LOG_TOPICS + [b"METRICS/"]:
+        l_sock.setsockopt(zmq.SUBSCRIBE, topic)
+    l_sock.connect(f"tcp://{ENGINE_HOST}:{LOG_PORT}")
     return v_sock, l_sock
 
 
+@st.cache_resource(show_spinner=False)
+def get_control():
+    return ControlClient(zmq.Context.instance(), f"tcp://{ENGINE_HOST}:{CONTROL_PORT}")
+
+
 # --- 1. INITIALIZATION & LOCAL PERSISTENCE ---
 
 IMAGE_BUCKET = "ppe-detection-images"
 
+# Bucket inventory is listed in the background and cached on disk
+INVENTORY_REFRESH = float(os.getenv("INVENTORY_REFRESH", "60"))
+INVENTORY_FULL_SYNC = float(os.getenv("INVENTORY_FULL_SYNC", "900"))
+JANITOR_WORKERS = int(os.getenv("JANITOR_WORKERS", "8"))
+# Must match the engine's key template (see key_layout.py)
+EVIDENCE_KEY_LAYOUT = os.getenv("EVIDENCE_KEY_LAYOUT", PARTITIONED_LAYOUT)
+# AWS probes run in the background; reruns only read the cached results
+AWS_IDENTITY_TTL = float(os.getenv("AWS_IDENTITY_TTL", "300"))
+AWS_BUCKET_TTL = float(os.getenv("AWS_BUCKET_TTL", "30"))
+AWS_MAX_POOL = int(os.getenv("AWS_MAX_POOL", "16"))
+
 # Setup the paths for background saving
 # DOWNLOADS_PATH = os.path.join(os.path.expanduser("~"), "Downloads")
 # BASE_PATH = r"D:\GRD"
@@ -33,6 +75,20 @@ BASE_PATH = Path(__file__).resolve().parent
 LOG_TXT = BASE_PATH / "logs.txt"
 LOG_CSV = BASE_PATH / "logs.csv"
 
+# Archive rotation: "size" (LOG_MAX_MB) or "daily"; rotated files are gzipped
+LOG_ROTATE = os.getenv("LOG_ROTATE", "size")
+LOG_MAX_MB = float(os.getenv("LOG_MAX_MB", "10"))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "10"))
+
+
+@st.cache_resource(show_spinner=False)
+def get_log_sinks():
+    """One long-lived, buffered writer per archive, shared by all reruns."""
+    options = dict(rotate=LOG_ROTATE, max_bytes=int(LOG_MAX_MB * 1024 * 1024), backups=LOG_BACKUPS)
+    txt_sink = BufferedLogSink(LOG_TXT, **options)
+    csv_sink = CsvLogSink(LOG_CSV, ["Time", "Level", "User", "Event"], **options)
+    return txt_sink, csv_sink
+
 # Web state always starts empty (Current session only)
 if "log_history" not in st.session_state:
     st.session_state.log_history = []
@@ -45,13 +101,15 @@ if "sys_active" not in st.session_state:
 
 if "applied_threshold" not in st.session_state:
     st.session_state.applied_threshold = 80
+    st.session_state.engine_config = {}
+    # Start from what the engine is actually running with, if it is up
+    reply = get_control().get()
+    if reply and reply.get("ok"):
+        st.session_state.engine_config = reply["config"]
+        st.session_state.applied_threshold = reply["config"]["confidence"]
 
-
-    if "video_recvs" not in st.session_state:
-        st.session_state.video_recvs = 0
-        st.session_state.fps_counter = 0
-        st.session_state.last_fps_time = time.time()
-        st.session_state.fps = 0.0
+if "engine_metrics" not in st.session_state:
+    st.session_state.engine_metrics = []
 
 
 def add_event(level, user, msg):
@@ -64,36 +122,76 @@ def add_event(level, user, msg):
     st.session_state.log_history = st.session_state.log_history[:15]
 
     # Append to Local CSV (Archive)
-    df_new = pd.DataFrame([new_entry])
-    df_new.to_csv(LOG_CSV, mode="a", index=False, header=not os.path.exists(LOG_CSV))
+    get_log_sinks()[1].write_row(new_entry)
 
 
-# --- 2. AWS IDENTITY CHECK ---
+@st.cache_resource(show_spinner=False)
+def get_aws():
+    # One session and pooled clients for every rerun and the janitor.
+    # AWS_ENDPOINT_URL_S3 points S3 at a local stand-in.
+    return AwsSession(max_pool=max(AWS_MAX_POOL, JANITOR_WORKERS + 2))
+
+
+@st.cache_resource(show_spinner=False)
+def get_aws_health():
+    health = AwsHealth(get_aws(), IMAGE_BUCKET, identity_ttl=AWS_IDENTITY_TTL, bucket_ttl=AWS_BUCKET_TTL)
+    health.start()
+    return health
+
+
+@st.cache_resource(show_spinner=False)
+def get_janitor():
+    s3_client = get_aws().client("s3")
+    inventory = BucketInventory(
+        s3_client, IMAGE_BUCKET, cache_path=BASE_PATH / "s3_inventory.json",
+        refresh_interval=INVENTORY_REFRESH, full_interval=INVENTORY_FULL_SYNC,
+        layout=KeyLayout(EVIDENCE_KEY_LAYOUT),
+    )
+    inventory.start()
+    get_aws_health().inventory = inventory
+    return Janitor(s3_client, IMAGE_BUCKET, inventory, workers=JANITOR_WORKERS)
+
+
+def janitor_progress(label):
+    bar = st.sidebar.progress(0.0, text=label)
+    return lambda done, total: bar.progress(done / total, text=f"{label} {done}/{total}")
+
+
+def report_cleanup(kind, label, report):
+    """Log and display a DeleteReport."""
+    if report.failed:
+        code = report.failed[0][1]
+        st.sidebar.warning(f"⚠️ Deleted {report.deleted}/{report.requested}, {len(report.failed)} failed ({code})")
+        add_event("⚠️ ERROR", user_identity,
+                  f"{label}: {len(report.failed)} of {report.requested} deletes failed ({code})")
+    else:
+        st.sidebar.success(f"✅ Deleted {report.deleted} files")
+    if report.deleted:
+        add_event(kind, user_identity, f"{label}: deleted {report.deleted} files in {report.seconds}s")
 
-aws_status_message = "🔴 AWS DISCONNECTED"
-user_identity = "Unknown User"
-account_id = "0000-0000-0000"
-aws_ready = False
-badge_color = "#ff4b4b"
-s3 = None
 
-try:
-    sts = boto3.client("sts")
-    identity = sts.get_caller_identity()
-    account_id = identity.get("Account")
-    user_identity = identity.get("Arn").split("/")[-1]
+# --- 2. AWS IDENTITY CHECK ---
 
-    s3 = boto3.client("s3")
-    s3.head_bucket(Bucket=IMAGE_BUCKET)
+def aws_status(health):
+    """(status message, badge colour) from a cached health snapshot."""
+    bucket = health["bucket"]
+    if health["checking"]:
+        return "⚪ CHECKING AWS...", "#888888"
+    if bucket["ok"] and not bucket["stale"]:
+        return "🟢 **SECURE CONNECTION**", "#00ff00"
+    if health["no_credentials"]:
+        return "🟡 CONFIG AWS CREDENTIALS", "#ffcc00"
+    if bucket["age"] is not None:
+        return f"🟠 AWS UNREACHABLE (last OK {bucket['age']:.0f}s ago): {(bucket['error'] or '')[:60]}", "#ff9900"
+    return f"🔴 AWS DISCONNECTED: {(bucket['error'] or '')[:60]}", "#ff4b4b"
 
-    aws_ready = True
-    aws_status_message = "🟢 **SECURE CONNECTION**"
-    badge_color = "#00ff00"
 
-except Exception as e:
-    aws_ready = False
-    if "NoCredentialsError" in str(type(e)):
-        aws_status_message = "🟡 CONFIG AWS CREDENTIALS"
+health = get_aws_health().snapshot()
+identity = health["identity"]["value"] or {}
+user_identity = identity.get("user") or "Unknown User"
+account_id = identity.get("account") or "0000-0000-0000"
+aws_ready = health["bucket"]["ok"]
+aws_status_message, badge_color = aws_status(health)
 
 
 st.set_page_config(page_title="PPE Tactical Command", layout="wide")
@@ -112,13 +210,19 @@ with h_col3:
         <div style="background-color: #1e2129; padding: 10px; border-radius: 5px; border-left: 5px solid {badge_color};">
         <p style="margin:0; font-size: 12px; color: #888;">CURRENT OPERATOR:</p>
         <p style="margin:0; font-weight: bold; color: #fff;">👤 {user_identity}</p>
-        <p style="margin:0; font-size: 10px; color: #555;">ID: {account_id}</p>
+        <p style="margin:0; font-size: 10px; color: #555;">ID: {account_id}{" (cached)" if identity and health["identity"]["stale"] else ""}</p>
         </div>
         """,
         unsafe_allow_html=True,
     )
 
-st.write(aws_status_message)
+status_area = st.empty()
+status_area.write(aws_status_message)
+if not aws_ready and not health["checking"]:
+    if st.button("Retry AWS connection"):
+        get_aws_health().refresh()
+        time.sleep(1.0)
+        st.rerun()
 
 
 # --- 4. SIDEBAR: INDUSTRIAL CONTROLS ---
@@ -144,6 +248,8 @@ if c2.button(
     if st.session_state.sys_active:
         st.session_state.sys_active = False
         add_event("⚙️ STOP", user_identity, "Engine Halted")
+        for sink in get_log_sinks():
+            sink.flush()
         st.rerun()
 
 st.sidebar.header("AI SENSITIVITY")
@@ -154,12 +260,37 @@ new_val = st.sidebar.slider(
 if new_val != st.session_state.applied_threshold:
     st.sidebar.warning(f"⚠️ Pending: {new_val}%")
 
+def push_config(**updates):
+    """Send settings to the engine; returns True once it acknowledged them."""
+    reply = get_control().set(**updates)
+    if reply is None:
+        st.sidebar.error("❌ ENGINE DID NOT ACKNOWLEDGE")
+        add_event("⚠️ ERROR", user_identity, f"Config {updates} not acknowledged by engine")
+        return False
+    if not reply.get("ok"):
+        st.sidebar.error(f"🚫 REJECTED: {reply.get('error')}")
+        add_event("⚠️ ERROR", user_identity, f"Config rejected: {reply.get('error')}")
+        return False
+    st.session_state.engine_config = reply["config"]
+    add_event("🎯 CONFIG", user_identity, f"Applied {reply['applied']} (engine ack v{reply['version']})")
+    return True
+
+
 if st.sidebar.button("✅ CONFIRM SETTING", use_container_width=True, type="primary"):
-    st.session_state.applied_threshold = new_val
-    # Send to main.py via CSV
-    pd.DataFrame({'confidence': [new_val]}).to_csv('threshold.csv', index=False)
-    add_event("🎯 CONFIG", user_identity, f"AI Threshold updated to {new_val}% (sent to main.py)")
-    st.rerun()
+    if push_config(confidence=new_val):
+        st.session_state.applied_threshold = new_val
+        st.rerun()
+
+with st.sidebar.expander("SCAN TIMING"):
+    cfg = st.session_state.engine_config
+    t_scan = st.number_input("Scan interval (s)", 0.1, 3600.0, float(cfg.get("scan_interval", 2.0)))
+    t_log = st.number_input("Log cooldown (s)", 0.0, 3600.0, float(cfg.get("log_cooldown", 1.0)))
+    t_upload = st.number_input("Upload cooldown (s)", 0.0, 86400.0, float(cfg.get("upload_cooldown", 5.0)))
+    t_email = st.number_input("Email cooldown (s)", 0.0, 86400.0, float(cfg.get("email_cooldown", 600.0)))
+    if st.button("APPLY TIMING", use_container_width=True):
+        if push_config(scan_interval=t_scan, log_cooldown=t_log,
+                       upload_cooldown=t_upload, email_cooldown=t_email):
+            st.rerun()
 
 
 # --- 5. STORAGE JANITOR ---
@@ -168,21 +299,27 @@ st.sidebar.markdown("---")
 st.sidebar.header("STORAGE JANITOR")
 
 current_files = 0
+janitor = None
 if aws_ready:
-    try:
-        res = s3.list_objects_v2(Bucket=IMAGE_BUCKET)
-        current_files = res.get("KeyCount", 0)
-    except:
-        pass
-
-st.sidebar.metric("S3 Bucket Load", f"{current_files} Files")
+    janitor = get_janitor()
+    inv = janitor.inventory.stats()
+    current_files = inv["objects"]
+    st.sidebar.metric("S3 Bucket Load", f"{current_files} Files", f"{inv['bytes'] / 1e6:.1f} MB", delta_color="off")
+    if inv["error"]:
+        st.sidebar.caption(f"⚠️ Inventory sync failed: {inv['error'][:80]}")
+    elif inv["age"] is None:
+        st.sidebar.caption("Inventory syncing...")
+    else:
+        st.sidebar.caption(f"Inventory synced {inv['age']:.0f}s ago")
+else:
+    st.sidebar.metric("S3 Bucket Load", f"{current_files} Files")
 
 jan_mode = st.sidebar.selectbox(
     "Cleanup Mode", ["Retention (By Number)", "Purge (By Date)"]
 )
 
 if "Retention" in jan_mode:
-    n_del = st.sidebar.number_input("Delete Count", 1, 5000, 5)
+    n_del = st.sidebar.number_input("Delete Count", 1, 1000000, 5)
 
     if st.sidebar.button("Execute Cleanup", use_container_width=True):
         if not aws_ready:
@@ -197,17 +334,9 @@ if "Retention" in jan_mode:
             )
         else:
             try:
-                res = s3.list_objects_v2(Bucket=IMAGE_BUCKET)
-                if 'Contents' in res:
-                    files = sorted(res['Contents'], key=lambda x: x['LastModified'])
-                    to_delete = [{'Key': f['Key']} for f in files[:n_del]]
-                    if to_delete:
-                        s3.delete_objects(Bucket=IMAGE_BUCKET, Delete={'Objects': to_delete})
-                        deleted_count = min(n_del, len(to_delete))
-                        add_event("🧹 CLEANUP", user_identity, f"Deleted {deleted_count} oldest files from S3")
-                        st.sidebar.success(f"✅ Deleted {deleted_count} files")
-                    else:
-                        st.sidebar.warning("No files to delete")
+                report = janitor.delete_oldest(n_del, progress=janitor_progress("Deleting"))
+                if report.requested:
+                    report_cleanup("🧹 CLEANUP", "Retention", report)
                 else:
                     st.sidebar.warning("Bucket empty")
             except Exception as e:
@@ -235,34 +364,11 @@ else:
                 )
             else:
                 try:
-                    # List all files first to debug
-                    res = s3.list_objects_v2(Bucket=IMAGE_BUCKET, MaxKeys=100)
-                    st.sidebar.write(f"Total files: {res.get('KeyCount', 0)}")
-                    keys = [obj['Key'] for obj in res.get('Contents', [])]
-                    st.sidebar.write(f"Keys preview: {keys[:3]}")
-                    
-                    prefix = f"{start.strftime('%Y/%m/%d')}/"
-                    to_delete = []
-                    paginator = s3.get_paginator('list_objects_v2')
-                    pages = paginator.paginate(Bucket=IMAGE_BUCKET, Prefix=prefix)
-                    for page in pages:
-                        if 'Contents' in page:
-                            to_delete.extend([{'Key': obj['Key']} for obj in page['Contents']])
-                    
-                    st.sidebar.write(f"Matching prefix '{prefix}': {len(to_delete)} files")
-                    
-                    if to_delete:
-                        s3.delete_objects(Bucket=IMAGE_BUCKET, Delete={'Objects': to_delete[:1000]})
-                        deleted_count = len(to_delete)
-                        add_event(
-                            "🔥 PURGE",
-                            user_identity,
-                            f"Purged {deleted_count} files matching '{prefix}'",
-                        )
-                        st.sidebar.success(f"✅ Purged {deleted_count} files")
-                        st.rerun()
+                    report = janitor.purge_dates(start, end, progress=janitor_progress("Purging"))
+                    if report.requested:
+                        report_cleanup("🔥 PURGE", f"Purge {start}..{end}", report)
                     else:
-                        st.sidebar.warning(f"No files matching '{prefix}'. Check date format.")
+                        st.sidebar.warning(f"No evidence from {start}..{end}")
                 except Exception as e:
                     st.sidebar.error(f"S3 purge failed: {str(e)[:100]}")
                     add_event("❌ ERROR", user_identity, f"S3 date purge failed: {str(e)}")
@@ -333,47 +439,69 @@ if st.session_state.sys_active:
     console_area = st.empty()
     console_area.code(st.session_state.raw_console, language="bash")
 
+    feed_stats_area = st.empty()
+
+    with st.expander("PIPELINE METRICS"):
+        metrics_area = st.empty()
+
     v_sock, l_sock = get_sockets()
+    feed = FeedReceiver(v_sock, l_sock, target_fps=VIDEO_FPS)
 
     last_table_update = time.time()
 
     while st.session_state.sys_active:
-        try:
-            v_msg = v_sock.recv(zmq.NOBLOCK)
-            vid_area.image(v_msg, use_container_width=True)
-        except:
-            pass
+        batch = feed.poll(timeout_ms=50)
+
+        if batch.frame is not None:
+            vid_area.image(batch.frame, use_container_width=True)
+
+        events = []
+        for event in batch.events:
+            if event.get("level") == "METRICS":
+                st.session_state.engine_metrics = event.get("stages") or []
+            else:
+                events.append(event)
 
-        try:
-            raw_log = l_sock.recv_string(zmq.NOBLOCK)
-            st.session_state.raw_console += raw_log + "\n"
+        if events:
+            lines = [format_event(event) for event in events]
+            chunk = "\n".join(lines) + "\n"
+            st.session_state.raw_console += chunk
 
-            with open(LOG_TXT, "a") as f:
-                f.write(raw_log + "\n")
+            get_log_sinks()[0].write_many(lines)
 
             if len(st.session_state.raw_console) > 5000:
                 st.session_state.raw_console = st.session_state.raw_console[-5000:]
 
             console_area.code(st.session_state.raw_console, language="bash")
 
-            if "VIOLATION" in raw_log:
+            violations = [e for e in events if e.get("level") == "VIOLATION"]
+            if violations:
                 # Cooldown for table spam
                 if "last_violation" not in st.session_state:
                     st.session_state.last_violation = 0
                 now = time.time()
                 if now - st.session_state.last_violation > 10:  # 10s cooldown
-                    add_event("🚨 ALERT", user_identity, "PPE Violation Detected")
+                    latest = violations[-1]
+                    missing = ", ".join(latest.get("missing") or [])
+                    add_event("🚨 ALERT", user_identity,
+                              f"PPE Violation Detected [{latest.get('camera')}] {missing}".strip())
                     st.session_state.last_violation = now
 
-        except:
-            pass
-
         if time.time() - last_table_update > 1.0:
             event_table.table(st.session_state.log_history)
+            status_area.write(aws_status(get_aws_health().snapshot())[0])
+            fs = feed.stats()
+            feed_stats_area.caption(
+                f"Feed {fs['refresh_fps']} fps | frames {fs['frames_out']}/{fs['frames_in']} shown | "
+                f"logs {fs['logs_in']} in {fs['console_updates']} updates | backlog {fs['backlog']} (max {fs['max_backlog']})"
+            )
+            if st.session_state.engine_metrics:
+                metrics_area.dataframe(pd.DataFrame(st.session_state.engine_metrics),
+                                       hide_index=True, use_container_width=True)
+            else:
+                metrics_area.caption("Waiting for engine metrics...")
             last_table_update = time.time()
 
-        time.sleep(0.01)
-
 else:
     st.markdown(
         """
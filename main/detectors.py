@@ -0,0 +1,400 @@
+import contextlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import config
+from analysis import analyze_ppe
+from metrics import STAGE_SECONDS, IN_FLIGHT, ERRORS, ENGINE
+
+# ===============================
+# DETECTOR BACKENDS
+# ===============================
+# Every backend exposes
+#
+#   detect(image_bytes, min_confidence, camera=ENGINE, timeout=None) -> response
+#   prewarm() -> True when the backend answered
+#
+# and returns a detect_protective_equipment-shaped dict (Persons ->
+# BodyParts -> EquipmentDetections, normalized BoundingBoxes, Summary), so
+# analyze_ppe, ScanResult, the ROI remapping and the scan cache work the
+# same whichever one produced it.
+#
+#   rekognition - the cloud API, under the shared TPS budget
+#   local       - an ONNX person + PPE model on the CPU (see LocalDetector)
+#   cascade     - local first; only frames it cannot clear go to the cloud
+REQUIRED_EQUIPMENT = ["HEAD_COVER", "FACE_COVER", "HAND_COVER"]
+
+# A bare JPEG start/end marker: Rekognition rejects it before any analysis
+WARMUP_JPEG = b"\xff\xd8\xff\xd9"
+
+
+class RateLimited(Exception):
+    """No Rekognition token within the caller's timeout."""
+
+
+class ModelUnavailable(Exception):
+    """The local model file is missing or cannot be loaded by either runtime."""
+
+
+def summarize(persons, min_confidence):
+    """Rekognition-style Summary for a list of persons."""
+    summary = {"PersonsWithRequiredEquipment": [], "PersonsWithoutRequiredEquipment": [],
+               "PersonsIndeterminate": []}
+    for p in persons:
+        ok = all(c >= min_confidence for c in analyze_ppe(p).values())
+        summary["PersonsWithRequiredEquipment" if ok else "PersonsWithoutRequiredEquipment"].append(p["Id"])
+    return summary
+
+
+class RekognitionDetector:
+    """detect_protective_equipment behind the shared token bucket.
+
+    `limiter` is the engine's SharedRateLimiter (each camera registered
+    with it); `concurrency` optionally caps calls in flight, which batch
+    jobs use on top of the TPS budget.
+    """
+
+    name = "rekognition"
+
+    def __init__(self, client=None, limiter=None, concurrency=None):
+        if client is None:
+            import boto3
+            client = boto3.client("rekognition", region_name=config.REGION)
+        self.client = client
+        self.limiter = limiter
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self.calls = 0
+
+    def detect(self, image_bytes, min_confidence, camera=ENGINE, timeout=None):
+        # Stay inside the account-wide TPS quota; the caller decides how
+        # long a scan may queue behind other cameras
+        if self.limiter and not self.limiter.acquire(camera, timeout=timeout):
+            raise RateLimited(camera)
+
+        with self.slots or contextlib.nullcontext():
+            t0 = time.time()
+            try:
+                with IN_FLIGHT.track("rekognition"):
+                    self.calls += 1
+                    return self.client.detect_protective_equipment(
+                        Image={'Bytes': image_bytes},
+                        SummarizationAttributes={
+                            'MinConfidence': min_confidence,
+                            'RequiredEquipmentTypes': REQUIRED_EQUIPMENT,
+                        }
+                    )
+            except Exception:
+                ERRORS.inc("rekognition", camera)
+                raise
+            finally:
+                STAGE_SECONDS.observe(time.time() - t0, "rekognition", camera)
+
+    def prewarm(self):
+        """Resolve credentials and open the TLS connection ahead of the first scan.
+
+        Sends WARMUP_JPEG outside the token bucket; the service's
+        InvalidImageFormat answer still means the round trip worked.
+        """
+        try:
+            self.client.detect_protective_equipment(Image={'Bytes': WARMUP_JPEG})
+        except Exception as e:
+            return getattr(e, "response", None) is not None  # botocore ClientError
+        return True
+
+    def stats(self):
+        return {"calls": self.calls}
+
+    def close(self):
+        pass
+
+# ===============================
+# LOCAL CPU MODEL
+# ===============================
+# Body part each local PPE class is reported under
+COVER_PARTS = {"HEAD_COVER": "HEAD", "FACE_COVER": "FACE", "HAND_COVER": "HAND"}
+
+
+class LocalDetector:
+    """YOLO-style ONNX person + PPE detector run on a small worker pool.
+
+    `classes` names what each model class means, in output order:
+    PERSON, HEAD_COVER, FACE_COVER, HAND_COVER, or "-" for classes to
+    ignore, e.g. "HEAD_COVER,-,PERSON,-" for a helmet/no-helmet/person/vest
+    model. Both YOLOv5 (box, objectness, scores) and YOLOv8 (box, scores)
+    output layouts are accepted. Equipment boxes are attached to the
+    person they overlap most, and each becomes a body part with one
+    EquipmentDetection, so a missing item reads as confidence 0 exactly
+    like a Rekognition body part with nothing on it. `covers` lists the
+    required items the model has a class for; an item it has none for
+    always reads as 0.
+
+    Uses onnxruntime when installed (one session shared by the workers),
+    otherwise one cv2.dnn network per worker thread.
+    """
+
+    name = "local"
+
+    def __init__(self, model_path, classes, input_size=640, workers=2, score=0.35, nms=0.45):
+        self.model_path = model_path
+        self.roles = [c.strip().upper() for c in classes.split(",")]
+        if "PERSON" not in self.roles:
+            raise ValueError(f"LOCAL_MODEL_CLASSES needs a PERSON class: {classes}")
+        self.covers = [e for e in REQUIRED_EQUIPMENT if e in self.roles]
+        self.input_size = input_size
+        self.score = score
+        self.nms = nms
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="local-detect")
+        self.nets = threading.local()
+        self.calls = 0
+
+        # Imported here: onnxruntime costs startup time when unused
+        try:
+            import onnxruntime as ort
+        except ImportError:  # OpenCV's DNN module runs the same ONNX file
+            ort = None
+
+        # Load up front so a missing or broken model fails at startup, as
+        # one error type whichever runtime raised it (onnxruntime's own
+        # NoSuchFile/InvalidProtobuf/Fail are plain Exceptions)
+        try:
+            if ort:
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = 1
+                self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+                self.input_name = self.session.get_inputs()[0].name
+            else:
+                self.session = None
+                self.nets.net = cv2.dnn.readNetFromONNX(model_path)
+        except Exception as e:
+            self.pool.shutdown(wait=False)
+            raise ModelUnavailable(f"{model_path}: {str(e).strip()[:200]}") from e
+
+    def _forward(self, blob):
+        if self.session:
+            return self.session.run(None, {self.input_name: blob})[0]
+        net = getattr(self.nets, "net", None)
+        if net is None:
+            net = self.nets.net = cv2.dnn.readNetFromONNX(self.model_path)
+        net.setInput(blob)
+        return net.forward()
+
+    def _infer(self, image_bytes, min_confidence):
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("undecodable image")
+        h, w = image.shape[:2]
+
+        # Letterbox into the square model input
+        size = self.input_size
+        scale = size / max(h, w)
+        resized = cv2.resize(image, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+        padded = np.full((size, size, 3), 114, np.uint8)
+        padded[:resized.shape[0], :resized.shape[1]] = resized
+        blob = cv2.dnn.blobFromImage(padded, 1 / 255.0, (size, size), swapRB=True)
+
+        boxes, scores, roles = self.parse(self._forward(blob), scale)
+        return self.to_response(boxes / [w, h, w, h], scores, roles, min_confidence)
+
+    def parse(self, output, scale):
+        """Raw model output -> (boxes x1,y1,x2,y2 in pixels, scores 0-1, roles) after NMS."""
+        out = np.squeeze(np.asarray(output, np.float32))
+        n = len(self.roles)
+        if out.ndim != 2:
+            raise ValueError(f"unexpected model output shape {np.shape(output)}")
+        if out.shape[0] in (4 + n, 5 + n) and out.shape[1] not in (4 + n, 5 + n):
+            out = out.T  # YOLOv8 exports channels first
+        if out.shape[1] == 5 + n:
+            class_scores = out[:, 5:] * out[:, 4:5]
+        elif out.shape[1] == 4 + n:
+            class_scores = out[:, 4:]
+        else:
+            raise ValueError(f"model output {out.shape} does not match {n} classes")
+
+        cls = class_scores.argmax(axis=1)
+        conf = class_scores[np.arange(len(cls)), cls]
+        keep = conf >= self.score
+        cls, conf = cls[keep], conf[keep]
+        if not len(conf):
+            return np.zeros((0, 4), np.float32), conf, []
+        cx, cy, bw, bh = (out[keep, :4] / scale).T
+        xywh = np.stack([cx - bw / 2, cy - bh / 2, bw, bh], axis=1)
+
+        picked = cv2.dnn.NMSBoxesBatched(xywh.tolist(), conf.tolist(), cls.tolist(), self.score, self.nms)
+        picked = np.asarray(picked, np.int64).reshape(-1)
+        xyxy = xywh[picked].copy()
+        xyxy[:, 2:] += xyxy[:, :2]
+        return xyxy, conf[picked], [self.roles[c] for c in cls[picked]]
+
+    def to_response(self, boxes, scores, roles, min_confidence):
+        """Normalized boxes -> detect_protective_equipment-shaped response."""
+        boxes = np.clip(boxes, 0.0, 1.0)
+        people = [i for i, r in enumerate(roles) if r == "PERSON"]
+        persons = [{
+            "Id": pid,
+            "BoundingBox": _box(boxes[i]),
+            "Confidence": round(float(scores[i]) * 100, 2),
+            "BodyParts": [],
+        } for pid, i in enumerate(people)]
+
+        for i, role in enumerate(roles):
+            part = COVER_PARTS.get(role)
+            if part is None or not persons:
+                continue
+            # Attach to the person it overlaps most
+            x1, y1, x2, y2 = boxes[i]
+            overlap = [max(0.0, min(x2, boxes[p][2]) - max(x1, boxes[p][0])) *
+                       max(0.0, min(y2, boxes[p][3]) - max(y1, boxes[p][1])) for p in people]
+            best = int(np.argmax(overlap))
+            if not overlap[best]:
+                continue
+            body_parts = persons[best]["BodyParts"]
+            if part == "HAND":
+                hands = sum(1 for bp in body_parts if bp["Name"].endswith("_HAND"))
+                part = "LEFT_HAND" if hands % 2 == 0 else "RIGHT_HAND"
+            confidence = round(float(scores[i]) * 100, 2)
+            body_parts.append({
+                "Name": part,
+                "Confidence": confidence,
+                "EquipmentDetections": [{
+                    "BoundingBox": _box(boxes[i]),
+                    "Confidence": confidence,
+                    "Type": role,
+                    "CoversBodyPart": {"Confidence": confidence, "Value": True},
+                }],
+            })
+
+        return {
+            "ProtectiveEquipmentModelVersion": "local",
+            "Persons": persons,
+            "Summary": summarize(persons, min_confidence),
+        }
+
+    def detect(self, image_bytes, min_confidence, camera=ENGINE, timeout=None):
+        t0 = time.time()
+        try:
+            with IN_FLIGHT.track("local_detect"):
+                self.calls += 1
+                return self.pool.submit(self._infer, image_bytes, min_confidence).result()
+        except Exception:
+            ERRORS.inc("local_detect", camera)
+            raise
+        finally:
+            STAGE_SECONDS.observe(time.time() - t0, "local_detect", camera)
+
+    def prewarm(self):
+        """One inference per worker, so each cv2.dnn net is loaded and allocated."""
+        _, blank = cv2.imencode(".jpg", np.zeros((64, 64, 3), np.uint8))
+        futures = [self.pool.submit(self._infer, blank.tobytes(), 100) for _ in range(self.workers)]
+        return all(f.result() is not None for f in futures)
+
+    def stats(self):
+        return {"calls": self.calls, "runtime": "onnxruntime" if self.session else "cv2.dnn"}
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+
+def _box(xyxy):
+    x1, y1, x2, y2 = (float(v) for v in xyxy)
+    return {"Left": x1, "Top": y1, "Width": x2 - x1, "Height": y2 - y1}
+
+# ===============================
+# CASCADE
+# ===============================
+class CascadeDetector:
+    """Local model first, cloud only for frames it cannot clear.
+
+    A frame stays local when the model sees nobody, or when every person
+    it sees wears every item in `covers` at `accept` confidence or
+    better. `covers` is what the local model can detect at all (an item
+    it has no class for would otherwise send every person to the cloud);
+    a model with no cover classes escalates every frame with a person.
+    Anything else (a possible violation, a low-confidence item) is escalated so
+    alerts and evidence still rest on Rekognition. With `fallback` on,
+    a throttled or unreachable cloud returns the local answer instead of
+    failing the scan, which keeps a site checking through WAN outages.
+    """
+
+    name = "cascade"
+
+    def __init__(self, local, remote, accept=90.0, fallback=True, log=None, covers=REQUIRED_EQUIPMENT):
+        self.local = local
+        self.remote = remote
+        self.covers = list(covers)
+        self.accept = accept
+        self.fallback = fallback
+        self.log = log or (lambda level, message, camera=None: None)
+        self.lock = threading.Lock()
+        self.cloud_down = False
+        self.counts = {"local": 0, "escalated": 0, "fallback": 0}
+
+    def _count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def needs_cloud(self, response, min_confidence):
+        threshold = max(self.accept, min_confidence)
+        for p in response.get("Persons", []):
+            found = analyze_ppe(p)
+            if not self.covers or min(found[c] for c in self.covers) < threshold:
+                return True
+        return False
+
+    def detect(self, image_bytes, min_confidence, camera=ENGINE, timeout=None):
+        local = self.local.detect(image_bytes, min_confidence, camera)
+        if not self.needs_cloud(local, min_confidence):
+            self._count("local")
+            return local
+
+        self._count("escalated")
+        try:
+            response = self.remote.detect(image_bytes, min_confidence, camera, timeout)
+        except Exception as e:
+            if not self.fallback:
+                raise
+            self._count("fallback")
+            if not isinstance(e, RateLimited) and not self.cloud_down:
+                self.cloud_down = True
+                self.log("WARN", f"Cloud detector unavailable, using local results: {str(e)[:60]}", camera)
+            return local
+
+        if self.cloud_down:
+            self.cloud_down = False
+            self.log("INFO", "Cloud detector reachable again", camera)
+        return response
+
+    def prewarm(self):
+        local = self.local.prewarm()
+        return self.remote.prewarm() and local
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+        stats["cloud_down"] = self.cloud_down
+        return stats
+
+    def close(self):
+        self.local.close()
+        self.remote.close()
+
+
+def make_detector(name, rekognition=None, limiter=None, concurrency=None, log=None):
+    """Backend by name: rekognition | local | cascade."""
+    if name == "rekognition":
+        return RekognitionDetector(rekognition, limiter, concurrency)
+    if name not in ("local", "cascade"):
+        raise ValueError(f"Unknown detector: {name}")
+
+    local = LocalDetector(
+        config.LOCAL_MODEL, config.LOCAL_MODEL_CLASSES, config.LOCAL_INPUT_SIZE,
+        config.LOCAL_WORKERS, config.LOCAL_SCORE, config.LOCAL_NMS,
+    )
+    if name == "local":
+        return local
+    return CascadeDetector(local, RekognitionDetector(rekognition, limiter, concurrency),
+                           config.CASCADE_ACCEPT, config.CASCADE_FALLBACK, log, local.covers)
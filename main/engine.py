@@ -0,0 +1,241 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import zmq
+
+import config
+from alerts import AlertDispatcher, make_sinks
+from control import ConfigStore, ControlServer, RuntimeConfig
+from detectors import ModelUnavailable, make_detector
+from key_layout import KeyLayout
+from metrics import MetricsServer, STARTUP_SECONDS, summary
+from pipeline import CameraPipeline
+from ratelimit import SharedRateLimiter
+from startup import STARTUP
+from streaming import FootageHub, LogPublisher
+from uploader import EvidenceUploader
+
+# ===============================
+# AWS CLIENTS
+# ===============================
+def make_clients(aws, max_pool=10):
+    """(s3, rekognition, sns); `aws` may supply stand-ins for any of them."""
+    names = ("s3", "rekognition", "sns")
+    if all(aws.get(name) for name in names):
+        return tuple(aws[name] for name in names)
+    # boto3 is the slowest import in the engine; it only loads here, on
+    # the init thread, and the clients share one pooled session
+    from aws_health import AwsSession
+    session = AwsSession(config.REGION, max_pool=max_pool)
+    return tuple(aws.get(name) or session.client(name) for name in names)
+
+# ===============================
+# DETECTION ENGINE
+# ===============================
+class Engine:
+    """Runs one CameraPipeline per configured camera.
+
+    Pipelines run on their own threads; capture, resize, JPEG encoding
+    and the boto3 network calls all release the GIL, so threads spread
+    across cores without the IPC a process pool would need for the shared
+    sockets and rate limiter. Every camera publishes on the same two
+    sockets under its own topic prefix ("<camera>/preview", ...) and
+    scans through one detector backend, whose Rekognition calls draw from
+    one account-wide token bucket.
+    """
+
+    def __init__(self, cameras, aws=None):
+        self.context = zmq.Context()
+        with STARTUP.phase("sockets"):
+            self.footage_hub = FootageHub.bind(self.context, f"tcp://*:{config.PORT}")
+            self.log_pub = LogPublisher.bind(self.context, f"tcp://*:{config.LOG_PORT}")
+
+        # Live-tunable settings, updated over the control socket
+        self.settings = ConfigStore(RuntimeConfig(
+            confidence=config.CONFIDENCE_LEVEL,
+            scan_interval=config.AI_SCAN_INTERVAL,
+            log_cooldown=config.LOG_COOLDOWN,
+            upload_cooldown=config.UPLOAD_COOLDOWN,
+            email_cooldown=config.EMAIL_COOLDOWN,
+        ))
+        self.settings.subscribe(self.on_settings)
+        self.control = ControlServer(
+            self.context, f"tcp://*:{config.CONTROL_PORT}", self.settings, log=self.log
+        )
+        self.limiter = SharedRateLimiter(config.REKOGNITION_TPS, config.REKOGNITION_BURST)
+
+        # Cold start: the boto3 import, the AWS clients and the detector
+        # (model load, connection pre-warm) are set up on an init thread
+        # while start() opens the cameras; pipelines stream from their
+        # first frame and begin scanning once `ready` is set.
+        self.detector = self.uploader = self.alerts = None
+        self.ready = threading.Event()
+        self.init_pool = ThreadPoolExecutor(max_workers=len(cameras) + 2, thread_name_prefix="init")
+        self.aws_init = self.init_pool.submit(
+            self.init_aws, aws or {}, max(10, len(cameras) + config.UPLOAD_WORKERS)
+        )
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(2, len(cameras)), thread_name_prefix="scan"
+        )
+        # SCAN_BUDGET_PER_HOUR is for the whole engine; each camera's
+        # scheduler gets a share in proportion to its priority
+        total_priority = sum(priority for _, _, priority in cameras) or 1.0
+        self.pipelines = [
+            CameraPipeline(self, camera_id, source, priority,
+                           scan_budget=config.SCAN_BUDGET_PER_HOUR * priority / total_priority)
+            for camera_id, source, priority in cameras
+        ]
+        self.metrics_server = None
+        self.startup_reported = False
+
+    def init_aws(self, aws, max_pool):
+        """Clients, detector, uploader and alert dispatcher; runs on the init pool."""
+        with STARTUP.phase("aws_clients"):
+            self.s3_client, self.rekognition, self.sns = make_clients(aws, max_pool)
+
+        with STARTUP.phase("detector"):
+            try:
+                self.detector = make_detector(config.DETECTOR, self.rekognition, self.limiter, log=self.log)
+            except (ModelUnavailable, ValueError) as e:
+                # A missing or unreadable local model must not take the site down
+                self.log("ERROR", f"Detector '{config.DETECTOR}' unavailable ({str(e)[:80]}), using rekognition")
+                self.detector = make_detector("rekognition", self.rekognition, self.limiter)
+
+        self.uploader = EvidenceUploader(
+            self.s3_client, config.IMAGE_BUCKET, config.EVIDENCE_SPOOL_DIR,
+            workers=config.UPLOAD_WORKERS, queue_size=config.UPLOAD_QUEUE_SIZE,
+            max_retries=config.UPLOAD_MAX_RETRIES,
+            layout=KeyLayout(config.EVIDENCE_KEY_LAYOUT), log=self.log,
+        )
+
+        # Violation digests go out from their own thread (see alerts.py)
+        self.alerts = AlertDispatcher(
+            make_sinks(config.ALERT_SINKS, self.sns, config.SNS_TOPIC_ARN),
+            window=self.settings.current.email_cooldown, gather=config.ALERT_GATHER,
+            per_hour=config.ALERT_PER_HOUR, max_retries=config.ALERT_MAX_RETRIES,
+            queue_size=config.ALERT_QUEUE_SIZE, log=self.log,
+        )
+        self.uploader.start()
+        self.alerts.start()
+        self.ready.set()
+
+        if config.DETECTOR_PREWARM:
+            self.init_pool.submit(self.prewarm)
+
+    def prewarm(self):
+        try:
+            with STARTUP.phase("prewarm"):
+                warm = self.detector.prewarm()
+        except Exception as e:
+            self.log("WARN", f"Detector pre-warm failed: {str(e)[:80]}")
+            return
+        if not warm:
+            self.log("WARN", f"Detector {self.detector.name} did not answer the pre-warm call")
+
+    def log(self, level, message, camera=None, **fields):
+        self.log_pub.log(level, message, camera, **fields)
+
+    @property
+    def confidence(self):
+        return self.settings.current.confidence
+
+    def on_settings(self, old, new):
+        if self.alerts:
+            self.alerts.window = new.email_cooldown
+        if new.scan_interval != old.scan_interval:
+            for p in self.pipelines:
+                p.scheduler.base = new.scan_interval
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if config.METRICS_PORT:
+            try:
+                self.metrics_server = MetricsServer(config.METRICS_HOST, config.METRICS_PORT)
+                self.metrics_server.start()
+            except OSError as e:
+                self.log("ERROR", f"Metrics endpoint unavailable: {e}")
+        self.control.start()
+
+        # Opening a camera can take seconds; open them all at once, in
+        # parallel with init_aws, then wait for the AWS side to finish
+        with STARTUP.phase("cameras"):
+            opened = list(self.init_pool.map(CameraPipeline.start, self.pipelines))
+        if not any(opened):
+            self.log("ERROR", "Failed to initialize any frame source")
+            return False
+        try:
+            self.aws_init.result()
+        except Exception as e:
+            self.log("ERROR", f"Engine initialization failed: {type(e).__name__}: {str(e)[:120]}")
+            return False
+        return True
+
+    def report_startup(self):
+        self.startup_reported = True
+        for step, seconds in STARTUP.flat().items():
+            STARTUP_SECONDS.set(round(seconds, 3), step)
+        self.log("INFO", "Startup: " + STARTUP.report(), startup=STARTUP.snapshot())
+
+    def log_stats(self):
+        up = self.uploader.stats()
+        self.log("INFO", f"Uploads {up['uploaded']}/{up['submitted']} | queued {up['queued']} | retries {up['retries']} | failed {up['failed']}")
+        rl = self.limiter.stats()
+        self.log("INFO", f"Rekognition budget {rl['rate']:g} TPS | granted {rl['granted']}")
+        al = self.alerts.stats()
+        if al["sinks"]:
+            self.log("INFO", f"Alerts {','.join(al['sinks'])}: digests {al['digests']} | sent {al['sent']} | retries {al['retries']} | failed {al['failed']} | dropped {al['dropped']}")
+        det = self.detector.stats()
+        self.log("INFO", f"Detector {self.detector.name}: " + " | ".join(f"{k} {v}" for k, v in det.items()))
+
+    def publish_metrics(self):
+        self.log_pub.publish("METRICS", "pipeline metrics", stages=summary())
+
+    def run(self, headless=False):
+        """Blocks until every pipeline stops or 'q' is pressed."""
+        last_stats = last_metrics = started = time.time()
+        while any(p.running for p in self.pipelines):
+            now = time.time()
+            if not self.startup_reported and (
+                    STARTUP.reached("first_scan", [p.camera_id for p in self.pipelines if p.running])
+                    or now - started > config.STATS_INTERVAL):
+                self.report_startup()
+            if now - last_stats > config.STATS_INTERVAL:
+                self.log_stats()
+                last_stats = now
+            if now - last_metrics > config.METRICS_INTERVAL:
+                self.publish_metrics()
+                last_metrics = now
+
+            if headless:
+                time.sleep(0.2)
+                continue
+
+            # HighGUI must be driven from the main thread
+            for p in self.pipelines:
+                if p.view is not None:
+                    cv2.imshow(f"PPE System - {p.camera_id}", p.view)
+            if cv2.waitKey(30) & 0xFF == ord('q'):
+                break
+
+    def stop(self, headless=False):
+        for p in self.pipelines:
+            p.stop()
+        self.init_pool.shutdown(wait=True)
+        if self.ready.is_set():
+            self.uploader.stop()
+            self.alerts.stop()
+        self.control.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if not headless:
+            cv2.destroyAllWindows()
+        self.executor.shutdown(wait=True)
+        if self.detector:
+            self.detector.close()
+        self.log("STOP", "System shutdown complete")
+        self.footage_hub.close()
+        self.log_pub.close()
+        self.context.term()
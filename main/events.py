@@ -0,0 +1,56 @@
+import json
+import time
+from datetime import datetime
+
+try:
+    import msgpack
+except ImportError:  # JSON fallback keeps the protocol usable without it
+    msgpack = None
+
+# ===============================
+# EVENT PROTOCOL (LOG SOCKET)
+# ===============================
+# Every message on the log socket is two frames:
+#   [b"<LEVEL>/<camera>", payload]
+# so subscribers filter on the publisher side with plain prefix
+# subscriptions: b"VIOLATION/" for every camera's violations,
+# b"VIOLATION/dock" for one camera, b"" for everything.
+#
+# The payload is a msgpack map (a JSON object when msgpack is missing;
+# decode_event tells them apart by the first byte) with at least:
+#   ts, level, camera, message
+# and, depending on the event, typed extras such as
+#   missing: ["HEAD", ...]  confidences: {"HEAD": 91.2, ...}  persons: 3
+
+ENGINE = "engine"
+
+
+def event_topic(level, camera=None):
+    return f"{level}/{camera or ENGINE}".encode()
+
+
+def encode_event(event):
+    if msgpack is not None:
+        return msgpack.packb(event, use_bin_type=True)
+    return json.dumps(event, separators=(",", ":")).encode()
+
+
+def decode_event(payload):
+    if payload[:1] == b"{" or msgpack is None:
+        return json.loads(payload)
+    return msgpack.unpackb(payload, raw=False)
+
+
+def make_event(level, message, camera=None, **fields):
+    event = {"ts": time.time(), "level": level, "camera": camera or ENGINE, "message": message}
+    event.update(fields)
+    return event
+
+
+def format_event(event):
+    """Human console line, same layout the engine prints."""
+    now = datetime.fromtimestamp(event.get("ts", time.time())).strftime("%H:%M:%S")
+    message = event.get("message", "")
+    if event.get("camera", ENGINE) != ENGINE:
+        message = f"[{event['camera']}] {message}"
+    return f"{now} || {event.get('level', '').center(7)} || {message}"
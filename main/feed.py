@@ -0,0 +1,119 @@
+import time
+from collections import namedtuple
+
+import zmq
+
+from events import decode_event
+
+# ===============================
+# DASHBOARD RECEIVE STAGE
+# ===============================
+Batch = namedtuple("Batch", ["frame", "events"])
+
+
+class FeedReceiver:
+    """Drains the footage and log sockets and batches UI work.
+
+    Each `poll` waits on both sockets at once, then empties whatever is
+    queued on each. Only the newest frame is kept and it is handed out at
+    most `target_fps` times a second. Log events are decoded (see
+    events.py) and handed out together at most every `console_interval`
+    seconds, so a burst of a thousand events costs one console repaint.
+    """
+
+    def __init__(self, v_sock, l_sock, target_fps=15, console_interval=0.25):
+        self.v_sock = v_sock
+        self.l_sock = l_sock
+        self.frame_interval = 1.0 / target_fps if target_fps else 0
+        self.console_interval = console_interval
+
+        self.poller = zmq.Poller()
+        self.poller.register(v_sock, zmq.POLLIN)
+        self.poller.register(l_sock, zmq.POLLIN)
+
+        self.frame = None
+        self.logs = []
+        self.last_frame_out = 0
+        self.last_logs_out = 0
+
+        # stats
+        self.started = time.time()
+        self.frames_in = 0
+        self.frames_out = 0
+        self.logs_in = 0
+        self.bad_events = 0
+        self.console_updates = 0
+        self.backlog = 0
+        self.max_backlog = 0
+        self.window_start = time.time()
+        self.window_frames = 0
+        self.refresh_fps = 0.0
+
+    def _drain(self, sock):
+        items = []
+        while True:
+            try:
+                items.append(sock.recv_multipart(zmq.NOBLOCK))
+            except zmq.Again:
+                return items
+
+    def _decode(self, parts):
+        events = []
+        for part in parts:
+            try:
+                event = decode_event(part[-1])
+            except (ValueError, TypeError):
+                event = None
+            if isinstance(event, dict):
+                events.append(event)
+            else:
+                self.bad_events += 1
+        return events
+
+    def poll(self, timeout_ms=50):
+        events = dict(self.poller.poll(timeout_ms))
+
+        if self.v_sock in events:
+            frames = self._drain(self.v_sock)
+            if frames:
+                self.frame = frames[-1][-1]
+                self.frames_in += len(frames)
+        if self.l_sock in events:
+            events = self._decode(self._drain(self.l_sock))
+            self.logs.extend(events)
+            self.logs_in += len(events)
+
+        self.backlog = len(self.logs) + (self.frame is not None)
+        self.max_backlog = max(self.max_backlog, self.backlog)
+
+        now = time.time()
+        frame = None
+        if self.frame is not None and now - self.last_frame_out >= self.frame_interval:
+            frame, self.frame = self.frame, None
+            self.last_frame_out = now
+            self.frames_out += 1
+            self.window_frames += 1
+
+        logs = []
+        if self.logs and now - self.last_logs_out >= self.console_interval:
+            logs, self.logs = self.logs, []
+            self.last_logs_out = now
+            self.console_updates += 1
+
+        if now - self.window_start >= 1.0:
+            self.refresh_fps = self.window_frames / (now - self.window_start)
+            self.window_start, self.window_frames = now, 0
+
+        return Batch(frame, logs)
+
+    def stats(self):
+        return {
+            "refresh_fps": round(self.refresh_fps, 1),
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "logs_in": self.logs_in,
+            "bad_events": self.bad_events,
+            "console_updates": self.console_updates,
+            "backlog": self.backlog,
+            "max_backlog": self.max_backlog,
+        }
@@ -0,0 +1,294 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+# ===============================
+# BUCKET INVENTORY
+# ===============================
+S3Object = namedtuple("S3Object", ["key", "size", "modified"])  # modified: epoch seconds
+
+DeleteReport = namedtuple("DeleteReport", [
+    "requested",   # keys asked for
+    "deleted",     # keys S3 confirmed
+    "failed",      # [(key, code, message)]
+    "batches",
+    "seconds",
+])
+
+DELETE_BATCH = 1000  # DeleteObjects hard limit
+
+
+class BucketInventory:
+    """Locally cached listing of a bucket, kept fresh in the background.
+
+    A full sync walks every ListObjectsV2 page. In between, an incremental
+    sync lists only what can have been written since the last one: with a
+    partitioned `layout` that is the current hour partitions, otherwise
+    the keys after the newest one already known (StartAfter), which works
+    because flat evidence keys sort by capture time. Objects removed
+    behind our back only disappear on the next full sync, every
+    `full_interval` seconds. The cache is saved to `cache_path` so a
+    restarted dashboard has counts straight away.
+    """
+
+    def __init__(self, s3_client, bucket, prefix="", cache_path=None,
+                 refresh_interval=60.0, full_interval=900.0, layout=None, log=None):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.layout = layout
+        self.cache_path = str(cache_path) if cache_path else None
+        self.refresh_interval = refresh_interval
+        self.full_interval = full_interval
+        self.log = log or (lambda level, message: None)
+
+        self.objects = {}
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.synced_at = 0
+        self.full_synced_at = 0
+        self.last_error = None
+        self.pages = 0
+        self.running = False
+        self.thread = None
+
+        self._load()
+
+    # ---------- persistence ----------
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("bucket") != self.bucket or data.get("prefix") != self.prefix:
+                return
+            self.objects = {k: S3Object(k, s, m) for k, s, m in data["objects"]}
+            self.synced_at = data.get("synced_at", 0)
+            self.full_synced_at = data.get("full_synced_at", 0)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.log("ERROR", f"Inventory cache unreadable, resyncing: {e}")
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        with self.lock:
+            data = {
+                "bucket": self.bucket,
+                "prefix": self.prefix,
+                "synced_at": self.synced_at,
+                "full_synced_at": self.full_synced_at,
+                "objects": [list(o) for o in self.objects.values()],
+            }
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.cache_path)
+
+    # ---------- listing ----------
+    def _list(self, prefix, start_after=None):
+        paginator = self.s3.get_paginator("list_objects_v2")
+        kwargs = {"Bucket": self.bucket, "Prefix": prefix}
+        if start_after:
+            kwargs["StartAfter"] = start_after
+        for page in paginator.paginate(**kwargs):
+            self.pages += 1
+            for obj in page.get("Contents", []):
+                yield S3Object(obj["Key"], obj["Size"], obj["LastModified"].timestamp())
+
+    def cameras(self):
+        """Camera names under a camera-first layout (one delimiter listing)."""
+        root = self.layout.prefix()
+        paginator = self.s3.get_paginator("list_objects_v2")
+        names = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=root, Delimiter="/"):
+            self.pages += 1
+            names.extend(p["Prefix"][len(root):].rstrip("/") for p in page.get("CommonPrefixes", []))
+        return names
+
+    def _list_prefixes(self, prefixes):
+        """List `prefixes` and make the cache exact for them."""
+        listed = {o.key: o for prefix in prefixes for o in self._list(prefix)}
+        prefixes = tuple(prefixes)
+        with self.lock:
+            for key in [k for k in self.objects if k.startswith(prefixes) and k not in listed]:
+                del self.objects[key]
+            self.objects.update(listed)
+        return list(listed.values())
+
+    def _range_cameras(self):
+        return self.cameras() if self.layout.camera_first else None
+
+    def _recent_prefixes(self, now):
+        """Partitions an incremental sync lists; [] means use StartAfter."""
+        if self.layout is None or not self.layout.partitioned:
+            return []
+        since = min(self.synced_at, now - 3600)
+        return self.layout.recent_prefixes(since, now, self._range_cameras())
+
+    def refresh(self, full=None):
+        """Sync with S3; returns the number of objects known afterwards."""
+        with self.sync_lock:
+            now = time.time()
+            if full is None:
+                full = not self.objects or now - self.full_synced_at >= self.full_interval
+            try:
+                prefixes = [] if full else self._recent_prefixes(now)
+                if full:
+                    listed = {o.key: o for o in self._list(self.prefix)}
+                    with self.lock:
+                        self.objects = listed
+                    self.full_synced_at = now
+                elif prefixes:
+                    self._list_prefixes(prefixes)
+                else:
+                    with self.lock:
+                        newest = max(self.objects) if self.objects else None
+                    listed = list(self._list(self.prefix, newest))
+                    with self.lock:
+                        self.objects.update((o.key, o) for o in listed)
+                self.synced_at = now
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                self.log("ERROR", f"Inventory sync failed: {e}")
+                return len(self.objects)
+            try:
+                self._save()
+            except OSError as e:
+                self.log("ERROR", f"Inventory cache not saved: {e}")
+            return len(self.objects)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="inventory", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            self.refresh()
+            deadline = time.time() + self.refresh_interval
+            while self.running and time.time() < deadline:
+                time.sleep(0.5)
+
+    # ---------- queries ----------
+    def snapshot(self):
+        with self.lock:
+            return list(self.objects.values())
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.objects.pop(key, None)
+
+    def count(self):
+        return len(self.objects)
+
+    def total_bytes(self):
+        return sum(o.size for o in self.snapshot())
+
+    def oldest(self, n):
+        return sorted(self.snapshot(), key=lambda o: (o.modified, o.key))[:n]
+
+    def list_range(self, start, end):
+        """Objects for local dates start..end, listed fresh from S3.
+
+        With a partitioned layout only the matching day prefixes are
+        listed; otherwise, or when a camera-first bucket has no camera
+        prefixes yet (flat keys only), this falls back to the cached
+        inventory.
+        """
+        if self.layout is None or not self.layout.partitioned:
+            return self.between(start, end)
+        prefixes = self.layout.day_prefixes(start, end, self._range_cameras())
+        if not prefixes:
+            return self.between(start, end)
+        return self._list_prefixes(prefixes)
+
+    def between(self, start, end):
+        """Objects last modified on dates start..end (inclusive)."""
+        low = datetime.combine(start, datetime.min.time()).timestamp()
+        high = datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp()
+        return [o for o in self.snapshot() if low <= o.modified < high]
+
+    def stats(self):
+        return {
+            "objects": self.count(),
+            "bytes": self.total_bytes(),
+            "age": round(time.time() - self.synced_at, 1) if self.synced_at else None,
+            "pages": self.pages,
+            "error": self.last_error,
+        }
+
+# ===============================
+# STORAGE JANITOR
+# ===============================
+class Janitor:
+    """Bulk deletes against a bucket, keeping an inventory in step.
+
+    Keys are split into 1000-key DeleteObjects batches that run on a
+    small thread pool. Per-key errors reported by S3 and batches that fail
+    outright are collected instead of aborting the run, so the report
+    always says exactly what was and was not deleted.
+    """
+
+    def __init__(self, s3_client, bucket, inventory=None, workers=8, log=None):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.inventory = inventory
+        self.workers = workers
+        self.log = log or (lambda level, message: None)
+
+    def _delete_batch(self, keys):
+        try:
+            res = self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True},
+            )
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code", type(e).__name__)
+            return [], [(k, code, str(e)) for k in keys]
+        errors = [(err.get("Key"), err.get("Code"), err.get("Message")) for err in res.get("Errors", [])]
+        failed = {key for key, _, _ in errors}
+        return [k for k in keys if k not in failed], errors
+
+    def delete(self, keys, progress=None):
+        """Delete `keys`; progress(done, total) runs on the calling thread."""
+        started = time.time()
+        keys = list(dict.fromkeys(keys))
+        batches = [keys[i:i + DELETE_BATCH] for i in range(0, len(keys), DELETE_BATCH)]
+        deleted, failed, done = [], [], 0
+
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(batches)),
+                                    thread_name_prefix="janitor") as pool:
+                futures = {pool.submit(self._delete_batch, batch): batch for batch in batches}
+                for future in as_completed(futures):
+                    ok, errors = future.result()
+                    deleted.extend(ok)
+                    failed.extend(errors)
+                    done += len(futures[future])
+                    if self.inventory is not None:
+                        self.inventory.discard(ok)
+                    if progress:
+                        progress(done, len(keys))
+
+        if failed:
+            self.log("ERROR", f"Janitor: {len(failed)} of {len(keys)} deletes failed ({failed[0][1]})")
+        return DeleteReport(len(keys), len(deleted), failed, len(batches),
+                            round(time.time() - started, 2))
+
+    def delete_oldest(self, n, progress=None):
+        return self.delete([o.key for o in self.inventory.oldest(n)], progress)
+
+    def purge_dates(self, start, end, progress=None):
+        return self.delete([o.key for o in self.inventory.list_range(start, end)], progress)
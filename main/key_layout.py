@@ -0,0 +1,132 @@
+import re
+import string
+from datetime import datetime, timedelta
+
+# ===============================
+# EVIDENCE KEY LAYOUT
+# ===============================
+# Templates use str.format fields:
+#   camera, year, month, day, hour, stamp (YYYYmmdd_HHMMSS), digest, ext
+# Time fields are local time, matching the dashboard's date pickers.
+FLAT_LAYOUT = "violation_{stamp}_{digest}.{ext}"
+PARTITIONED_LAYOUT = "{camera}/{year}/{month}/{day}/{hour}/violation_{stamp}_{digest}.{ext}"
+
+FIELDS = ("camera", "year", "month", "day", "hour", "stamp", "digest", "ext")
+
+# Keys written before partitioning (with or without the content hash)
+LEGACY_KEY = re.compile(r"^violation_(\d{8}_\d{6})(?:_[0-9a-f]+)?\.\w+$")
+
+
+def time_fields(when):
+    return {
+        "year": f"{when.year:04d}",
+        "month": f"{when.month:02d}",
+        "day": f"{when.day:02d}",
+        "hour": f"{when.hour:02d}",
+        "stamp": when.strftime("%Y%m%d_%H%M%S"),
+    }
+
+
+class KeyLayout:
+    """Builds evidence keys and the prefixes that cover a time range.
+
+    A prefix is the template rendered up to the first field that is not
+    known, so with the partitioned layout a day in the range maps to
+    "cam0/2026/05/14/" and a purge or listing touches only those prefixes
+    instead of the whole bucket.
+    """
+
+    def __init__(self, template=PARTITIONED_LAYOUT):
+        self.template = template
+        self.parts = list(string.Formatter().parse(template))
+        self.fields = [field for _, field, _, _ in self.parts if field is not None]
+        unknown = set(self.fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"unknown key layout fields: {', '.join(sorted(unknown))}")
+
+    def key(self, camera, timestamp, digest, ext="jpg"):
+        values = time_fields(datetime.fromtimestamp(timestamp))
+        return self.template.format(camera=camera or "default", digest=digest, ext=ext, **values)
+
+    def prefix(self, **values):
+        out = []
+        for literal, field, _, _ in self.parts:
+            out.append(literal)
+            if field is None:
+                continue
+            if values.get(field) is None:
+                break
+            out.append(str(values[field]))
+        return "".join(out)
+
+    @property
+    def partitioned(self):
+        """True when keys are grouped under per-day prefixes."""
+        if "day" not in self.fields:
+            return False
+        day = self.fields.index("day")
+        return all(f in ("camera", "year", "month") for f in self.fields[:day])
+
+    @property
+    def camera_first(self):
+        """True when listing a day means enumerating camera prefixes first."""
+        return self.partitioned and "camera" in self.fields and \
+            self.fields.index("camera") < self.fields.index("day")
+
+    def partition(self, camera, timestamp):
+        """Directory a key for this camera/time lands in (no stamp/digest)."""
+        values = time_fields(datetime.fromtimestamp(timestamp))
+        values.pop("stamp")
+        return self.directory(self.prefix(camera=camera or "default", **values))
+
+    @staticmethod
+    def directory(prefix):
+        return prefix[:prefix.rfind("/") + 1]
+
+    def day_prefixes(self, start, end, cameras=None):
+        """Prefixes covering local dates start..end (inclusive).
+
+        A camera-first layout with no `cameras` has no prefixes: rendering
+        one without a camera would give "", which is the whole bucket.
+        """
+        if self.camera_first and not cameras:
+            return []
+        prefixes = []
+        day = start
+        while day <= end:
+            values = {"year": f"{day.year:04d}", "month": f"{day.month:02d}", "day": f"{day.day:02d}"}
+            for camera in (cameras or [None]):
+                prefixes.append(self.prefix(camera=camera, **values))
+            day += timedelta(days=1)
+        return list(dict.fromkeys(prefixes))
+
+    def recent_prefixes(self, since, now, cameras=None):
+        """Hour (or day) partitions written to between two timestamps.
+
+        Empty for a camera-first layout with no `cameras`, as day_prefixes.
+        """
+        if self.camera_first and not cameras:
+            return []
+        step = timedelta(hours=1) if "hour" in self.fields else timedelta(days=1)
+        when = datetime.fromtimestamp(since).replace(minute=0, second=0, microsecond=0)
+        if step.days:
+            when = when.replace(hour=0)
+        end = datetime.fromtimestamp(now)
+        prefixes = []
+        while when <= end:
+            values = time_fields(when)
+            values.pop("stamp")
+            if step.days:
+                values.pop("hour")
+            for camera in (cameras or [None]):
+                prefixes.append(self.directory(self.prefix(camera=camera, **values)))
+            when += step
+        return list(dict.fromkeys(prefixes))
+
+    def legacy_target(self, key, camera):
+        """New key for a flat legacy key, or None if it is not one."""
+        match = LEGACY_KEY.match(key)
+        if not match:
+            return None
+        taken = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+        return self.partition(camera, taken.timestamp()) + key
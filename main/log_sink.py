@@ -0,0 +1,167 @@
+import atexit
+import csv
+import gzip
+import io
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+# ===============================
+# BUFFERED LOG SINK
+# ===============================
+class BufferedLogSink:
+    """Append-only text archive with batching and rotation.
+
+    Lines are buffered in memory and written through one long-lived file
+    handle when `flush_lines` are pending or `flush_interval` seconds have
+    passed (a background thread covers quiet periods). The file rotates
+    when it would exceed `max_bytes` or, with rotate="daily", when the
+    date changes. Rotated files get a timestamp suffix, are optionally
+    gzipped in the background, and only the newest `backups` are kept.
+    """
+
+    def __init__(self, path, flush_interval=1.0, flush_lines=200, rotate="size",
+                 max_bytes=10 * 1024 * 1024, backups=10, compress=True):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.flush_lines = flush_lines
+        self.rotate = rotate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+
+        self.lock = threading.Lock()
+        self.rotation_lock = threading.Lock()
+        self.buffer = []
+        self.handle = None
+        self.opened_on = None
+        self.last_flush = time.time()
+        self.closed = False
+
+        self.lines_written = 0
+        self.flushes = 0
+        self.rotations = 0
+
+        self._open()
+        self.flusher = threading.Thread(target=self._flush_loop, name=f"sink-{self.path.name}", daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    # ---------- file handling ----------
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(self.path, "a", encoding="utf-8", newline="")
+        self.opened_on = date.today()
+        if self.handle.tell() == 0:
+            self._on_new_file()
+
+    def _on_new_file(self):
+        pass
+
+    def _should_rotate(self, pending):
+        if self.rotate == "daily":
+            return date.today() != self.opened_on and self.handle.tell() > 0
+        return self.max_bytes and self.handle.tell() + pending > self.max_bytes and self.handle.tell() > 0
+
+    def _rotate(self):
+        self.handle.close()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        rotated = self.path.with_name(f"{self.path.name}.{stamp}")
+        n = 0
+        while rotated.exists() or Path(f"{rotated}.gz").exists():
+            n += 1
+            rotated = self.path.with_name(f"{self.path.name}.{stamp}-{n}")
+        os.replace(self.path, rotated)
+        self.rotations += 1
+        self._open()
+        threading.Thread(target=self._finish_rotation, args=(rotated,), daemon=True).start()
+
+    def _finish_rotation(self, rotated):
+        with self.rotation_lock:
+            if self.compress and rotated.exists():
+                with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(rotated)
+            if not self.backups:
+                return
+            old = sorted(self.path.parent.glob(f"{self.path.name}.*"), key=os.path.getmtime)
+            for path in old[:-self.backups]:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    # ---------- writing ----------
+    def write(self, line):
+        self.write_many([line])
+
+    def write_many(self, lines):
+        with self.lock:
+            if self.closed:
+                return
+            self.buffer.extend(lines)
+            due = (len(self.buffer) >= self.flush_lines
+                   or time.time() - self.last_flush >= self.flush_interval)
+            if due:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        self.last_flush = time.time()
+        if not self.buffer:
+            return
+        data = "".join(line if line.endswith("\n") else line + "\n" for line in self.buffer)
+        if self._should_rotate(len(data)):
+            self._rotate()
+        self.handle.write(data)
+        self.handle.flush()
+        self.lines_written += len(self.buffer)
+        self.buffer = []
+        self.flushes += 1
+
+    def flush(self):
+        with self.lock:
+            if not self.closed:
+                self._flush_locked()
+
+    def _flush_loop(self):
+        while not self.closed:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self._flush_locked()
+            self.closed = True
+            self.handle.close()
+
+    def stats(self):
+        return {
+            "pending": len(self.buffer),
+            "lines_written": self.lines_written,
+            "flushes": self.flushes,
+            "rotations": self.rotations,
+        }
+
+
+class CsvLogSink(BufferedLogSink):
+    """BufferedLogSink for dict rows; writes the header on every new file."""
+
+    def __init__(self, path, fieldnames, **kwargs):
+        self.fieldnames = list(fieldnames)
+        super().__init__(path, **kwargs)
+
+    def _format(self, values):
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerow(values)
+        return out.getvalue()
+
+    def _on_new_file(self):
+        self.handle.write(self._format(self.fieldnames))
+
+    def write_row(self, row):
+        self.write(self._format([row.get(f, "") for f in self.fieldnames]))
@@ -0,0 +1,233 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ===============================
+# INSTRUMENTS
+# ===============================
+# Cheap enough for the per-frame path: one lock, one bisect, two adds.
+# Every instrument is keyed by a tuple of label values in `labels` order.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def series(self):
+        with self.lock:
+            return dict(self.values)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, *label_values):
+        with self.lock:
+            self.values[label_values] = value
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def track(self, *label_values):
+        """Context manager counting calls currently inside the block."""
+        return _InFlight(self, label_values)
+
+
+class _InFlight:
+    def __init__(self, gauge, label_values):
+        self.gauge = gauge
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.gauge.inc(*self.label_values)
+
+    def __exit__(self, *exc):
+        self.gauge.dec(*self.label_values)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            row = self.values.get(label_values)
+            if row is None:
+                row = self.values[label_values] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def time(self, *label_values):
+        """Context manager observing the block's duration in seconds."""
+        return _Timer(self, label_values)
+
+    def series(self):
+        with self.lock:
+            return {k: list(v) for k, v in self.values.items()}
+
+    def quantile(self, row, q):
+        """Estimate a quantile from bucket counts (linear within a bucket)."""
+        counts = row[:-1]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                low = self.buckets[i - 1] if i else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.t0, *self.label_values)
+
+# ===============================
+# REGISTRY & EXPORT
+# ===============================
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labels, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for label_values, value in sorted(metric.series().items()):
+                labels = [f'{k}="{v}"' for k, v in zip(metric.labels, label_values)]
+                if metric.kind != "histogram":
+                    lines.append(f"{metric.name}{_labels(labels)} {value:g}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else f"{bound:g}"
+                    bucket_labels = labels + [f'le="{le}"']
+                    lines.append(f"{metric.name}_bucket{_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_labels(labels)} {value[-1]:.6f}")
+                lines.append(f"{metric.name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs):
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+REGISTRY = Registry()
+
+# ===============================
+# PIPELINE METRICS
+# ===============================
+# stage: capture, encode_<profile>, publish, scan_submit, rekognition, local_detect,
+#        s3_upload, alert_<sink>
+STAGE_SECONDS = REGISTRY.histogram("ppe_stage_seconds", "Time spent per pipeline stage", ("stage", "camera"))
+IN_FLIGHT = REGISTRY.gauge("ppe_in_flight", "Calls currently in progress", ("stage",))
+ERRORS = REGISTRY.counter("ppe_errors_total", "Failed calls per stage", ("stage", "camera"))
+# step: startup phases (aws_clients, cameras, prewarm, ...) and milestones (first_frame, first_scan)
+STARTUP_SECONDS = REGISTRY.gauge("ppe_startup_seconds", "Engine cold start timings", ("step",))
+
+ENGINE = "engine"  # camera label for shared stages
+
+
+def summary():
+    """Compact per-stage view for the ZMQ metrics topic and the dashboard."""
+    in_flight = IN_FLIGHT.series()
+    errors = ERRORS.series()
+    rows = []
+    for (stage, camera), row in sorted(STAGE_SECONDS.series().items()):
+        count = sum(row[:-1])
+        p50, p95 = STAGE_SECONDS.quantile(row, 0.5), STAGE_SECONDS.quantile(row, 0.95)
+        rows.append({
+            "stage": stage,
+            "camera": camera,
+            "count": count,
+            "mean_ms": round(row[-1] / count * 1000, 2) if count else None,
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "in_flight": in_flight.get((stage,), 0),
+            "errors": errors.get((stage, camera), 0),
+        })
+    return rows
+
+
+class MetricsServer:
+    """Serves REGISTRY on http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, host, port, registry=REGISTRY):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
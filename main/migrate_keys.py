@@ -0,0 +1,92 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import boto3
+
+import config
+from janitor import Janitor
+from key_layout import KeyLayout
+
+# ===============================
+# FLAT -> PARTITIONED KEY MIGRATION
+# ===============================
+# Re-keys evidence written with the old flat layout
+# (violation_YYYYmmdd_HHMMSS[_digest].jpg at the bucket root) into the
+# configured EVIDENCE_KEY_LAYOUT. Copies are server-side (CopyObject), run
+# in parallel, and a source is deleted only after its copy succeeded, so
+# the tool can be interrupted and simply run again.
+#
+#   python migrate_keys.py --camera cam0 --dry-run
+#   python migrate_keys.py --camera cam0 --workers 32
+
+
+def legacy_keys(s3, bucket):
+    """Root-level keys only; the delimiter skips everything already partitioned."""
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Delimiter="/"):
+        for obj in page.get("Contents", []):
+            yield obj["Key"]
+
+
+def copy(s3, bucket, source, target):
+    s3.copy_object(Bucket=bucket, Key=target, CopySource={"Bucket": bucket, "Key": source})
+    return source
+
+
+def migrate(s3, bucket, layout, camera, workers=16, dry_run=False, keep_source=False, log=print):
+    started = time.time()
+    plan, skipped = [], 0
+    for key in legacy_keys(s3, bucket):
+        target = layout.legacy_target(key, camera)
+        if target is None or target == key:
+            skipped += 1
+            continue
+        plan.append((key, target))
+
+    log(f"{len(plan)} objects to migrate, {skipped} skipped")
+    if dry_run:
+        for key, target in plan[:10]:
+            log(f"  {key} -> {target}")
+        return len(plan), 0, []
+
+    copied, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="migrate") as pool:
+        futures = {pool.submit(copy, s3, bucket, key, target): key for key, target in plan}
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                copied.append(future.result())
+            except Exception as e:
+                failed.append((futures[future], str(e)))
+            if i % 1000 == 0 or i == len(plan):
+                log(f"  copied {len(copied)}/{len(plan)} ({len(failed)} failed)")
+
+    if copied and not keep_source:
+        report = Janitor(s3, bucket, workers=workers).delete(copied)
+        log(f"Deleted {report.deleted}/{report.requested} sources in {report.batches} batches")
+        failed.extend((key, f"{code}: {message}") for key, code, message in report.failed)
+
+    for key, error in failed[:10]:
+        log(f"  FAILED {key}: {error[:80]}")
+    log(f"Done in {time.time() - started:.1f}s")
+    return len(plan), len(copied), failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-key flat evidence objects into the partitioned layout")
+    parser.add_argument("--bucket", default=config.IMAGE_BUCKET)
+    parser.add_argument("--layout", default=config.EVIDENCE_KEY_LAYOUT)
+    parser.add_argument("--camera", default="cam0", help="camera id for objects that predate multi-camera keys")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--keep-source", action="store_true", help="copy only, leave the flat keys in place")
+    args = parser.parse_args()
+
+    s3 = boto3.client("s3", region_name=config.REGION)
+    _, _, failed = migrate(s3, args.bucket, KeyLayout(args.layout), args.camera,
+                           workers=args.workers, dry_run=args.dry_run, keep_source=args.keep_source)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import threading
+import time
+
+import config
+from alerts import Violation
+from analysis import ScanResult, OverlayRenderer
+from capture import open_source, FrameRing, RingReader, CaptureThread
+from detectors import RateLimited
+from roi import ScanPreprocessor, FULL_FRAME, remap_response
+from scan_cache import ScanCache
+from scene import SceneChangeGate
+from scheduler import AdaptiveScanScheduler
+from startup import STARTUP
+from tracker import PersonTracker
+from metrics import STAGE_SECONDS
+from preroll import ClipRecorder
+from streaming import parse_profiles
+
+# ===============================
+# STATE
+# ===============================
+class State:
+    def __init__(self):
+        self.latest_res = None
+        self.latest = None          # ScanResult built from latest_res
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.last_log_time = 0
+        self.last_upload_time = 0
+        self.violation_count = 0
+
+# ===============================
+# CAMERA PIPELINE
+# ===============================
+class CameraPipeline:
+    """Capture -> stream -> gated scan -> overlay for one camera.
+
+    Everything camera-specific (frame ring, stream topics, scene gate,
+    scan cache, latest result) lives here; the AWS clients, sockets,
+    uploader, scan workers and rate limiter are shared through `engine`.
+    """
+
+    def __init__(self, engine, camera_id, source_spec, priority=1.0, scan_budget=0.0):
+        self.engine = engine
+        self.camera_id = camera_id
+        self.source_spec = source_spec
+        self.priority = priority
+        self.state = State()
+
+        self.ring = FrameRing(config.FRAME_RING_SIZE)
+        self.capture = CaptureThread(open_source(source_spec), self.ring, log=self.log, camera=camera_id)
+        self.reader = RingReader(self.ring)
+        self.footage = engine.footage_hub.publisher(
+            parse_profiles(config.STREAM_PROFILES), prefix=f"{camera_id}/"
+        )
+
+        self.scene_gate = SceneChangeGate(
+            config.SCENE_SENSITIVITY, config.SCENE_PIXEL_DELTA, config.SCENE_MAX_SKIP
+        )
+        self.preprocessor = ScanPreprocessor(
+            config.SCAN_PREPROCESS, config.SCAN_MAX_DIM, config.SCAN_JPEG_QUALITY,
+            config.ROI_PADDING, config.ROI_LOCATOR, config.ROI_FULL_EVERY,
+        )
+        self.scan_cache = None
+        if config.SCAN_CACHE_SIZE:
+            self.scan_cache = ScanCache(
+                config.SCAN_CACHE_SIZE, config.SCAN_CACHE_TTL, config.SCAN_CACHE_TOLERANCE
+            )
+
+        self.scheduler = AdaptiveScanScheduler(
+            config.AI_SCAN_INTERVAL, config.SCAN_INTERVAL_MIN, config.SCAN_INTERVAL_MAX,
+            config.SCAN_TARGET_LATENCY, budget_per_hour=scan_budget,
+            stable_interval=config.SCAN_STABLE_INTERVAL,
+        )
+        self.tracker = PersonTracker(
+            config.TRACK_IOU, config.TRACK_MAX_MISSES, config.TRACK_COOLDOWN, config.TRACK_FLOW
+        )
+
+        # Pre-roll ring; reuses the stream profile's JPEGs when it is being watched
+        self.clips = None
+        if config.EVIDENCE_CLIPS:
+            profile = next((p for p in self.footage.profiles if p.name == config.CLIP_PROFILE), None)
+            self.clip_profile = profile.name if profile else None
+            self.clips = ClipRecorder(
+                self.upload_clip, config.CLIP_PRE_ROLL, config.CLIP_POST_ROLL, config.CLIP_FPS,
+                max_bytes=int(config.CLIP_MAX_MB * 1024 * 1024),
+                quality=profile.quality if profile else config.SCAN_JPEG_QUALITY,
+                max_height=profile.max_height if profile else None,
+            )
+
+        self.overlay = OverlayRenderer()
+        self.handled_generation = 0
+
+        self.scan_future = None
+        self.token_waits = 0   # scans dropped waiting on the shared token bucket
+        self.throttled = 0     # scans AWS answered with a throttling error
+        self.last_stats = time.time()
+        self.view = None
+        self.running = False
+        self.thread = None
+
+        engine.limiter.register(camera_id, priority)
+
+    def log(self, level, message, **fields):
+        self.engine.log(level, message, self.camera_id, **fields)
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if not self.capture.start():
+            self.log("ERROR", f"Failed to initialize frame source: {self.source_spec}")
+            return False
+        self.running = True
+        self.thread = threading.Thread(
+            target=self.run, name=f"pipeline-{self.camera_id}", daemon=True
+        )
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        self.capture.stop()
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    # ---------- throttled PPE logging ----------
+    def log_missing(self, tracks, result):
+        if not tracks:
+            return
+
+        # Counted once per violating person (track) per TRACK_COOLDOWN and
+        # handed to the alert dispatcher; logged at most once per log cooldown
+        now = time.time()
+        self.state.violation_count += len(tracks)
+        for track in tracks:
+            self.engine.alerts.submit(Violation(
+                now, self.camera_id, track.id, track.missing, track.confidences, result.evidence
+            ))
+
+        if now - self.state.last_log_time < self.engine.settings.current.log_cooldown:
+            return
+
+        for track in tracks:
+            self.log("VIOLATION", f"PPE MISSING: {', '.join(track.missing)} (person #{track.id})",
+                     missing=track.missing, confidences=track.confidences, persons=len(result), track=track.id)
+        self.state.last_log_time = now
+
+    def set_result(self, response, evidence=None):
+        """Convert a response once and publish it as the newest generation."""
+        state = self.state
+        with state.lock:
+            state.generation += 1
+            generation = state.generation
+        result = ScanResult(response, generation, evidence)
+        with state.lock:
+            if generation == state.generation:
+                state.latest_res = response
+                state.latest = result
+        STARTUP.mark("first_scan", self.camera_id)
+
+    # ---------- detector scan ----------
+    def perform_ai_scan(self, frame):
+        state = self.state
+        confidence = self.engine.confidence
+        scanned_at = time.time()
+        try:
+            # Near-identical scene to a recent scan: reuse its result
+            if self.scan_cache:
+                cached = self.scan_cache.get(frame, confidence)
+                if cached is not None:
+                    self.scheduler.on_result(cached)
+                    self.set_result(cached)
+                    return
+
+            with state.lock:
+                previous = state.latest_res
+            image_bytes, region = self.preprocessor.prepare(frame, previous)
+
+            # Give up on this scan rather than queue behind other cameras
+            # for longer than a tick
+            t0 = time.time()
+            try:
+                response = self.engine.detector.detect(
+                    image_bytes, confidence, self.camera_id, timeout=self.scheduler.interval
+                )
+            except RateLimited:
+                # Our own budget ran dry; only AWS throttling backs the interval off
+                self.token_waits += 1
+                self.scene_gate.reset()
+                return
+
+            self.scheduler.on_result(response, time.time() - t0)
+            remap_response(response, region)
+            if self.scan_cache:
+                self.scan_cache.put(frame, confidence, response)
+            summary = response.get("Summary", {})
+
+            # S3 UPLOAD VIOLATIONS (spooled, uploaded in the background)
+            evidence = None
+            if summary.get("PersonsWithoutRequiredEquipment"):
+                now = time.time()
+                if now - state.last_upload_time > self.engine.settings.current.upload_cooldown:
+                    # Evidence keeps the whole scene even when only a crop was scanned
+                    if region != FULL_FRAME:
+                        image_bytes = self.preprocessor.full_frame(frame)
+                    try:
+                        evidence = self.engine.uploader.submit(image_bytes, timestamp=now, camera=self.camera_id)
+                        state.last_upload_time = now
+                    except OSError as e:
+                        self.log("ERROR", f"Evidence spool failed: {str(e)[:60]}")
+                    if self.clips:
+                        self.clips.trigger(scanned_at)
+
+            self.set_result(response, evidence)
+
+        except Exception as e:
+            # Nothing was learned from this frame; let the next due tick rescan
+            self.scene_gate.reset()
+            if self.scheduler.is_throttle(e):
+                self.throttled += 1
+                self.scheduler.on_throttle()
+                self.log("WARN", f"Rekognition throttled, scan interval now {self.scheduler.interval:.1f}s")
+                return
+            self.log("ERROR", f"{self.engine.detector.name} scan failed: {str(e)[:60]}")
+
+    def upload_clip(self, avi, timestamp):
+        """ClipRecorder callback; spooling happens off the frame loop."""
+        def spool():
+            try:
+                key = self.engine.uploader.submit(avi, "video/x-msvideo", timestamp, "avi", camera=self.camera_id)
+                self.engine.alerts.evidence(self.camera_id, key)
+            except OSError as e:
+                self.log("ERROR", f"Clip spool failed: {str(e)[:60]}")
+        self.engine.executor.submit(spool)
+
+    def scan_in_flight(self):
+        return self.scan_future is not None and not self.scan_future.done()
+
+    # ---------- render ----------
+    def render(self, frame):
+        state = self.state
+        confidence = self.engine.confidence
+
+        with state.lock:
+            result = state.latest
+
+        # Violations are judged once per scan result and per tracked
+        # person; boxes follow people between scans
+        reports = self.tracker.step(frame, result, confidence, time.time())
+        self.scheduler.set_stable(self.tracker.stable)
+        if result is None:
+            return
+
+        if result.generation != self.handled_generation:
+            self.handled_generation = result.generation
+            self.log_missing(reports, result)
+
+        self.overlay.apply(frame, result, confidence, self.tracker.visible)
+
+    # ---------- stats ----------
+    def log_stats(self):
+        capture, reader = self.capture, self.reader
+        self.log("INFO", f"Capture {capture.fps:.1f} fps | dropped {reader.dropped} | reconnects {capture.reconnects}")
+        for name, st in self.footage.stats().items():
+            self.log("INFO", f"Stream {name}: sent {st['sent']} | idle {st['skipped_idle']} | capped {st['skipped_rate']} | {st['encode_ms']}ms")
+        gate = self.scene_gate.stats()
+        self.log("INFO", f"Scans sent {gate['sent']} (forced {gate['forced']}) | frames skipped {gate['frames_skipped']} | token waits {self.token_waits} | throttled {self.throttled}")
+        sched = self.scheduler.stats()
+        self.log("INFO", f"Scan interval {sched['interval']}s ({sched['reason']}) | latency {sched['latency']}s | decisions {sched['decisions']}")
+        tr = self.tracker.stats()
+        self.log("INFO", f"Tracks {tr['tracks']} | created {tr['created']} | violations reported {tr['reported']} | stable {tr['stable']}")
+        if self.scan_cache:
+            cs = self.scan_cache.stats()
+            self.log("INFO", f"Scan cache hits {cs['hits']} | misses {cs['misses']} | entries {cs['entries']}")
+        if self.clips:
+            cl = self.clips.stats()
+            self.log("INFO", f"Pre-roll {cl['seconds']}s / {cl['bytes'] / 1024 / 1024:.1f}MB in {cl['frames']} frames | clips {cl['clips']} (merged {cl['merged']})")
+        if self.preprocessor.scans:
+            self.log("INFO", f"Scan payload avg {self.preprocessor.bytes_sent / self.preprocessor.scans / 1024:.0f}KB | crops {self.preprocessor.crops}/{self.preprocessor.scans}")
+
+    # ---------- main loop ----------
+    def step(self, frame, now):
+        if now - self.last_stats > config.STATS_INTERVAL:
+            self.log_stats()
+            self.last_stats = now
+
+        # ENCODE & STREAM FRAME (only profiles someone is subscribed to)
+        sent = self.footage.publish(frame, now)
+        if self.clips:
+            self.clips.feed(frame, now, sent.get(self.clip_profile))
+
+        # AI SCAN (ADAPTIVE INTERVAL), once the engine's detector is up
+        if self.engine.ready.is_set() and self.scheduler.due(now) and not self.scan_in_flight():
+            # Only scan when the scene moved since the last scan; until it
+            # does, the gate is re-checked on every frame so walk-ins are
+            # picked up immediately
+            if self.scene_gate.should_scan(frame, now):
+                # The worker preprocesses and encodes; hand it a private copy
+                # since overlays are drawn onto this frame below
+                with STAGE_SECONDS.time("scan_submit", self.camera_id):
+                    self.scan_future = self.engine.executor.submit(self.perform_ai_scan, frame.copy())
+                self.scheduler.on_submit(now)
+
+        # RENDER PPE STATUS
+        self.render(frame)
+        self.view = frame
+
+    def run(self):
+        while self.running:
+            item = self.reader.read(timeout=1.0)
+            if item is None:
+                if not self.capture.running:
+                    break
+                self.log("ERROR", "Failed to read frame")
+                continue
+            STARTUP.mark("first_frame", self.camera_id)
+            self.step(item.image, time.time())
+        self.running = False
@@ -0,0 +1,175 @@
+import struct
+import threading
+import time
+from collections import deque
+
+from streaming import encode_jpeg
+
+# ===============================
+# ENCODED FRAME RING
+# ===============================
+class JpegRing:
+    """Last few seconds of already-encoded JPEGs under a byte ceiling.
+
+    Entries are (timestamp, bytes). `bytes` is immutable, so `window`
+    hands out references to the stored frames; nothing is copied until a
+    clip is assembled.
+    """
+
+    def __init__(self, max_bytes, max_seconds):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.frames = deque()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.evicted = 0
+
+    def append(self, timestamp, jpeg):
+        with self.lock:
+            self.frames.append((timestamp, jpeg))
+            self.size += len(jpeg)
+            horizon = timestamp - self.max_seconds
+            while self.frames and (self.size > self.max_bytes or self.frames[0][0] < horizon):
+                _, old = self.frames.popleft()
+                self.size -= len(old)
+                self.evicted += 1
+
+    def window(self, start, end):
+        with self.lock:
+            return [(t, jpeg) for t, jpeg in self.frames if start <= t <= end]
+
+    def stats(self):
+        with self.lock:
+            span = self.frames[-1][0] - self.frames[0][0] if self.frames else 0
+            return {"frames": len(self.frames), "bytes": self.size,
+                    "seconds": round(span, 1), "evicted": self.evicted}
+
+# ===============================
+# MJPEG AVI WRITER
+# ===============================
+def jpeg_size(jpeg):
+    """(width, height) from the first SOF marker, or None."""
+    i = 2
+    while i + 9 < len(jpeg):
+        if jpeg[i] != 0xFF:
+            return None
+        marker = jpeg[i + 1]
+        length = struct.unpack(">H", jpeg[i + 2:i + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", jpeg[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+
+def _chunk(fourcc, data):
+    pad = b"\0" if len(data) % 2 else b""
+    return fourcc + struct.pack("<I", len(data)) + data + pad
+
+
+def _list(kind, *chunks):
+    body = kind + b"".join(chunks)
+    return b"LIST" + struct.pack("<I", len(body)) + body
+
+
+def mjpeg_avi(frames, fps):
+    """Wrap JPEG bytes in an AVI (RIFF, MJPG, idx1) container as-is."""
+    width, height = jpeg_size(frames[0]) or (0, 0)
+    largest = max(len(f) for f in frames)
+    usec = int(1e6 / fps)
+
+    avih = struct.pack("<14I", usec, int(largest * fps), 0, 0x10, len(frames), 0, 1,
+                       largest, width, height, 0, 0, 0, 0)
+    strh = struct.pack("<4s4sIHHIIIIIIiI4h", b"vids", b"MJPG", 0, 0, 0, 0,
+                       1000, int(fps * 1000), 0, len(frames), largest, -1, 0,
+                       0, 0, width, height)
+    strf = struct.pack("<IiiHH4sIiiII", 40, width, height, 1, 24, b"MJPG",
+                       width * height * 3, 0, 0, 0, 0)
+    header = _list(b"hdrl", _chunk(b"avih", avih),
+                   _list(b"strl", _chunk(b"strh", strh), _chunk(b"strf", strf)))
+
+    chunks, index, offset = [], [], 4  # offsets count from the 'movi' fourcc
+    for jpeg in frames:
+        chunk = _chunk(b"00dc", jpeg)
+        index.append(struct.pack("<4sIII", b"00dc", 0x10, offset, len(jpeg)))
+        chunks.append(chunk)
+        offset += len(chunk)
+    movi = _list(b"movi", *chunks)
+    idx1 = _chunk(b"idx1", b"".join(index))
+
+    body = b"AVI " + header + movi + idx1
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+# ===============================
+# CLIP RECORDER
+# ===============================
+class ClipRecorder:
+    """Keeps a pre-roll ring for one camera and cuts clips on demand.
+
+    `feed` takes every frame but stores at most `fps` a second, reusing
+    the JPEG the stream already encoded when there is one and encoding
+    with the stream profile's settings otherwise. `trigger` marks a
+    violation; once `post_roll` seconds have been fed the ring is cut
+    from `pre_roll` before to `post_roll` after and `on_clip(avi, ts)`
+    is called. Triggers landing inside a pending clip are merged into it.
+    """
+
+    def __init__(self, on_clip, pre_roll=5.0, post_roll=3.0, fps=10.0,
+                 max_bytes=32 * 1024 * 1024, quality=70, max_height=480):
+        self.on_clip = on_clip
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.fps = fps
+        self.quality = quality
+        self.max_height = max_height
+        self.ring = JpegRing(max_bytes, pre_roll + post_roll + 1.0)
+
+        self.lock = threading.Lock()
+        self.pending = None  # trigger timestamp
+        self.next_store = 0
+
+        self.triggers = 0
+        self.merged = 0
+        self.clips = 0
+        self.encoded = 0
+
+    def feed(self, frame, now, jpeg=None):
+        if now >= self.next_store:
+            # Fixed ticks, so a 30 fps source really yields `fps` stored frames
+            period = 1.0 / self.fps
+            self.next_store = self.next_store + period if now - self.next_store < period else now + period
+            if jpeg is None:
+                jpeg = encode_jpeg(frame, self.quality, self.max_height)
+                self.encoded += 1
+            if jpeg is not None:
+                self.ring.append(now, jpeg)
+
+        with self.lock:
+            due = self.pending is not None and now >= self.pending + self.post_roll
+            trigger, self.pending = (self.pending, None) if due else (None, self.pending)
+        if trigger is not None:
+            self._cut(trigger)
+
+    def trigger(self, timestamp=None):
+        timestamp = timestamp or time.time()
+        with self.lock:
+            self.triggers += 1
+            if self.pending is not None:
+                self.merged += 1
+                return False
+            self.pending = timestamp
+            return True
+
+    def _cut(self, trigger):
+        frames = self.ring.window(trigger - self.pre_roll, trigger + self.post_roll)
+        if len(frames) < 2:
+            return
+        span = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / span if span > 0 else self.fps
+        self.clips += 1
+        self.on_clip(mjpeg_avi([jpeg for _, jpeg in frames], fps), trigger)
+
+    def stats(self):
+        stats = self.ring.stats()
+        stats.update(triggers=self.triggers, merged=self.merged, clips=self.clips, encoded=self.encoded)
+        return stats
@@ -0,0 +1,98 @@
+import threading
+import time
+
+# ===============================
+# SHARED TOKEN BUCKET
+# ===============================
+class SharedRateLimiter:
+    """Token bucket shared by every camera, split by weighted fair queueing.
+
+    `rate` tokens per second (the account's Rekognition TPS quota) refill
+    a bucket of `burst` tokens. When several cameras are waiting, the next
+    token goes to the one with the lowest virtual time, which advances by
+    1/priority per granted scan, so a priority-2 camera gets twice the
+    share of a priority-1 camera under contention and anyone can use the
+    whole quota when the others are idle. A client that starts waiting is
+    brought up to the virtual time of the others, so time spent idle is
+    not banked as credit to starve them with later.
+    """
+
+    def __init__(self, rate=5.0, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+
+        self.weights = {}
+        self.vtime = {}
+        self.vclock = 0.0   # virtual time of the latest grant
+        self.waiting = {}
+
+        self.granted = {}
+        self.timeouts = {}
+
+    def register(self, client, priority=1.0):
+        with self.cond:
+            self.weights[client] = max(float(priority), 0.01)
+            self.vtime[client] = min(self.vtime.values(), default=0.0)
+            self.waiting[client] = 0
+            self.granted[client] = 0
+            self.timeouts[client] = 0
+
+    def set_rate(self, rate, burst=None):
+        with self.cond:
+            self._refill()
+            self.rate = float(rate)
+            self.burst = float(burst or rate)
+            self.tokens = min(self.tokens, self.burst)
+            self.cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _next_client(self):
+        waiting = [c for c, n in self.waiting.items() if n]
+        return min(waiting, key=lambda c: self.vtime[c]) if waiting else None
+
+    def acquire(self, client, timeout=None):
+        """Block until `client` may make one call; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            if not self.waiting[client]:
+                others = [self.vtime[c] for c, n in self.waiting.items() if n and c != client]
+                self.vtime[client] = max(self.vtime[client], min(others, default=self.vclock))
+            self.waiting[client] += 1
+            try:
+                while True:
+                    self._refill()
+                    if self.tokens >= 1 and self._next_client() == client:
+                        self.tokens -= 1
+                        self.vclock = self.vtime[client]
+                        self.vtime[client] += 1.0 / self.weights[client]
+                        self.granted[client] += 1
+                        self.cond.notify_all()
+                        return True
+
+                    wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.01
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts[client] += 1
+                            return False
+                        wait = min(wait, remaining)
+                    self.cond.wait(wait)
+            finally:
+                self.waiting[client] -= 1
+                self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "rate": self.rate,
+                "tokens": round(self.tokens, 2),
+                "granted": dict(self.granted),
+                "timeouts": dict(self.timeouts),
+            }
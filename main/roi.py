@@ -0,0 +1,150 @@
+from collections import namedtuple
+
+import cv2
+
+# ===============================
+# SCAN PREPROCESSING
+# ===============================
+# Region of the full frame that was actually sent, in normalized
+# coordinates. Rekognition boxes are relative to the sent image, so they
+# are mapped back through this region before anything draws them.
+Region = namedtuple("Region", ["left", "top", "width", "height"])
+FULL_FRAME = Region(0.0, 0.0, 1.0, 1.0)
+
+
+def downscale(frame, max_dim):
+    h, w = frame.shape[:2]
+    if not max_dim or max(h, w) <= max_dim:
+        return frame
+    scale = max_dim / max(h, w)
+    return cv2.resize(frame, (int(w * scale), int(h * scale)),
+                      interpolation=cv2.INTER_AREA)
+
+
+def remap_box(box, region):
+    return {
+        "Left": region.left + box["Left"] * region.width,
+        "Top": region.top + box["Top"] * region.height,
+        "Width": box["Width"] * region.width,
+        "Height": box["Height"] * region.height,
+    }
+
+
+def remap_response(response, region):
+    """Rewrite every BoundingBox in a PPE response into full-frame space."""
+    if region == FULL_FRAME:
+        return response
+    for person in response.get("Persons", []):
+        if "BoundingBox" in person:
+            person["BoundingBox"] = remap_box(person["BoundingBox"], region)
+        for bp in person.get("BodyParts", []):
+            for eq in bp.get("EquipmentDetections", []):
+                if "BoundingBox" in eq:
+                    eq["BoundingBox"] = remap_box(eq["BoundingBox"], region)
+    return response
+
+
+class ScanPreprocessor:
+    """Shrinks the Rekognition payload before it leaves the box.
+
+    mode:
+      off       - full frame at full resolution (previous behaviour)
+      downscale - full frame, longest side capped at max_dim
+      crop      - padded union of the people found by `locator`
+                  ("previous" scan boxes, "hog" detector or "both"),
+                  then capped at max_dim; falls back to the downscaled
+                  full frame when nobody is located, and every
+                  `full_every` scans so new arrivals are not missed
+    """
+
+    def __init__(self, mode="off", max_dim=960, quality=85, padding=0.25,
+                 locator="previous", full_every=5, min_crop=160):
+        self.mode = mode
+        self.max_dim = max_dim
+        self.quality = quality
+        self.padding = padding
+        self.locator = locator
+        self.full_every = full_every
+        self.min_crop = min_crop
+        self.scans = 0
+        self.hog = None
+
+        self.bytes_sent = 0
+        self.crops = 0
+
+    def encode(self, frame):
+        ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError(f"JPEG encoding failed for a {frame.shape} frame")
+        return buf.tobytes()
+
+    def full_frame(self, frame):
+        if self.mode == "off":
+            return self.encode(frame)
+        return self.encode(downscale(frame, self.max_dim))
+
+    def detect_people(self, frame):
+        # HOG lives in the main OpenCV 4.x build but moved to contrib in 5.x
+        if not hasattr(cv2, "HOGDescriptor"):
+            return []
+        if self.hog is None:
+            self.hog = cv2.HOGDescriptor()
+            self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        small = downscale(frame, 640)
+        sh, sw = small.shape[:2]
+        rects, _ = self.hog.detectMultiScale(small, winStride=(8, 8), scale=1.05)
+        return [
+            {"Left": x / sw, "Top": y / sh, "Width": w / sw, "Height": h / sh}
+            for (x, y, w, h) in rects
+        ]
+
+    def locate(self, frame, previous):
+        boxes = []
+        if self.locator in ("previous", "both") and previous:
+            boxes += [p["BoundingBox"] for p in previous.get("Persons", [])
+                      if "BoundingBox" in p]
+        if self.locator in ("hog", "both"):
+            boxes += self.detect_people(frame)
+        return boxes
+
+    def crop_region(self, boxes, w, h):
+        left = min(b["Left"] for b in boxes)
+        top = min(b["Top"] for b in boxes)
+        right = max(b["Left"] + b["Width"] for b in boxes)
+        bottom = max(b["Top"] + b["Height"] for b in boxes)
+
+        pad_x = (right - left) * self.padding
+        pad_y = (bottom - top) * self.padding
+        # Rekognition rejects tiny images, keep a minimum crop size
+        min_w, min_h = self.min_crop / w, self.min_crop / h
+        pad_x = max(pad_x, (min_w - (right - left)) / 2)
+        pad_y = max(pad_y, (min_h - (bottom - top)) / 2)
+
+        x1, y1 = max(0, int((left - pad_x) * w)), max(0, int((top - pad_y) * h))
+        x2, y2 = min(w, int((right + pad_x) * w)), min(h, int((bottom + pad_y) * h))
+        return x1, y1, x2, y2
+
+    def prepare(self, frame, previous=None):
+        """Returns (jpeg bytes, Region) for the image to send."""
+        self.scans += 1
+        h, w = frame.shape[:2]
+
+        periodic_full = self.full_every and self.scans % self.full_every == 0
+        if self.mode == "crop" and not periodic_full:
+            boxes = self.locate(frame, previous)
+            if boxes:
+                x1, y1, x2, y2 = self.crop_region(boxes, w, h)
+                # Not worth cropping when people fill most of the frame
+                if (x2 - x1) * (y2 - y1) < 0.7 * w * h:
+                    try:
+                        payload = self.encode(downscale(frame[y1:y2, x1:x2], self.max_dim))
+                    except ValueError:
+                        pass  # send the whole frame instead
+                    else:
+                        self.crops += 1
+                        self.bytes_sent += len(payload)
+                        return payload, Region(x1 / w, y1 / h, (x2 - x1) / w, (y2 - y1) / h)
+
+        payload = self.full_frame(frame)
+        self.bytes_sent += len(payload)
+        return payload, FULL_FRAME
@@ -0,0 +1,126 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# ===============================
+# PERCEPTUAL HASH
+# ===============================
+def dhash(image, size=16):
+    """size*size-bit difference hash: compares neighbouring pixels of a (size+1) x size thumbnail."""
+    small = cv2.resize(image, (size + 1, size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def person_boxes(response):
+    """Normalized (left, top, width, height) of every person in a response."""
+    boxes = []
+    for person in response.get("Persons", []):
+        b = person.get("BoundingBox", {})
+        boxes.append((b.get("Left", 0.0), b.get("Top", 0.0), b.get("Width", 0.0), b.get("Height", 0.0)))
+    return boxes
+
+
+def crop_hash(frame, box, size=16):
+    """dhash of one normalized box, or None when it falls outside the frame."""
+    h, w = frame.shape[:2]
+    left, top, width, height = box
+    x1, y1 = max(0, int(left * w)), max(0, int(top * h))
+    x2, y2 = min(w, int((left + width) * w)), min(h, int((top + height) * h))
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return None
+    return dhash(frame[y1:y2, x1:x2], size)
+
+# ===============================
+# RESULT CACHE
+# ===============================
+class ScanCache:
+    """Bounded cache of detector responses keyed on perceptual hashes.
+
+    An entry keeps a hash of the whole frame and one of every person box
+    in its response. A frame matches when, scanned at the same confidence
+    level and within `ttl`, its whole-frame hash and the hash of each of
+    those boxes cut from it are all within `tolerance` bits. Hashing each
+    person at `size` x `size` is what lets a removed helmet or mask miss
+    the cache; a whole-frame thumbnail cannot see it. Least recently used
+    entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries=64, ttl=30.0, tolerance=3, size=16):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self.size = size
+        self.entries = OrderedDict()   # id -> (stored_at, confidence, frame hash, [(box, hash)], response)
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def _people_match(self, frame, people):
+        for box, h in people:
+            current = crop_hash(frame, box, self.size)
+            if current is None or hamming(h, current) > self.tolerance:
+                return False
+        return True
+
+    def get(self, frame, confidence, now=None):
+        now = now or time.time()
+        with self.lock:
+            frame_hash = dhash(frame, self.size)
+            for key, (stored_at, conf, h, people, response) in reversed(list(self.entries.items())):
+                if now - stored_at > self.ttl:
+                    del self.entries[key]
+                    self.expired += 1
+                    continue
+                if conf != confidence or hamming(h, frame_hash) > self.tolerance:
+                    continue
+                if self._people_match(frame, people):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+
+            self.misses += 1
+            return None
+
+    def put(self, frame, confidence, response, now=None):
+        people = []
+        for box in person_boxes(response):
+            h = crop_hash(frame, box, self.size)
+            if h is None:
+                return  # a person the cache could not check again
+            people.append((box, h))
+
+        with self.lock:
+            self.entries[next(self.ids)] = (now or time.time(), confidence, dhash(frame, self.size), people, response)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self.entries),
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+
+# ===============================
+# SCENE-CHANGE GATE
+# ===============================
+class SceneChangeGate:
+    """Decides whether a frame differs enough from the last scanned one.
+
+    Frames are shrunk to a small grayscale thumbnail and compared against
+    the thumbnail of the last frame actually sent for scanning, so slow
+    drift still adds up to a rescan. `sensitivity` is the fraction of
+    thumbnail pixels that must change by more than `pixel_delta` grey
+    levels. `max_skip` forces a rescan after that many seconds regardless.
+    """
+
+    def __init__(self, sensitivity=0.01, pixel_delta=25, max_skip=60.0, size=(64, 36)):
+        self.sensitivity = sensitivity
+        self.pixel_delta = pixel_delta
+        self.max_skip = max_skip
+        self.size = size
+
+        self.reference = None
+        self.last_sent = 0
+        self.last_score = 0.0
+
+        self.sent = 0
+        self.frames_skipped = 0   # frames checked while a scan was due, not scans
+        self.forced = 0
+
+    def thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def score(self, thumb):
+        if self.reference is None:
+            return 1.0
+        diff = cv2.absdiff(thumb, self.reference)
+        return float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+
+    def should_scan(self, frame, now):
+        thumb = self.thumbnail(frame)
+        self.last_score = self.score(thumb)
+
+        changed = self.last_score >= self.sensitivity
+        forced = not changed and self.max_skip and now - self.last_sent >= self.max_skip
+
+        if not (changed or forced):
+            self.frames_skipped += 1
+            return False
+
+        if forced:
+            self.forced += 1
+        self.sent += 1
+        self.reference = thumb
+        self.last_sent = now
+        return True
+
+    def reset(self):
+        """Drop the reference so the next frame is always scanned.
+
+        Called when a submitted scan produced no result, so the change
+        that triggered it is not used up.
+        """
+        self.reference = None
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "frames_skipped": self.frames_skipped,
+            "forced": self.forced,
+            "score": round(self.last_score, 4),
+        }
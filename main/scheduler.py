@@ -0,0 +1,121 @@
+import threading
+
+# ===============================
+# ADAPTIVE SCAN SCHEDULER
+# ===============================
+class AdaptiveScanScheduler:
+    """Picks the next scan interval for one camera.
+
+    Two factors multiply together:
+      activity - what the last result showed: violations or new people
+                 drop straight to `min_interval`, people present return to
+                 `base`, empty scenes stretch by `idle_growth` per scan up
+                 to `max_interval`.
+      penalty  - AIMD congestion control: every throttle (or latency above
+                 `target_latency`) multiplies it by `backoff`; every
+                 healthy response takes `recover` off it, down to 1.
+    `budget_per_hour` (0 = unlimited) puts a floor under the interval so
+    one camera can never spend more than its share of the cost budget.
+    While the tracker reports every person as stable and compliant
+    (`set_stable`), scans wait at least `stable_interval` (0 = never).
+    """
+
+    THROTTLE_CODES = ("ThrottlingException", "ProvisionedThroughputExceededException")
+
+    def __init__(self, base=2.0, min_interval=0.5, max_interval=15.0,
+                 target_latency=1.5, backoff=2.0, recover=0.25,
+                 idle_growth=1.5, budget_per_hour=0, stable_interval=0):
+        self.base = base
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.recover = recover
+        self.idle_growth = idle_growth
+        self.budget_per_hour = budget_per_hour
+        self.stable_interval = stable_interval
+        self.stable = False
+        self.lock = threading.Lock()
+
+        self.activity = base
+        self.penalty = 1.0
+        self.latency = None
+        self.last_scan = 0
+        self.last_persons = 0
+        self.last_reason = "start"
+        self.decisions = {"violation": 0, "new_people": 0, "people": 0,
+                          "idle": 0, "throttled": 0, "slow": 0}
+
+    @property
+    def floor(self):
+        if self.budget_per_hour:
+            return max(self.min_interval, 3600.0 / self.budget_per_hour)
+        return self.min_interval
+
+    @property
+    def interval(self):
+        return min(self.max_interval, max(self.floor, self.activity * self.penalty))
+
+    def due(self, now):
+        interval = self.interval
+        if self.stable and self.stable_interval:
+            interval = max(interval, self.stable_interval)
+        return now - self.last_scan >= interval
+
+    def set_stable(self, stable):
+        self.stable = stable
+
+    def on_submit(self, now):
+        self.last_scan = now
+
+    def _decide(self, reason):
+        self.last_reason = reason
+        self.decisions[reason] += 1
+
+    def on_result(self, response, latency=None):
+        persons = len(response.get("Persons", []))
+        violators = response.get("Summary", {}).get("PersonsWithoutRequiredEquipment")
+
+        with self.lock:
+            if violators:
+                self.activity = self.min_interval
+                self._decide("violation")
+            elif persons > self.last_persons:
+                self.activity = self.min_interval
+                self._decide("new_people")
+            elif persons:
+                self.activity = self.base
+                self._decide("people")
+            else:
+                self.activity = min(self.max_interval, max(self.activity, self.base) * self.idle_growth)
+                self._decide("idle")
+            self.last_persons = persons
+
+            # Cache hits carry no latency and say nothing about the API
+            if latency is None:
+                return
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if self.latency > self.target_latency:
+                self.penalty = min(self.max_interval, self.penalty * self.backoff)
+                self._decide("slow")
+            else:
+                self.penalty = max(1.0, self.penalty - self.recover)
+
+    def on_throttle(self):
+        with self.lock:
+            self.penalty = min(self.max_interval, self.penalty * self.backoff)
+            self._decide("throttled")
+
+    def is_throttle(self, error):
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in self.THROTTLE_CODES
+
+    def stats(self):
+        return {
+            "interval": round(self.interval, 2),
+            "penalty": round(self.penalty, 2),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "reason": self.last_reason,
+            "stable": self.stable,
+            "decisions": dict(self.decisions),
+        }
@@ -0,0 +1,83 @@
+import contextlib
+import threading
+import time
+
+# ===============================
+# STARTUP TIMING
+# ===============================
+class StartupTimer:
+    """Where the time goes between process start and the first scan.
+
+    Times are seconds since `t0`, which is when this module is first
+    imported (main.py imports it before anything heavy), so interpreter
+    start-up itself is not included. `phase(name)` times a block and
+    keeps when it started, so phases that ran side by side show up as
+    overlapping; `mark(name, camera)` records the first time a milestone
+    is reached and ignores later calls, e.g. one first frame per camera.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.t0 = time.perf_counter()
+            self.phases = {}   # name -> (start, seconds)
+            self.marks = {}    # name -> {camera: seconds}
+
+    def elapsed(self):
+        return time.perf_counter() - self.t0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = self.elapsed()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = (start, self.elapsed() - start)
+
+    def mark(self, name, camera=None):
+        now = self.elapsed()
+        with self.lock:
+            self.marks.setdefault(name, {}).setdefault(camera, now)
+
+    def reached(self, name, cameras):
+        with self.lock:
+            return all(c in self.marks.get(name, {}) for c in cameras)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "phases": {name: {"start": round(start, 3), "seconds": round(seconds, 3)}
+                           for name, (start, seconds) in self.phases.items()},
+                "marks": {name: {str(camera): round(t, 3) for camera, t in cameras.items()}
+                          for name, cameras in self.marks.items()},
+            }
+
+    def flat(self):
+        """{'first_frame': earliest, 'first_frame_last': slowest camera, 'aws_clients': ...}"""
+        with self.lock:
+            out = {name: seconds for name, (_, seconds) in self.phases.items()}
+            for name, cameras in self.marks.items():
+                out[name] = min(cameras.values())
+                if len(cameras) > 1:
+                    out[f"{name}_last"] = max(cameras.values())
+        return out
+
+    def report(self):
+        """One log line: milestones, then phases as 'name seconds @start'."""
+        with self.lock:
+            marks = []
+            for name, cameras in self.marks.items():
+                text = f"{name} {min(cameras.values()):.2f}s"
+                if len(cameras) > 1:
+                    text += f" (last {max(cameras.values()):.2f}s)"
+                marks.append(text)
+            phases = [f"{name} {seconds:.2f}s @{start:.2f}"
+                      for name, (start, seconds) in sorted(self.phases.items(), key=lambda p: p[1][0])]
+        return " | ".join(marks) + " || " + ", ".join(phases)
+
+
+STARTUP = StartupTimer()
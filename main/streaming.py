@@ -0,0 +1,234 @@
+import threading
+import time
+
+import cv2
+import zmq
+
+from events import event_topic, encode_event, make_event, format_event
+from metrics import STAGE_SECONDS, ERRORS, ENGINE
+
+# ===============================
+# ENCODING
+# ===============================
+def encode_jpeg(frame, quality=85, max_height=None):
+    if max_height and frame.shape[0] > max_height:
+        h, w = frame.shape[:2]
+        scale = max_height / h
+        frame = cv2.resize(frame, (int(w * scale), max_height),
+                           interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes() if ok else None
+
+# ===============================
+# STREAM PROFILES
+# ===============================
+class StreamProfile:
+    def __init__(self, name, max_height=None, quality=85, max_fps=None):
+        self.name = name
+        self.max_height = max_height
+        self.quality = quality
+        self.max_fps = max_fps
+        self.last_sent = 0
+
+        self.sent = 0
+        self.skipped_idle = 0
+        self.skipped_rate = 0
+        self.encode_ms = 0.0
+
+    def due(self, now):
+        return not self.max_fps or now - self.last_sent >= 1.0 / self.max_fps
+
+
+def parse_profiles(spec):
+    """Parse "name:height:quality:fps,..." (height/fps 0 = unlimited)."""
+    profiles = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        fields = part.strip().split(":")
+        name, height, quality, fps = fields + ["", "0", "85", "0"][len(fields):]
+        profiles.append(StreamProfile(
+            name,
+            max_height=int(height) or None,
+            quality=int(quality),
+            max_fps=float(fps) or None,
+        ))
+    return profiles
+
+# ===============================
+# SUBSCRIBER-AWARE PUBLISHER
+# ===============================
+class FootageHub:
+    """Owns the XPUB footage socket shared by every camera.
+
+    XPUB reports the first subscribe and the last unsubscribe for each
+    prefix, so `self.subscriptions` always holds the prefixes that have at
+    least one listener. ZMQ sockets are not thread-safe, so all access
+    from the camera threads goes through `self.lock`.
+    Messages are multipart: [topic, jpeg bytes].
+    """
+
+    def __init__(self, socket, poll_interval=0.05):
+        self.socket = socket
+        self.lock = threading.Lock()
+        self.subscriptions = frozenset()
+        self.poll_interval = poll_interval
+        self.last_poll = 0
+
+    @classmethod
+    def bind(cls, context, endpoint):
+        sock = context.socket(zmq.XPUB)
+        sock.setsockopt(zmq.SNDHWM, 2)
+        sock.bind(endpoint)
+        return cls(sock)
+
+    def publisher(self, profiles, prefix=""):
+        return FootagePublisher(self, profiles, prefix)
+
+    def poll_subscriptions(self, now):
+        if now - self.last_poll < self.poll_interval:
+            return
+        with self.lock:
+            self.last_poll = now
+            subs = set(self.subscriptions)
+            while True:
+                try:
+                    msg = self.socket.recv(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                if not msg:
+                    continue
+                if msg[0] == 1:
+                    subs.add(msg[1:])
+                elif msg[0] == 0:
+                    subs.discard(msg[1:])
+            self.subscriptions = frozenset(subs)
+
+    def has_listeners(self, topic):
+        return any(topic.startswith(sub) for sub in self.subscriptions)
+
+    def send(self, topic, image_bytes):
+        with self.lock:
+            try:
+                self.socket.send_multipart([topic, image_bytes], zmq.NOBLOCK)
+                return True
+            except zmq.ZMQError:
+                return False
+
+    def close(self):
+        self.socket.close()
+
+
+class FootagePublisher:
+    """One camera's stream profiles, published under `prefix` on a hub.
+
+    A profile is only encoded when a subscription matches its topic and
+    its rate cap allows another frame.
+    """
+
+    def __init__(self, hub, profiles, prefix=""):
+        self.hub = hub
+        self.profiles = profiles
+        self.prefix = prefix
+        self.camera = prefix.rstrip("/") or ENGINE
+
+    def topic(self, profile):
+        return (self.prefix + profile.name).encode()
+
+    def publish(self, frame, now=None):
+        """Encode and send every due profile; returns {name: jpeg bytes}."""
+        now = now or time.time()
+        self.hub.poll_subscriptions(now)
+        sent = {}
+
+        for profile in self.profiles:
+            topic = self.topic(profile)
+            if not self.hub.has_listeners(topic):
+                profile.skipped_idle += 1
+                continue
+            if not profile.due(now):
+                profile.skipped_rate += 1
+                continue
+
+            t0 = time.perf_counter()
+            image_bytes = encode_jpeg(frame, profile.quality, profile.max_height)
+            t1 = time.perf_counter()
+            profile.encode_ms = (t1 - t0) * 1000
+            STAGE_SECONDS.observe(t1 - t0, f"encode_{profile.name}", self.camera)
+            if image_bytes is None:
+                ERRORS.inc(f"encode_{profile.name}", self.camera)
+                continue
+
+            ok = self.hub.send(topic, image_bytes)
+            STAGE_SECONDS.observe(time.perf_counter() - t1, "publish", self.camera)
+            if ok:
+                profile.sent += 1
+            else:
+                ERRORS.inc("publish", self.camera)
+            profile.last_sent = now
+            sent[profile.name] = image_bytes
+
+        return sent
+
+    def stats(self):
+        return {
+            p.name: {
+                "sent": p.sent,
+                "skipped_idle": p.skipped_idle,
+                "skipped_rate": p.skipped_rate,
+                "encode_ms": round(p.encode_ms, 2),
+            }
+            for p in self.profiles
+        }
+
+# ===============================
+# LOG PUBLISHER
+# ===============================
+class LogPublisher:
+    """Prints log lines and publishes them as structured events.
+
+    Safe to call from any thread. See events.py for the wire format.
+    """
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.lock = threading.Lock()
+        self.last_msg = None
+        self.last_time = 0
+
+    @classmethod
+    def bind(cls, context, endpoint):
+        sock = context.socket(zmq.PUB)
+        sock.bind(endpoint)
+        return cls(sock)
+
+    def log(self, level, message, camera=None, **fields):
+        event = make_event(level, message, camera, **fields)
+        msg = format_event(event)
+
+        with self.lock:
+            # Deduplicate & cooldown
+            current_time = event["ts"]
+            if msg == self.last_msg and current_time - self.last_time < 0.1:
+                return
+            self.last_msg = msg
+            self.last_time = current_time
+
+            print(msg)
+            self._send(event)
+
+    def publish(self, level, message, camera=None, **fields):
+        """Send an event without printing it (metrics, bulk data)."""
+        with self.lock:
+            self._send(make_event(level, message, camera, **fields))
+
+    def _send(self, event):
+        try:
+            self.socket.send_multipart(
+                [event_topic(event["level"], event["camera"]), encode_event(event)], zmq.NOBLOCK
+            )
+        except zmq.ZMQError:
+            pass
+
+    def close(self):
+        self.socket.close()
@@ -0,0 +1,250 @@
+import cv2
+import numpy as np
+
+from analysis import ITEMS
+
+# ===============================
+# CROSS-SCAN PERSON TRACKER
+# ===============================
+class Track:
+    """One person followed across scans; `box` is normalized x1, y1, x2, y2."""
+
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = np.asarray(box, np.float32).copy()
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 0
+        self.misses = 0
+        self.compliant = True
+        self.missing = []
+        self.confidences = {}
+        self.reported_at = None   # last time this track was counted as a violation
+        self.points = None        # optical-flow features, small-frame pixels
+        self.motion = 0.0         # normalized distance moved since the last scan
+
+    def observe(self, box, compliant, missing, confidences, now):
+        self.box = np.asarray(box, np.float32).copy()
+        self.last_seen = now
+        self.hits += 1
+        self.misses = 0
+        self.compliant = compliant
+        self.missing = missing
+        self.confidences = confidences
+        self.motion = 0.0
+
+
+def iou_matrix(a, b):
+    """(N, 4) x (M, 4) boxes -> (N, M) intersection over union."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class PersonTracker:
+    """Gives scan results' persons stable ids and moves their boxes between scans.
+
+    Each new ScanResult is matched to the existing tracks greedily by IoU,
+    then by centroid distance (within half a box size) for people who
+    moved too far for their boxes to overlap. Unmatched persons start new
+    tracks; tracks missed by `max_misses` scans in a row are dropped.
+
+    With `flow` on, every frame in between shifts each box by the median
+    Lucas-Kanade displacement of a few corner features inside it, worked
+    out on a `flow_width` pixel wide greyscale copy. Without it boxes stay
+    where the last scan put them.
+
+    A violating track is reported at most once per `cooldown` seconds, so
+    one person standing without a helmet is one violation rather than one
+    per scan. `stable` is true when there are tracks, all of them were
+    judged compliant over at least two scans, none has moved more than
+    `stable_motion` since its last scan and nothing has changed outside
+    the boxes; it needs flow to know that.
+    """
+
+    def __init__(self, iou=0.3, max_misses=2, cooldown=60.0, flow=True,
+                 flow_width=320, stable_motion=0.02, pixel_delta=25, sensitivity=0.01):
+        self.iou = iou
+        self.max_misses = max_misses
+        self.cooldown = cooldown
+        self.flow = flow
+        self.flow_width = flow_width
+        self.stable_motion = stable_motion
+        self.pixel_delta = pixel_delta
+        self.sensitivity = sensitivity
+
+        self.tracks = []
+        self.next_id = 1
+        self.generation = 0
+        self.gray = None          # previous small frame
+        self.reference = None     # small frame at the last scan
+        self.outside_motion = 1.0
+
+        self.created = 0
+        self.reported = 0
+
+    # ---------- per frame ----------
+    def step(self, frame, result, threshold, now):
+        """Feed every rendered frame; returns the tracks to report as new violations."""
+        fresh = result is not None and result.generation != self.generation
+        gray = self._small(frame) if self.flow and (fresh or self.tracks) else None
+
+        reports = []
+        if fresh:
+            self.generation = result.generation
+            reports = self.update(result, threshold, now)
+            if gray is not None:
+                for track in self.tracks:
+                    self._seed(track, gray)
+                self.reference = gray
+        elif gray is not None and self.gray is not None:
+            self._propagate(self.gray, gray)
+            self.outside_motion = self._outside_motion(gray)
+
+        self.gray = gray
+        return reports
+
+    def _small(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.flow_width, max(1, round(h * self.flow_width / w))),
+                           interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    # ---------- scan results ----------
+    def _match(self, boxes):
+        pairs = []
+        if not self.tracks or not len(boxes):
+            return pairs
+        old = np.stack([t.box for t in self.tracks])
+        free_t, free_d = set(range(len(old))), set(range(len(boxes)))
+
+        iou = iou_matrix(old, boxes)
+        for t, d in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+            if iou[t, d] < self.iou:
+                break
+            if t in free_t and d in free_d:
+                pairs.append((t, d))
+                free_t.discard(t)
+                free_d.discard(d)
+
+        # People who moved further than their own width between scans
+        centers_old = (old[:, :2] + old[:, 2:]) / 2
+        centers_new = (boxes[:, :2] + boxes[:, 2:]) / 2
+        candidates = []
+        for t in free_t:
+            reach = 0.5 * max(old[t, 2] - old[t, 0], old[t, 3] - old[t, 1])
+            for d in free_d:
+                dist = float(np.hypot(*(centers_old[t] - centers_new[d])))
+                if dist < reach:
+                    candidates.append((dist, t, d))
+        for _, t, d in sorted(candidates):
+            if t in free_t and d in free_d:
+                pairs.append((t, d))
+                free_t.discard(t)
+                free_d.discard(d)
+        return pairs
+
+    def update(self, result, threshold, now):
+        ok = result.compliance(threshold)
+        matched = {}
+        for t, d in self._match(result.boxes):
+            matched[d] = self.tracks[t]
+
+        kept = []
+        for track in self.tracks:
+            if track in matched.values():
+                kept.append(track)
+                continue
+            track.misses += 1
+            if track.misses <= self.max_misses:
+                kept.append(track)
+
+        reports = []
+        for d in range(len(result)):
+            track = matched.get(d)
+            if track is None:
+                track = Track(self.next_id, result.boxes[d], now)
+                self.next_id += 1
+                self.created += 1
+                kept.append(track)
+            track.observe(result.boxes[d], bool(ok[d].all()), ITEMS[~ok[d]].tolist(),
+                          result.confidences(d), now)
+            if not track.compliant and (track.reported_at is None or now - track.reported_at >= self.cooldown):
+                track.reported_at = now
+                self.reported += 1
+                reports.append(track)
+
+        self.tracks = kept
+        return reports
+
+    # ---------- optical flow ----------
+    def _seed(self, track, gray):
+        h, w = gray.shape
+        x1, y1, x2, y2 = (track.box * [w, h, w, h]).astype(int)
+        mask = np.zeros_like(gray)
+        mask[max(y1, 0):max(y2, 0), max(x1, 0):max(x2, 0)] = 255
+        track.points = cv2.goodFeaturesToTrack(gray, 20, 0.01, 5, mask=mask)
+
+    def _propagate(self, prev, gray):
+        tracks = [t for t in self.tracks if t.points is not None and len(t.points)]
+        if not tracks:
+            return
+        h, w = gray.shape
+        points = np.concatenate([t.points for t in tracks]).astype(np.float32)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, points, None, winSize=(15, 15), maxLevel=2)
+        status = status.reshape(-1).astype(bool)
+
+        start = 0
+        for track in tracks:
+            end = start + len(track.points)
+            good = status[start:end]
+            if good.sum() >= 3:
+                shift = np.median(moved[start:end][good] - points[start:end][good], axis=0).reshape(2)
+                delta = shift / [w, h]
+                track.box += np.tile(delta, 2).astype(np.float32)
+                track.motion += float(np.hypot(*delta))
+                track.points = moved[start:end][good].reshape(-1, 1, 2)
+            else:
+                self._seed(track, gray)
+            start = end
+
+        # Boxes carried out of the frame belong to people who left
+        self.tracks = [t for t in self.tracks
+                       if 0 <= (t.box[0] + t.box[2]) / 2 <= 1 and 0 <= (t.box[1] + t.box[3]) / 2 <= 1]
+
+    def _outside_motion(self, gray):
+        if self.reference is None or self.reference.shape != gray.shape:
+            return 1.0
+        changed = cv2.absdiff(gray, self.reference) > self.pixel_delta
+        h, w = gray.shape
+        for track in self.tracks:
+            x1, y1, x2, y2 = (track.box * [w, h, w, h]).astype(int)
+            changed[max(y1, 0):max(y2, 0), max(x1, 0):max(x2, 0)] = False
+        return float(np.count_nonzero(changed)) / changed.size
+
+    # ---------- queries ----------
+    @property
+    def visible(self):
+        """Tracks found by the latest scan."""
+        return [t for t in self.tracks if not t.misses]
+
+    @property
+    def stable(self):
+        if not self.flow or not self.tracks:
+            return False
+        if self.outside_motion >= self.sensitivity:
+            return False
+        return all(t.compliant and t.hits >= 2 and t.motion < self.stable_motion for t in self.tracks)
+
+    def stats(self):
+        return {
+            "tracks": len(self.tracks),
+            "created": self.created,
+            "reported": self.reported,
+            "stable": self.stable,
+        }
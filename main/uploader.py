@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+from key_layout import KeyLayout
+from metrics import STAGE_SECONDS, IN_FLIGHT, ERRORS, ENGINE
+
+# ===============================
+# EVIDENCE UPLOADER
+# ===============================
+class EvidenceUploader:
+    """Uploads evidence to S3 in the background.
+
+    Every submission is first written to a spool directory (body + a small
+    JSON sidecar holding the key), then its digest is queued for the worker
+    threads. Spooled items are deleted only after S3 accepts them, so
+    anything still in flight during an outage or restart is picked up
+    again by the next spool rescan.
+
+    Keys embed a content hash, so a retried or duplicated put always
+    writes the same bytes to the same key and no existence check is needed.
+    Where a key lands is decided by `layout` (see key_layout.py).
+    """
+
+    def __init__(self, s3_client, bucket, spool_dir, workers=2, queue_size=64,
+                 max_retries=5, base_delay=0.5, max_delay=30.0,
+                 rescan_interval=30.0, layout=None, log=None):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.layout = layout or KeyLayout()
+        self.spool_dir = str(spool_dir)
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rescan_interval = rescan_interval
+        self.log = log or (lambda level, message: None)
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+        self.pending = {}   # digest -> S3 key, for items spooled and queued
+        self.lock = threading.Lock()
+        self.running = False
+        self.wake = threading.Event()
+        self.threads = []
+
+        self.submitted = 0
+        self.uploaded = 0
+        self.retries = 0
+        self.failed = 0
+        self.overflow = 0
+
+    # ---------- keys & spool ----------
+    def make_key(self, body, timestamp=None, ext="jpg", camera=None):
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        return digest, self.layout.key(camera, timestamp or time.time(), digest, ext)
+
+    def _paths(self, digest):
+        base = os.path.join(self.spool_dir, digest)
+        return base + ".bin", base + ".json"
+
+    def _write_atomic(self, path, data):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def spooled(self):
+        return sorted(
+            name[:-5] for name in os.listdir(self.spool_dir) if name.endswith(".json")
+        )
+
+    # ---------- producer side ----------
+    def submit(self, body, content_type="image/jpeg", timestamp=None, ext="jpg", key=None, camera=None):
+        """Spool and enqueue evidence; returns the S3 key it will land under."""
+        digest, default_key = self.make_key(body, timestamp, ext, camera)
+        key = key or default_key
+        body_path, meta_path = self._paths(digest)
+
+        with self.lock:
+            if digest in self.pending:
+                return self.pending[digest]  # the key actually spooled
+            self.pending[digest] = key
+
+        # Body first, sidecar last: a sidecar on disk means a complete item
+        self._write_atomic(body_path, body)
+        meta = {"key": key, "content_type": content_type, "created": time.time()}
+        self._write_atomic(meta_path, json.dumps(meta).encode())
+        self.submitted += 1
+        self._enqueue(digest)
+        return key
+
+    def _enqueue(self, digest):
+        try:
+            self.queue.put_nowait(digest)
+        except queue.Full:
+            # Stays in the spool; the next rescan retries it
+            self.overflow += 1
+            with self.lock:
+                self.pending.pop(digest, None)
+
+    def rescan(self):
+        queued = 0
+        for digest in self.spooled():
+            try:
+                with open(self._paths(digest)[1]) as f:
+                    key = json.load(f)["key"]
+            except (OSError, ValueError, KeyError):
+                continue  # uploaded meanwhile, or a torn sidecar
+            with self.lock:
+                if digest in self.pending:
+                    continue
+                self.pending[digest] = key
+            self._enqueue(digest)
+            queued += 1
+        return queued
+
+    # ---------- workers ----------
+    def start(self):
+        self.running = True
+        self.wake.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"uploader-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+        t = threading.Thread(target=self._rescanner, name="uploader-rescan", daemon=True)
+        t.start()
+        self.threads.append(t)
+
+        restored = self.rescan()
+        if restored:
+            self.log("CLOUD", f"Resuming {restored} spooled uploads")
+
+    def stop(self, timeout=5.0):
+        """Give queued items `timeout` seconds to drain; the rest stay spooled."""
+        deadline = time.time() + timeout
+        while not self.queue.empty() and time.time() < deadline:
+            time.sleep(0.05)
+        self.running = False
+        self.wake.set()
+        for t in self.threads:
+            t.join(timeout=max(0.1, deadline - time.time()))
+
+    def _rescanner(self):
+        while self.running:
+            self.wake.wait(self.rescan_interval)
+            if self.running:
+                self.rescan()
+
+    def _worker(self):
+        while self.running:
+            try:
+                digest = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._upload(digest)
+            finally:
+                with self.lock:
+                    self.pending.pop(digest, None)
+                self.queue.task_done()
+
+    def _upload(self, digest):
+        body_path, meta_path = self._paths(digest)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return  # Already uploaded by another worker or a broken item
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with STAGE_SECONDS.time("s3_upload", ENGINE), IN_FLIGHT.track("s3_upload"):
+                    self.s3.put_object(
+                        Bucket=self.bucket,
+                        Key=meta["key"],
+                        Body=body,
+                        ContentType=meta["content_type"],
+                    )
+                break
+            except Exception as e:
+                ERRORS.inc("s3_upload", ENGINE)
+                if attempt == self.max_retries or not self.running:
+                    self.failed += 1
+                    self.log("ERROR", f"S3 failed: {str(e)[:60]}")
+                    return
+                self.retries += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+        for path in (meta_path, body_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.uploaded += 1
+        self.log("CLOUD", f"UPLOADED {meta['key']}")
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "uploaded": self.uploaded,
+            "retries": self.retries,
+            "failed": self.failed,
+            "overflow": self.overflow,
+            "queued": self.queue.qsize(),
+        }
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import boto3
+import pytest
+from moto import mock_aws
+
+# The modules under main/ import each other as top-level scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main"))
+
+BUCKET = "ppe-evidence-test"
+
+
+@pytest.fixture
+def s3():
+    """A moto S3 client with an empty BUCKET."""
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
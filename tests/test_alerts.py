@@ -0,0 +1,129 @@
+import json
+import time
+
+import pytest
+
+from alerts import AlertDispatcher, FileSink, Violation
+
+
+def violation(camera, track, missing=("HEAD",), evidence=None):
+    return Violation(time.time(), camera, track, list(missing), {"HEAD": 0.0}, evidence)
+
+
+def wait_for(check, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if check():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def read(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class RecordingSink:
+    """Fails the first `failures` sends, records when every send happened."""
+
+    name = "recording"
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.attempts = []
+        self.digests = []
+
+    def send(self, digest):
+        self.attempts.append(time.time())
+        if len(self.attempts) <= self.failures:
+            raise ConnectionError("sink unreachable")
+        self.digests.append(digest)
+
+
+@pytest.fixture
+def dispatcher():
+    started = []
+
+    def make(sinks, **kwargs):
+        alerts = AlertDispatcher(sinks, **kwargs)
+        alerts.start()
+        started.append(alerts)
+        return alerts
+
+    yield make
+    for alerts in started:
+        alerts.stop(timeout=1.0)
+
+
+def test_one_digest_per_window(dispatcher, tmp_path):
+    path = tmp_path / "alerts.jsonl"
+    alerts = dispatcher([FileSink(str(path))], window=60, gather=0.3)
+    alerts.submit(violation("cam0", 1, evidence="cam0/a.jpg"))
+    alerts.submit(violation("cam0", 1, ("HEAD", "HAND")))
+    alerts.submit(violation("cam0", 2, evidence="cam0/b.jpg"))
+    alerts.evidence("cam0", "cam0/clip.avi")  # finished after the violations
+
+    assert wait_for(lambda: read(path))
+    time.sleep(0.3)
+    [digest] = read(path)
+    assert digest["camera"] == "cam0"
+    assert digest["violations"] == 3
+    assert digest["people"] == 2
+    assert digest["by_item"] == {"HEAD": 3, "HAND": 1}
+    assert digest["evidence"] == ["cam0/clip.avi", "cam0/a.jpg", "cam0/b.jpg"]
+
+    # The camera just had a digest: the next violation waits for the window
+    alerts.submit(violation("cam0", 3))
+    time.sleep(0.5)
+    assert len(read(path)) == 1
+    assert alerts.stats()["open"] == 1
+
+
+def test_failed_sends_retry_with_backoff(dispatcher):
+    sink = RecordingSink(failures=2)
+    alerts = dispatcher([sink], gather=0.0, base_delay=0.1, max_delay=1.0)
+    alerts.submit(violation("cam0", 1))
+
+    assert wait_for(lambda: sink.digests)
+    assert len(sink.attempts) == 3
+    first, second = (b - a for a, b in zip(sink.attempts, sink.attempts[1:]))
+    assert first >= 0.05   # base_delay, jittered down to half at most
+    assert second >= 0.1   # doubled
+    assert alerts.stats()["retries"] == 2
+    assert alerts.stats()["sent"] == 1
+
+
+def test_retries_give_up_after_max_retries(dispatcher):
+    sink = RecordingSink(failures=10)
+    alerts = dispatcher([sink], gather=0.0, max_retries=1, base_delay=0.05)
+    alerts.submit(violation("cam0", 1))
+
+    assert wait_for(lambda: alerts.stats()["failed"])
+    assert len(sink.attempts) == 2
+
+
+def test_per_hour_spaces_sends(dispatcher):
+    sink = RecordingSink()
+    alerts = dispatcher([sink], gather=0.0, per_hour=7200)  # one send per 0.5 s
+    alerts.submit(violation("cam0", 1))
+    alerts.submit(violation("cam1", 1))
+
+    assert wait_for(lambda: len(sink.digests) == 2)
+    assert {d["camera"] for d in sink.digests} == {"cam0", "cam1"}
+    assert sink.attempts[1] - sink.attempts[0] >= 0.45
+
+
+def test_stop_flushes_open_windows(tmp_path):
+    path = tmp_path / "alerts.jsonl"
+    alerts = AlertDispatcher([FileSink(str(path))], window=600, gather=60)
+    alerts.start()
+    alerts.submit(violation("cam0", 1))
+    alerts.submit(violation("cam1", 4))
+    time.sleep(0.2)
+    assert read(path) == []
+
+    alerts.stop(timeout=2.0)
+    assert sorted(d["camera"] for d in read(path)) == ["cam0", "cam1"]
+    assert alerts.stats()["open"] == 0
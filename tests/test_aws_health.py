@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from aws_health import AwsHealth, AwsSession
+from conftest import BUCKET
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def health(s3):
+    health = AwsHealth(AwsSession(region="us-east-1"), BUCKET)
+    yield health
+    health.stop()
+
+
+def test_session_reuses_one_client_per_service():
+    aws = AwsSession(region="us-east-1", max_pool=4)
+    assert aws.client("s3") is aws.client("s3")
+    assert aws.client("s3") is not aws.client("sts")
+    assert aws.config.max_pool_connections == 4
+
+
+def test_first_probe_succeeds(health):
+    health.start(wait=5.0)
+    snap = health.snapshot()
+    assert not snap["checking"]
+    assert snap["bucket"]["ok"]
+    assert not snap["bucket"]["stale"]
+    assert snap["identity"]["value"]["account"]
+    assert not snap["identity"]["stale"]
+    assert not snap["no_credentials"]
+
+
+def test_lost_bucket_goes_stale_and_refresh_reprobes(health, s3):
+    health.start(wait=5.0)
+    checked = health.bucket_probe.checked
+    s3.delete_bucket(Bucket=BUCKET)
+    time.sleep(0.05)
+
+    # bucket_ttl is 30 s: nothing notices until refresh() asks again
+    assert health.snapshot()["bucket"]["ok"]
+    health.refresh()
+    assert wait_for(lambda: health.snapshot()["bucket"]["error"])
+    assert health.bucket_probe.checked > checked
+
+    bucket = health.snapshot()["bucket"]
+    assert not bucket["ok"]
+    assert bucket["stale"]
+    assert bucket["age"] >= 0.05  # still says when it last answered
+
+    s3.create_bucket(Bucket=BUCKET)
+    health.refresh()
+    assert wait_for(lambda: health.snapshot()["bucket"]["ok"])
+    assert not health.snapshot()["bucket"]["stale"]
@@ -0,0 +1,182 @@
+import sys
+import types
+
+import cv2
+import numpy as np
+import pytest
+
+import config
+from bench.fakes import FakeRekognition, FakeS3, FakeSNS
+from detectors import CascadeDetector, LocalDetector, ModelUnavailable, RateLimited, RekognitionDetector
+
+CLASSES = "PERSON,HEAD_COVER,FACE_COVER,HAND_COVER"
+
+
+class Fail(Exception):
+    """Stands in for onnxruntime's own exception types."""
+
+
+@pytest.fixture
+def onnxruntime(monkeypatch):
+    def session(path, options=None, providers=None):
+        raise Fail(f"[ONNXRuntimeError] : 3 : NO_SUCHFILE : {path}")
+
+    module = types.SimpleNamespace(SessionOptions=types.SimpleNamespace, InferenceSession=session)
+    monkeypatch.setitem(sys.modules, "onnxruntime", module)
+
+
+# YOLOv8 layout: (1, 4 + classes, anchors), rows cx, cy, w, h, then one score per class
+YOLOV8_OUTPUT = np.array([[
+    # person, same person again, head, face, hand, noise
+    [320, 325, 320, 320, 240, 100],
+    [340, 345, 170, 200, 400, 100],
+    [200, 200, 80, 60, 40, 20],
+    [400, 400, 60, 50, 40, 20],
+    [0.9, 0.7, 0.0, 0.0, 0.0, 0.1],
+    [0.0, 0.0, 0.85, 0.0, 0.0, 0.1],
+    [0.0, 0.0, 0.0, 0.8, 0.0, 0.1],
+    [0.0, 0.0, 0.0, 0.0, 0.75, 0.1],
+]], np.float32)
+
+
+@pytest.fixture
+def yolov8(monkeypatch):
+    class Session:
+        def __init__(self, path, options=None, providers=None):
+            pass
+
+        def get_inputs(self):
+            return [types.SimpleNamespace(name="images")]
+
+        def run(self, names, feed):
+            assert feed["images"].shape == (1, 3, 640, 640)
+            return [YOLOV8_OUTPUT]
+
+    module = types.SimpleNamespace(SessionOptions=types.SimpleNamespace, InferenceSession=Session)
+    monkeypatch.setitem(sys.modules, "onnxruntime", module)
+
+
+def test_local_detector_parses_yolov8_output(yolov8):
+    detector = LocalDetector("model.onnx", CLASSES)
+    try:
+        _, jpeg = cv2.imencode(".jpg", np.zeros((640, 640, 3), np.uint8))
+        response = detector.detect(jpeg.tobytes(), 70)
+    finally:
+        detector.close()
+
+    [person] = response["Persons"]  # the overlapping duplicate is suppressed
+    assert person["Confidence"] == 90.0
+    assert person["BoundingBox"] == pytest.approx({"Left": 220 / 640, "Top": 140 / 640,
+                                                    "Width": 200 / 640, "Height": 400 / 640})
+    parts = {bp["Name"]: bp["EquipmentDetections"][0]["Type"] for bp in person["BodyParts"]}
+    assert parts == {"HEAD": "HEAD_COVER", "FACE": "FACE_COVER", "LEFT_HAND": "HAND_COVER"}
+    assert response["Summary"]["PersonsWithRequiredEquipment"] == [0]
+
+
+def test_local_detector_covers_follow_classes(yolov8):
+    detector = LocalDetector("model.onnx", "HEAD_COVER,-,PERSON,-")
+    detector.close()
+    assert detector.covers == ["HEAD_COVER"]
+
+
+# ===============================
+# CASCADE
+# ===============================
+def wearing(head, face, hand):
+    parts = [("HEAD", "HEAD_COVER", head), ("FACE", "FACE_COVER", face), ("LEFT_HAND", "HAND_COVER", hand)]
+    return {"Persons": [{"Id": 0, "BodyParts": [
+        {"Name": name, "EquipmentDetections": [{"Type": kind, "Confidence": conf}] if conf else []}
+        for name, kind, conf in parts]}]}
+
+
+class Stub:
+    """Answers every detect with `response`, or raises it when it is an exception."""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def detect(self, image_bytes, min_confidence, camera=None, timeout=None):
+        self.calls += 1
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+def test_cascade_keeps_cleared_frames_local():
+    local, remote = Stub(wearing(95, 96, 97)), Stub(wearing(0, 0, 0))
+    cascade = CascadeDetector(local, remote, accept=90)
+    assert cascade.detect(b"jpeg", 80) is local.response
+    assert cascade.detect(b"jpeg", 80) is local.response
+    assert remote.calls == 0
+    assert cascade.stats()["local"] == 2
+
+
+def test_cascade_escalates_doubtful_frames():
+    local, remote = Stub(wearing(95, 60, 97)), Stub(wearing(99, 99, 99))
+    cascade = CascadeDetector(local, remote, accept=90)
+    assert cascade.detect(b"jpeg", 80) is remote.response
+    assert cascade.stats()["escalated"] == 1
+
+
+def test_cascade_only_checks_classes_the_model_has():
+    local, remote = Stub(wearing(95, 0, 0)), Stub(wearing(99, 99, 99))
+    assert CascadeDetector(local, remote, covers=["HEAD_COVER"]).detect(b"jpeg", 80) is local.response
+    assert CascadeDetector(local, remote).detect(b"jpeg", 80) is remote.response
+    assert CascadeDetector(local, remote, covers=[]).detect(b"jpeg", 80) is remote.response
+
+
+def test_cascade_falls_back_when_cloud_fails():
+    messages = []
+    local = Stub(wearing(0, 0, 0))
+    cascade = CascadeDetector(local, Stub(ConnectionError("no route")),
+                              log=lambda level, message, camera=None: messages.append(level))
+    assert cascade.detect(b"jpeg", 80) is local.response
+    assert cascade.stats() == {"local": 0, "escalated": 1, "fallback": 1, "cloud_down": True}
+    assert messages == ["WARN"]
+
+    cascade.remote = Stub(RateLimited("cam0"))
+    cascade.cloud_down = False
+    assert cascade.detect(b"jpeg", 80) is local.response
+    assert not cascade.cloud_down  # throttling is not an outage
+
+    strict = CascadeDetector(local, Stub(ConnectionError("no route")), fallback=False)
+    with pytest.raises(ConnectionError):
+        strict.detect(b"jpeg", 80)
+
+
+def test_missing_model_raises_model_unavailable(tmp_path):
+    with pytest.raises(ModelUnavailable):
+        LocalDetector(str(tmp_path / "missing.onnx"), CLASSES)
+
+
+def test_corrupt_model_raises_model_unavailable(tmp_path):
+    path = tmp_path / "corrupt.onnx"
+    path.write_bytes(b"not a protobuf")
+    with pytest.raises(ModelUnavailable):
+        LocalDetector(str(path), CLASSES)
+
+
+def test_onnxruntime_errors_are_wrapped(onnxruntime, tmp_path):
+    with pytest.raises(ModelUnavailable, match="NO_SUCHFILE"):
+        LocalDetector(str(tmp_path / "missing.onnx"), CLASSES)
+
+
+@pytest.mark.parametrize("name", ["local", "cascade"])
+def test_engine_falls_back_to_rekognition(onnxruntime, monkeypatch, tmp_path, name):
+    from engine import Engine
+
+    monkeypatch.setattr(config, "DETECTOR", name)
+    monkeypatch.setattr(config, "LOCAL_MODEL", str(tmp_path / "missing.onnx"))
+    monkeypatch.setattr(config, "PORT", 19790)
+    monkeypatch.setattr(config, "LOG_PORT", 19791)
+    monkeypatch.setattr(config, "CONTROL_PORT", 19792)
+    monkeypatch.setattr(config, "EVIDENCE_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(config, "DETECTOR_PREWARM", False)
+
+    engine = Engine([], aws={"s3": FakeS3(), "rekognition": FakeRekognition(0.0, 0.0), "sns": FakeSNS()})
+    try:
+        engine.aws_init.result(timeout=5)
+        assert isinstance(engine.detector, RekognitionDetector)
+    finally:
+        engine.stop(headless=True)
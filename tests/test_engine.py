@@ -0,0 +1,73 @@
+import pytest
+import zmq
+
+import config
+from bench.fakes import FakeRekognition, FakeS3, FakeSNS
+from engine import Engine
+
+PORTS = (19890, 19891, 19892)
+
+
+@pytest.fixture
+def engine_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "PORT", PORTS[0])
+    monkeypatch.setattr(config, "LOG_PORT", PORTS[1])
+    monkeypatch.setattr(config, "CONTROL_PORT", PORTS[2])
+    monkeypatch.setattr(config, "METRICS_PORT", 0)
+    monkeypatch.setattr(config, "EVIDENCE_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(config, "DETECTOR_PREWARM", False)
+
+
+def make_engine(source="synthetic:64x48@10"):
+    return Engine([("cam0", source, 1.0)],
+                  aws={"s3": FakeS3(), "rekognition": FakeRekognition(0.0, 0.0), "sns": FakeSNS()})
+
+
+def ports_free():
+    ctx = zmq.Context()
+    sock = ctx.socket(zmq.PUB)
+    try:
+        for port in PORTS:
+            sock.bind(f"tcp://*:{port}")
+        return True
+    except zmq.ZMQError:
+        return False
+    finally:
+        sock.close(linger=0)
+        ctx.term()
+
+
+def test_failed_init_returns_false_and_stop_cleans_up(engine_config, monkeypatch):
+    monkeypatch.setattr(config, "ALERT_SINKS", "carrier-pigeon")
+    engine = make_engine()
+    assert engine.start() is False
+    assert not engine.ready.is_set()
+    engine.stop(headless=True)
+    assert not any(p.running for p in engine.pipelines)
+    assert ports_free()
+
+
+def test_no_frame_source_returns_false(engine_config):
+    engine = make_engine("video:/nonexistent/clip.mp4")
+    assert engine.start() is False
+    engine.stop(headless=True)
+    assert ports_free()
+
+
+def test_start_and_stop(engine_config):
+    engine = make_engine()
+    assert engine.start() is True
+    assert engine.ready.is_set()
+    engine.stop(headless=True)
+    assert ports_free()
+
+
+def test_scan_budget_is_split_by_priority(engine_config, monkeypatch):
+    monkeypatch.setattr(config, "SCAN_BUDGET_PER_HOUR", 3600)
+    engine = Engine([("dock", "synthetic:64x48@10", 2.0), ("gate", "synthetic:64x48@10", 1.0)],
+                    aws={"s3": FakeS3(), "rekognition": FakeRekognition(0.0, 0.0), "sns": FakeSNS()})
+    try:
+        budgets = {p.camera_id: p.scheduler.budget_per_hour for p in engine.pipelines}
+        assert budgets == {"dock": 2400, "gate": 1200}
+    finally:
+        engine.stop(headless=True)
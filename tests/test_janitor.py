@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from conftest import BUCKET
+from janitor import BucketInventory, Janitor
+from key_layout import KeyLayout
+
+DAY1 = datetime(2026, 5, 14, 10, 30).timestamp()
+DAY2 = datetime(2026, 5, 15, 10, 30).timestamp()
+
+
+def put(s3, keys):
+    for key in keys:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+
+
+def remaining(s3):
+    pages = s3.get_paginator("list_objects_v2").paginate(Bucket=BUCKET)
+    return {o["Key"] for page in pages for o in page.get("Contents", [])}
+
+
+class PartialFailure:
+    """Reports `refused` keys as AccessDenied, deletes the rest."""
+
+    def __init__(self, client, refused):
+        self.client = client
+        self.refused = set(refused)
+
+    def delete_objects(self, Bucket, Delete):
+        allowed = [o for o in Delete["Objects"] if o["Key"] not in self.refused]
+        if allowed:
+            self.client.delete_objects(Bucket=Bucket, Delete=dict(Delete, Objects=allowed))
+        return {"Errors": [{"Key": k, "Code": "AccessDenied", "Message": "denied"}
+                           for k in (o["Key"] for o in Delete["Objects"]) if k in self.refused]}
+
+
+def test_delete_splits_into_batches_and_updates_inventory(s3):
+    keys = [f"violation_20260514_{i:06d}.jpg" for i in range(1205)]
+    put(s3, keys)
+    inventory = BucketInventory(s3, BUCKET)
+    assert inventory.refresh(full=True) == 1205
+    assert inventory.pages == 2
+
+    report = Janitor(s3, BUCKET, inventory, workers=2).delete(keys + keys[:5])
+    assert report.requested == 1205
+    assert report.deleted == 1205
+    assert report.batches == 2
+    assert report.failed == []
+    assert remaining(s3) == set()
+    assert inventory.count() == 0
+
+
+def test_per_key_errors_are_reported_not_fatal(s3):
+    keys = [f"violation_20260514_{i:06d}.jpg" for i in range(10)]
+    put(s3, keys)
+    inventory = BucketInventory(s3, BUCKET)
+    inventory.refresh(full=True)
+
+    report = Janitor(PartialFailure(s3, keys[:2]), BUCKET, inventory).delete(keys)
+    assert report.deleted == 8
+    assert [(k, code) for k, code, _ in report.failed] == [(keys[0], "AccessDenied"), (keys[1], "AccessDenied")]
+    assert remaining(s3) == set(keys[:2])
+    assert inventory.count() == 2
+
+
+def test_purge_dates_only_touches_that_day(s3):
+    layout = KeyLayout()
+    day1 = [layout.key(cam, DAY1 + i, f"{i:016x}") for cam in ("cam0", "cam1") for i in range(3)]
+    day2 = [layout.key("cam0", DAY2 + i, f"{i:016x}") for i in range(3)]
+    put(s3, day1 + day2)
+    inventory = BucketInventory(s3, BUCKET, layout=layout)
+    inventory.refresh(full=True)
+
+    day = datetime.fromtimestamp(DAY1).date()
+    report = Janitor(s3, BUCKET, inventory).purge_dates(day, day)
+    assert report.deleted == len(day1)
+    assert remaining(s3) == set(day2)
+    assert {o.key for o in inventory.snapshot()} == set(day2)
+
+
+def test_inventory_cache_survives_restart(s3, tmp_path):
+    put(s3, ["violation_20260514_000001.jpg", "violation_20260514_000002.jpg"])
+    cache = tmp_path / "inventory.json"
+    BucketInventory(s3, BUCKET, cache_path=cache).refresh(full=True)
+
+    restarted = BucketInventory(s3, BUCKET, cache_path=cache)
+    assert restarted.count() == 2
+    put(s3, ["violation_20260514_000003.jpg"])
+    assert restarted.refresh() == 3  # incremental: only keys after the newest known
+
+
+def test_flat_bucket_under_partitioned_layout(s3):
+    day1 = [f"violation_20260514_10300{i}.jpg" for i in range(3)]
+    day2 = [f"violation_20260515_10300{i}.jpg" for i in range(3)]
+    put(s3, day1 + day2)
+    inventory = BucketInventory(s3, BUCKET, layout=KeyLayout())
+    inventory.refresh(full=True)
+    assert inventory.cameras() == []
+    # moto stamps every upload "now"; date them as they were captured
+    inventory.objects = {o.key: o._replace(modified=DAY1 if o.key in day1 else DAY2)
+                         for o in inventory.snapshot()}
+
+    day = datetime.fromtimestamp(DAY1).date()
+    report = Janitor(s3, BUCKET, inventory).purge_dates(day, day)
+    assert report.deleted == len(day1)
+    assert remaining(s3) == set(day2)
+
+    put(s3, ["violation_20260516_103000.jpg"])
+    assert inventory.refresh() == len(day2) + 1  # incremental falls back to StartAfter
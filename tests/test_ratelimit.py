@@ -0,0 +1,52 @@
+import threading
+import time
+
+from ratelimit import SharedRateLimiter
+
+
+def contend(limiter, clients, seconds):
+    """Every client acquires in a tight loop for `seconds`; returns grants per client."""
+    counts = dict.fromkeys(clients, 0)
+    stop = time.monotonic() + seconds
+
+    def worker(client):
+        while time.monotonic() < stop:
+            if limiter.acquire(client, timeout=0.1):
+                counts[client] += 1
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def test_priority_share_under_contention():
+    limiter = SharedRateLimiter(rate=400, burst=1)
+    limiter.register("a", 2.0)
+    limiter.register("b", 1.0)
+    counts = contend(limiter, ["a", "b"], 0.5)
+    assert 1.5 < counts["a"] / max(counts["b"], 1) < 2.7
+
+
+def test_idle_client_does_not_starve_a_busy_one():
+    limiter = SharedRateLimiter(rate=400, burst=1)
+    limiter.register("a")
+    limiter.register("b")
+
+    # b has the budget to itself while a is idle
+    for _ in range(188):
+        assert limiter.acquire("b", timeout=1.0)
+
+    counts = contend(limiter, ["a", "b"], 0.5)
+    total = counts["a"] + counts["b"]
+    assert counts["b"] > 0.35 * total, counts
+
+
+def test_timeout_when_bucket_is_empty():
+    limiter = SharedRateLimiter(rate=1, burst=1)
+    limiter.register("a")
+    assert limiter.acquire("a", timeout=0.1)
+    assert not limiter.acquire("a", timeout=0.05)
+    assert limiter.stats()["timeouts"]["a"] == 1
@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+import pytest
+
+import roi
+from roi import FULL_FRAME, ScanPreprocessor
+
+PREVIOUS = {"Persons": [{"BoundingBox": {"Left": 0.1, "Top": 0.1, "Width": 0.1, "Height": 0.3}}]}
+
+
+def frame():
+    return np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+
+def test_crop_sends_a_smaller_region():
+    pre = ScanPreprocessor("crop", full_every=0)
+    payload, region = pre.prepare(frame(), PREVIOUS)
+    assert region != FULL_FRAME
+    assert pre.crops == 1
+    assert cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR) is not None
+
+
+def test_failed_crop_encode_falls_back_to_full_frame(monkeypatch):
+    real = cv2.imencode
+
+    def imencode(ext, image, params=None):
+        if image.shape[:2] != (720, 1280):
+            return False, None
+        return real(ext, image, params)
+
+    monkeypatch.setattr(roi.cv2, "imencode", imencode)
+    pre = ScanPreprocessor("crop", max_dim=1280, full_every=0)
+    payload, region = pre.prepare(frame(), PREVIOUS)
+    assert region == FULL_FRAME
+    assert pre.crops == 0
+    assert pre.bytes_sent == len(payload)
+
+
+def test_failed_full_frame_encode_raises_clear_error(monkeypatch):
+    monkeypatch.setattr(roi.cv2, "imencode", lambda *args: (False, None))
+    with pytest.raises(ValueError, match="JPEG encoding failed"):
+        ScanPreprocessor("off").prepare(frame())
@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+
+from scan_cache import ScanCache
+
+PERSON = {"Left": 0.4, "Top": 0.2, "Width": 0.12, "Height": 0.6}
+
+
+def scene(helmet=True, person_x=512):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(60, 120, (720, 1280, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (31, 31), 0)
+    cv2.rectangle(frame, (person_x, 200), (person_x + 150, 640), (40, 60, 160), -1)
+    cv2.circle(frame, (person_x + 75, 230), 28, (180, 170, 160), -1)
+    if helmet:
+        cv2.ellipse(frame, (person_x + 75, 215), (36, 22), 0, 180, 360, (0, 220, 255), -1)
+    return frame
+
+
+def response(left=PERSON["Left"]):
+    return {"Persons": [{"Id": 0, "BoundingBox": dict(PERSON, Left=left), "BodyParts": []}]}
+
+
+def test_same_scene_hits():
+    cache = ScanCache()
+    cache.put(scene(), 80, response(), now=100.0)
+    noisy = cv2.add(scene(), np.full((720, 1280, 3), 2, np.uint8))
+    assert cache.get(noisy, 80, now=101.0) is not None
+
+
+def test_helmet_removed_inside_person_box_misses():
+    cache = ScanCache()
+    cache.put(scene(helmet=True), 80, response(), now=100.0)
+    assert cache.get(scene(helmet=False), 80, now=101.0) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_person_moved_misses():
+    cache = ScanCache()
+    cache.put(scene(person_x=100), 80, response(left=100 / 1280), now=100.0)
+    assert cache.get(scene(person_x=700), 80, now=101.0) is None
+
+
+def test_confidence_and_ttl():
+    cache = ScanCache(ttl=30.0)
+    cache.put(scene(), 80, response(), now=100.0)
+    assert cache.get(scene(), 90, now=101.0) is None
+    assert cache.get(scene(), 80, now=131.0) is None
+    assert cache.stats()["expired"] == 1
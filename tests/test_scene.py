@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import config
+from bench.fakes import FakeRekognition, FakeS3, FakeSNS
+from detectors import RateLimited
+from scene import SceneChangeGate
+
+
+def frame(value):
+    return np.full((72, 128, 3), value, np.uint8)
+
+
+def test_change_is_used_up_by_a_scan():
+    gate = SceneChangeGate(max_skip=60.0)
+    assert gate.should_scan(frame(0), 0.0)
+    assert not gate.should_scan(frame(0), 1.0)
+    assert gate.should_scan(frame(200), 2.0)
+    assert not gate.should_scan(frame(200), 3.0)
+    assert gate.stats()["frames_skipped"] == 2
+
+
+def test_reset_rescans_an_unchanged_scene():
+    gate = SceneChangeGate(max_skip=60.0)
+    assert gate.should_scan(frame(200), 0.0)
+    gate.reset()
+    assert gate.should_scan(frame(200), 1.0)
+
+
+def test_max_skip_forces_a_scan():
+    gate = SceneChangeGate(max_skip=10.0)
+    assert gate.should_scan(frame(0), 0.0)
+    assert not gate.should_scan(frame(0), 5.0)
+    assert gate.should_scan(frame(0), 10.0)
+    assert gate.stats()["forced"] == 1
+
+
+class Refusing:
+    name = "refusing"
+
+    def __init__(self, error):
+        self.error = error
+
+    def detect(self, *args, **kwargs):
+        raise self.error
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("error", [RateLimited("cam0"), ConnectionError("endpoint unreachable")])
+def test_failed_scan_does_not_use_up_the_change(monkeypatch, tmp_path, error):
+    from engine import Engine
+
+    monkeypatch.setattr(config, "PORT", 19840)
+    monkeypatch.setattr(config, "LOG_PORT", 19841)
+    monkeypatch.setattr(config, "CONTROL_PORT", 19842)
+    monkeypatch.setattr(config, "EVIDENCE_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(config, "DETECTOR_PREWARM", False)
+    engine = Engine([("cam0", "synthetic:64x48@10", 1.0)],
+                    aws={"s3": FakeS3(), "rekognition": FakeRekognition(0.0, 0.0), "sns": FakeSNS()})
+    try:
+        engine.aws_init.result(timeout=5)
+        engine.detector = Refusing(error)
+        pipeline = engine.pipelines[0]
+        image = frame(200)
+        assert pipeline.scene_gate.should_scan(image, 0.0)
+        pipeline.perform_ai_scan(image)
+        assert pipeline.scene_gate.should_scan(image, 1.0)
+    finally:
+        engine.stop(headless=True)
@@ -0,0 +1,81 @@
+from analysis import ScanResult
+from scheduler import AdaptiveScanScheduler
+from tracker import PersonTracker
+
+
+def scan(generation, *people):
+    """ScanResult for people given as (left, top, width, height, wearing_helmet)."""
+    persons = []
+    for i, (left, top, width, height, helmet) in enumerate(people):
+        parts = [("HEAD", "HEAD_COVER", 99 if helmet else 0), ("FACE", "FACE_COVER", 99),
+                 ("LEFT_HAND", "HAND_COVER", 99)]
+        persons.append({
+            "Id": i,
+            "BoundingBox": {"Left": left, "Top": top, "Width": width, "Height": height},
+            "BodyParts": [{"Name": name, "EquipmentDetections": [{"Type": kind, "Confidence": conf}]}
+                          for name, kind, conf in parts],
+        })
+    return ScanResult({"Persons": persons}, generation)
+
+
+def test_same_person_keeps_id_and_is_reported_once_per_cooldown():
+    tracker = PersonTracker(cooldown=60, flow=False)
+    first = tracker.update(scan(1, (0.10, 0.10, 0.2, 0.5, False)), 80, now=0)
+    assert [t.id for t in first] == [1]
+    assert first[0].missing == ["HEAD"]
+
+    assert tracker.update(scan(2, (0.12, 0.10, 0.2, 0.5, False)), 80, now=10) == []
+    assert tracker.update(scan(3, (0.14, 0.10, 0.2, 0.5, False)), 80, now=59) == []
+    again = tracker.update(scan(4, (0.15, 0.10, 0.2, 0.5, False)), 80, now=60)
+    assert [t.id for t in again] == [1]
+    assert tracker.stats()["created"] == 1
+    assert tracker.stats()["reported"] == 2
+
+
+def test_far_move_still_matches_by_centroid():
+    tracker = PersonTracker(iou=0.3, flow=False)
+    tracker.update(scan(1, (0.10, 0.10, 0.2, 0.5, True)), 80, now=0)
+    # Shifted by most of its width: no IoU overlap worth the name, centre within reach
+    tracker.update(scan(2, (0.28, 0.10, 0.2, 0.5, True)), 80, now=1)
+    assert [t.id for t in tracker.tracks] == [1]
+
+    # Too far to be the same person: a new track, the old one is missed
+    tracker.update(scan(3, (0.75, 0.10, 0.2, 0.5, True)), 80, now=2)
+    assert sorted(t.id for t in tracker.tracks) == [1, 2]
+    assert [t.id for t in tracker.visible] == [2]
+
+
+def test_track_dropped_after_max_misses():
+    tracker = PersonTracker(max_misses=2, flow=False)
+    tracker.update(scan(1, (0.10, 0.10, 0.2, 0.5, True)), 80, now=0)
+    tracker.update(scan(2), 80, now=1)
+    tracker.update(scan(3), 80, now=2)
+    assert [t.misses for t in tracker.tracks] == [2]
+    tracker.update(scan(4), 80, now=3)
+    assert tracker.tracks == []
+
+
+def test_step_only_updates_on_a_new_generation():
+    tracker = PersonTracker(cooldown=0, flow=False)
+    result = scan(7, (0.10, 0.10, 0.2, 0.5, False))
+    assert len(tracker.step(None, result, 80, now=0)) == 1
+    assert tracker.step(None, result, 80, now=1) == []  # same scan, rendered again
+
+
+def test_scheduler_stable_interval_applies_only_while_stable():
+    scheduler = AdaptiveScanScheduler(base=2.0, min_interval=0.5, stable_interval=30)
+    scheduler.on_submit(100)
+    assert scheduler.due(102)
+
+    scheduler.set_stable(True)
+    assert not scheduler.due(102)
+    assert not scheduler.due(129)
+    assert scheduler.due(130)
+
+    scheduler.set_stable(False)
+    assert scheduler.due(102)
+
+    never = AdaptiveScanScheduler(base=2.0, stable_interval=0)
+    never.set_stable(True)
+    never.on_submit(100)
+    assert never.due(102)
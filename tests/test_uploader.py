@@ -0,0 +1,76 @@
+import time
+
+from conftest import BUCKET
+from uploader import EvidenceUploader
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class FlakyS3:
+    """Fails the first `failures` puts, then hands over to a real client."""
+
+    def __init__(self, client, failures):
+        self.client = client
+        self.failures = failures
+
+    def put_object(self, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("endpoint unreachable")
+        return self.client.put_object(**kwargs)
+
+
+def test_duplicate_submit_returns_spooled_key(tmp_path):
+    uploader = EvidenceUploader(None, BUCKET, tmp_path)
+    first = uploader.submit(b"frame", timestamp=1_700_000_000, camera="cam0")
+    again = uploader.submit(b"frame", timestamp=1_700_003_600, camera="cam0")
+    assert again == first
+    assert uploader.submitted == 1
+
+
+def test_spooled_items_resume_after_restart(s3, tmp_path):
+    # Nothing is started: the process "dies" with the item still spooled
+    dead = EvidenceUploader(None, BUCKET, tmp_path)
+    key = dead.submit(b"evidence", camera="cam0")
+    assert len(dead.spooled()) == 1
+
+    uploader = EvidenceUploader(s3, BUCKET, tmp_path, rescan_interval=0.1)
+    uploader.start()
+    try:
+        assert wait_for(lambda: uploader.uploaded == 1)
+    finally:
+        uploader.stop()
+    assert s3.get_object(Bucket=BUCKET, Key=key)["Body"].read() == b"evidence"
+    assert uploader.spooled() == []
+
+
+def test_failed_puts_are_retried(s3, tmp_path):
+    uploader = EvidenceUploader(FlakyS3(s3, failures=2), BUCKET, tmp_path, base_delay=0.01,
+                                rescan_interval=0.1)
+    uploader.start()
+    try:
+        key = uploader.submit(b"evidence", camera="cam0")
+        assert wait_for(lambda: uploader.uploaded == 1)
+    finally:
+        uploader.stop()
+    assert uploader.retries == 2
+    assert s3.head_object(Bucket=BUCKET, Key=key)["ContentLength"] == len(b"evidence")
+
+
+def test_items_stay_spooled_when_retries_run_out(tmp_path):
+    uploader = EvidenceUploader(FlakyS3(None, failures=10), BUCKET, tmp_path,
+                                max_retries=1, base_delay=0.01, rescan_interval=0.1)
+    uploader.start()
+    try:
+        uploader.submit(b"evidence", camera="cam0")
+        assert wait_for(lambda: uploader.failed == 1)
+    finally:
+        uploader.stop()
+    assert len(uploader.spooled()) == 1